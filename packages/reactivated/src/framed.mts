@@ -0,0 +1,128 @@
+import net from "node:net";
+
+import {SSRErrorResponse, serializeError} from "./errors.js";
+import type {RenderRequest, RenderResponse, render as renderType} from "./render.mjs";
+
+// A persistent, length-prefixed alternative to the HTTP endpoint. Every frame
+// is a 4-byte big-endian length (of everything after it), a 4-byte request
+// id, a 1-byte type, and the payload. Requests carry the UTF-8 JSON body the
+// HTTP endpoint would get; responses are chunks of HTML for that id, then an
+// end frame, or an error frame with an SSRErrorResponse. Many renders can be
+// in flight on one connection, told apart by their ids.
+export const FRAME = {
+    RENDER: 0x01,
+    RENDER_STREAM: 0x02,
+    CHUNK: 0x11,
+    END: 0x12,
+    ERROR: 0x13,
+} as const;
+
+const HEADER_SIZE = 9;
+
+export const encodeFrame = (id: number, type: number, payload: Buffer) => {
+    const header = Buffer.allocUnsafe(HEADER_SIZE);
+    header.writeUInt32BE(payload.length + HEADER_SIZE - 4, 0);
+    header.writeUInt32BE(id, 4);
+    header.writeUInt8(type, 8);
+    return Buffer.concat([header, payload]);
+};
+
+const toBuffer = (chunk: unknown, encoding?: BufferEncoding) =>
+    chunk == null
+        ? Buffer.alloc(0)
+        : typeof chunk === "string"
+          ? Buffer.from(chunk, encoding ?? "utf8")
+          : Buffer.from(chunk as Uint8Array);
+
+class FramedResponse implements RenderResponse {
+    private statusCode = 200;
+    private ended = false;
+
+    constructor(
+        private socket: net.Socket,
+        private id: number,
+    ) {}
+
+    status(code: number) {
+        this.statusCode = code;
+        return this;
+    }
+
+    setHeader() {
+        return this;
+    }
+
+    write(chunk: any, encoding?: any) {
+        if (!this.ended && !this.socket.destroyed) {
+            this.socket.write(
+                encodeFrame(this.id, FRAME.CHUNK, toBuffer(chunk, encoding)),
+            );
+        }
+        return true;
+    }
+
+    end(chunk?: any) {
+        this.finish(FRAME.END, toBuffer(chunk));
+    }
+
+    json(body: unknown) {
+        this.finish(
+            this.statusCode === 200 ? FRAME.END : FRAME.ERROR,
+            Buffer.from(JSON.stringify(body)),
+        );
+    }
+
+    private finish(type: number, payload: Buffer) {
+        if (this.ended || this.socket.destroyed) {
+            return;
+        }
+        this.ended = true;
+        this.socket.write(encodeFrame(this.id, type, payload));
+    }
+}
+
+export const createFramedServer = (render: typeof renderType) =>
+    net.createServer((socket) => {
+        let buffered = Buffer.alloc(0);
+
+        const dispatch = (id: number, type: number, payload: Buffer) => {
+            const res = new FramedResponse(socket, id);
+            const fail = (error: unknown) => {
+                const errResp: SSRErrorResponse = {
+                    error: serializeError(error as any),
+                };
+                res.status(500).json(errResp);
+            };
+
+            try {
+                const req: RenderRequest = {
+                    body: JSON.parse(payload.toString("utf8")),
+                    get: (name) =>
+                        name.toLowerCase() === "x-reactivated-stream" &&
+                        type === FRAME.RENDER_STREAM
+                            ? "1"
+                            : undefined,
+                };
+                render(req, res, "", "production", "index").catch(fail);
+            } catch (error) {
+                fail(error);
+            }
+        };
+
+        socket.on("data", (data) => {
+            buffered = buffered.length === 0 ? data : Buffer.concat([buffered, data]);
+
+            while (buffered.length >= 4) {
+                const length = buffered.readUInt32BE(0);
+                if (buffered.length < length + 4) {
+                    break;
+                }
+                const id = buffered.readUInt32BE(4);
+                const type = buffered.readUInt8(8);
+                const payload = buffered.subarray(HEADER_SIZE, length + 4);
+                buffered = buffered.subarray(length + 4);
+                dispatch(id, type, payload);
+            }
+        });
+        socket.on("error", () => socket.destroy());
+    });
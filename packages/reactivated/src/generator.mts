@@ -141,7 +141,7 @@ export type ReactivateConfig = GenericReactivateConfig<_Types["Context"]>;
 export declare const reactivate: (config?: ReactivateConfig) => void;
 export declare const reactivateAdmin: () => void;
 
-export const rpc = {requester: typeof window != "undefined" ? rpcUtils.defaultRequester : null as any};
+export const rpc = {requester: typeof window != "undefined" ? rpcUtils.batchRequester : null as any};
 import React from "react"
 import * as generated from "reactivated/dist/generated";
 import * as rpcUtils from "reactivated/dist/rpc";
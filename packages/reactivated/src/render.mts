@@ -1,6 +1,4 @@
-import {Request} from "express";
 import React, {type JSX} from "react";
-import {Response} from "express";
 import {renderToPipeableStream} from "react-dom/server";
 import {preinit} from "react-dom";
 import {Transform} from "node:stream";
@@ -24,9 +22,24 @@ function serJSON(data: unknown): string {
     return JSON.stringify(data).replace(/</g, "\\u003c");
 }
 
+// The slice of express's request and response that rendering uses, so the
+// framed transport can render without an HTTP request behind it.
+export interface RenderRequest {
+    body: any;
+    get(name: string): string | undefined;
+}
+
+export interface RenderResponse {
+    status(code: number): RenderResponse;
+    setHeader(name: string, value: string): unknown;
+    write(chunk: any, encoding?: any): unknown;
+    end(chunk?: any): unknown;
+    json(body: unknown): unknown;
+}
+
 export const render = async (
-    req: Request,
-    res: Response,
+    req: RenderRequest,
+    res: RenderResponse,
     vite: string,
     mode: "production" | "development",
     entryPoint: string,
@@ -71,6 +84,37 @@ export const render = async (
 
     let hasError = false;
 
+    // Streaming responses flush the shell as soon as it is ready and keep
+    // piping Suspense boundaries as they resolve. Buffered responses wait
+    // for everything, so any error can still become a 500.
+    const streaming = req.get("x-reactivated-stream") === "1";
+    let shellFlushed = false;
+
+    const sendError = (error: unknown) => {
+        const errResp: SSRErrorResponse = {
+            error: serializeError(error as any),
+        };
+        res.status(500).json(errResp);
+    };
+
+    const flush = (pipe: (destination: Transform) => Transform) => {
+        res.status(200);
+        // Seems like the renderer.py, at least for unix socket, requires a charset
+        // unlike the React docs
+        res.setHeader("content-type", "text/html; charset=utf-8");
+        const transformStream = new Transform({
+            transform(chunk, encoding, callback) {
+                res.write(chunk, encoding);
+                callback();
+            },
+        });
+        transformStream.on("finish", () => {
+            res.end(vite);
+        });
+
+        pipe(transformStream);
+    };
+
     const config = getReactivateConfig();
     const wrapped = config.render
         ? await config.render(content, {ssr: true, context, props})
@@ -94,35 +138,40 @@ export const render = async (
                       ? [`${STATIC_URL}dist/@id/virtual:reactivated/entry`]
                       : [`${STATIC_URL}dist/client/${resolvedEntryPoint}.tsx`],
             onError(error) {
-                hasError = true;
                 if (ssrFixStacktrace) {
                     console.log("fixing stacktrace");
                     ssrFixStacktrace(error as any);
                 }
-                const errResp: SSRErrorResponse = {
-                    error: serializeError(error as any),
-                };
-                res.status(500).json(errResp);
+                if (streaming) {
+                    // Before the shell, onShellError answers with a 500.
+                    // After it, the status is already on the wire: React
+                    // sends the failed boundary's fallback and the client
+                    // renders it instead, so the error is only logged.
+                    if (shellFlushed) {
+                        console.error(serializeError(error as any));
+                    }
+                    return;
+                }
+                hasError = true;
+                sendError(error);
+            },
+            onShellReady() {
+                if (!streaming) {
+                    return;
+                }
+                shellFlushed = true;
+                flush(pipe);
+            },
+            onShellError(error) {
+                if (streaming) {
+                    sendError(error);
+                }
             },
             onAllReady() {
-                if (hasError) {
+                if (streaming || hasError) {
                     return;
                 }
-                res.status(200);
-                // Seems like the renderer.py, at least for unix socket, requires a charset
-                // unlike the React docs
-                res.setHeader("content-type", "text/html; charset=utf-8");
-                const transformStream = new Transform({
-                    transform(chunk, encoding, callback) {
-                        res.write(chunk, encoding);
-                        callback();
-                    },
-                });
-                transformStream.on("finish", () => {
-                    res.end(vite);
-                });
-
-                pipe(transformStream);
+                flush(pipe);
             },
         },
     );
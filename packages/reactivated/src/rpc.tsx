@@ -1,3 +1,5 @@
+import React from "react";
+
 // lets us specify the cookie string rather than always looking at
 // document.cookie.
 export function getCookieFromCookieString(name: string, cookieString: string) {
@@ -33,26 +35,114 @@ type JSONValue =
     | JSONValue[]
     | {[key: string]: JSONValue};
 
+// Generated RPC functions pass their name and URL params too, so a requester
+// can send them through the batch endpoint instead of their own URL.
+export type RequesterCall = {name: string; params: Record<string, string | number>};
+
 export type Requester = (
     url: string,
     payload: JSONValue | null,
     method: "GET" | "POST",
+    call?: RequesterCall,
 ) => Promise<RequesterResult>;
 
+const resultFromStatus = (status: number, data: any): RequesterResult => {
+    if (status === 200) {
+        return {type: "success", data};
+    } else if (status === 400) {
+        return {type: "invalid", errors: data};
+    } else if (status === 401) {
+        return {type: "unauthorized"};
+    } else if (status === 403) {
+        return {type: "denied", reason: data};
+    }
+    return {type: "exception", exception: null};
+};
+
+// The last ETag and body seen for each URL, and body for queries that send their
+// input as one. Query RPCs and JSON page loads answer a request naming the current
+// ETag with an empty 304, and the body comes from here instead.
+const etagged = new Map<string, {etag: string; data: unknown}>();
+const MAX_ETAGGED = 100;
+
+export const conditionalFetch = async (
+    url: string,
+    init: RequestInit & {headers?: Record<string, string>} = {},
+): Promise<{status: number; data: any}> => {
+    const key = typeof init.body === "string" ? `${url}\n${init.body}` : url;
+    const cached = etagged.get(key);
+    const response = await fetch(url, {
+        ...init,
+        headers: {
+            ...init.headers,
+            ...(cached != null ? {"If-None-Match": cached.etag} : {}),
+        },
+    });
+
+    if (response.status === 304 && cached != null) {
+        return {status: 200, data: cached.data};
+    }
+
+    const isJSON = response.headers.get("Content-Type")?.startsWith("application/json");
+    const data = isJSON ? await response.json() : null;
+    const etag = response.headers.get("ETag");
+
+    etagged.delete(key);
+    if (response.status === 200 && etag != null) {
+        etagged.set(key, {etag, data});
+        if (etagged.size > MAX_ETAGGED) {
+            etagged.delete(etagged.keys().next().value!);
+        }
+    }
+    return {status: response.status, data};
+};
+
+// The props and context for a page, for client-side navigation. Revisiting an
+// unchanged page costs a 304.
+export const fetchServerData = async (url: string) => {
+    const target = new URL(url, window.location.href);
+    target.searchParams.set("format", "json");
+    const {status, data} = await conditionalFetch(target.toString(), {
+        headers: {Accept: "application/json"},
+    });
+    if (status !== 200) {
+        throw new Error(`Loading ${url} failed with status ${status}`);
+    }
+    return data as {context: unknown; props: unknown};
+};
+
 export const defaultRequester: Requester = async (url, payload, method) => {
     try {
-        // The method is authoritative (it comes from the server's RPC
-        // declaration), not inferred from whether a payload is present. A POST
+        // The method comes from the server's RPC declaration. A POST
         // serializes the payload exactly as given — including a literal `null` when
         // the RPC's input is omitted — so the server receives the typed value it
-        // expects (e.g. `null` for an optional `Form | None` input).
-        const isGet = method === "GET";
+        // expects (e.g. `null` for an optional `Form | None` input). A query with
+        // input sends it as a JSON body too, as it would through the batch
+        // endpoint. Either way the server treats it as a read, with an ETag.
+        if (method === "GET") {
+            const headers = {
+                Accept: "application/json",
+                "X-CSRFToken":
+                    getCookieFromCookieString("csrftoken", document.cookie) ?? "",
+            };
+            const {status, data} = await conditionalFetch(
+                url,
+                payload == null
+                    ? {headers}
+                    : {
+                          method: "POST",
+                          body: JSON.stringify(payload),
+                          headers: {...headers, "Content-Type": "application/json"},
+                      },
+            );
+            return resultFromStatus(status, data);
+        }
         const response = await fetch(url, {
-            method,
-            body: isGet ? null : JSON.stringify(payload),
+            method: "POST",
+            body: JSON.stringify(payload),
             headers: {
                 Accept: "application/json",
-                ...(isGet ? {} : {"Content-Type": "application/json"}),
+                "Content-Type": "application/json",
                 "X-CSRFToken":
                     getCookieFromCookieString("csrftoken", document.cookie) ?? "",
             },
@@ -90,3 +180,333 @@ export const defaultRequester: Requester = async (url, payload, method) => {
         exception: null,
     };
 };
+
+type PendingCall = {
+    url: string;
+    payload: JSONValue | null;
+    method: "GET" | "POST";
+    call: RequesterCall;
+    resolve: (result: RequesterResult) => void;
+};
+
+// Coalesces the calls made in the same tick into one request to the batch
+// endpoint, in the order they were made. A call on its own, or one without
+// a name, goes to its own URL through `fallback`.
+export const createBatchRequester = ({
+    url = "/rpc/_batch/",
+    fallback = defaultRequester,
+    maxCalls = 50,
+}: {url?: string; fallback?: Requester; maxCalls?: number} = {}): Requester => {
+    let queue: PendingCall[] = [];
+
+    const send = async (calls: PendingCall[]) => {
+        if (calls.length === 1) {
+            const [single] = calls;
+            single.resolve(
+                await fallback(single.url, single.payload, single.method, single.call),
+            );
+            return;
+        }
+
+        try {
+            const response = await fetch(url, {
+                method: "POST",
+                body: JSON.stringify(
+                    calls.map(({call, payload}) => ({...call, input: payload})),
+                ),
+                headers: {
+                    Accept: "application/json",
+                    "Content-Type": "application/json",
+                    "X-CSRFToken":
+                        getCookieFromCookieString("csrftoken", document.cookie) ?? "",
+                },
+            });
+            if (response.status !== 200) {
+                // The batch as a whole was refused, by the CSRF check say.
+                const result = resultFromStatus(response.status, null);
+                calls.forEach(({resolve}) => resolve(result));
+                return;
+            }
+            const results: {status: number; data: any}[] = await response.json();
+            calls.forEach(({resolve}, index) => {
+                const {status, data} = results[index];
+                resolve(resultFromStatus(status, data));
+            });
+        } catch (error) {
+            calls.forEach(({resolve}) => resolve({type: "exception", exception: error}));
+        }
+    };
+
+    const flush = () => {
+        const calls = queue;
+        queue = [];
+        for (let start = 0; start < calls.length; start += maxCalls) {
+            send(calls.slice(start, start + maxCalls));
+        }
+    };
+
+    return (callUrl, payload, method, call) => {
+        if (call == null) {
+            return fallback(callUrl, payload, method);
+        }
+        return new Promise((resolve) => {
+            queue.push({url: callUrl, payload, method, call, resolve});
+            if (queue.length === 1) {
+                setTimeout(flush, 0);
+            }
+        });
+    };
+};
+
+export const batchRequester = createBatchRequester();
+
+// A position in a paginated query's results. Only the server makes them, and
+// the brand keeps one query's cursors from being passed to another.
+export type Cursor<T extends string = string> = string & {readonly __cursor: T};
+
+export type Page<TItem, TCursor extends string = string> = {
+    items: TItem[];
+    next: TCursor | null;
+};
+
+type PageResult<TItem, TCursor extends string> =
+    | {type: "success"; data: Page<TItem, TCursor>}
+    | Exclude<RequesterResult, {type: "success"}>;
+
+// Loads a paginated query one page at a time, keeping every page loaded so
+// far. `fetchPage` calls the query with the given cursor, null for the first
+// page:
+//
+//     const operas = usePaginatedQuery((cursor) =>
+//         server.operas.list_operas({cursor, limit: 20}),
+//     );
+//
+// Changing `deps` starts over from the first page.
+export const usePaginatedQuery = <TItem, TCursor extends string>(
+    fetchPage: (cursor: TCursor | null) => Promise<PageResult<TItem, TCursor>>,
+    deps: React.DependencyList = [],
+) => {
+    const [items, setItems] = React.useState<TItem[]>([]);
+    const [next, setNext] = React.useState<TCursor | null>(null);
+    const [isDone, setIsDone] = React.useState(false);
+    const [isLoading, setIsLoading] = React.useState(false);
+    const [error, setError] = React.useState<Exclude<
+        RequesterResult,
+        {type: "success"}
+    > | null>(null);
+    // Bumped on reset, so a page that arrives after one is dropped.
+    const generation = React.useRef(0);
+    const loading = React.useRef(false);
+
+    const load = React.useCallback(
+        async (cursor: TCursor | null) => {
+            if (loading.current) {
+                return;
+            }
+            loading.current = true;
+            setIsLoading(true);
+            const current = generation.current;
+            const result = await fetchPage(cursor);
+            if (current !== generation.current) {
+                return;
+            }
+            loading.current = false;
+            setIsLoading(false);
+            if (result.type !== "success") {
+                setError(result);
+                return;
+            }
+            setError(null);
+            setItems((previous) =>
+                cursor == null ? result.data.items : [...previous, ...result.data.items],
+            );
+            setNext(result.data.next);
+            setIsDone(result.data.next == null);
+        },
+        deps,
+    );
+
+    const reset = React.useCallback(() => {
+        generation.current += 1;
+        loading.current = false;
+        setItems([]);
+        setNext(null);
+        setIsDone(false);
+        setError(null);
+        load(null);
+    }, [load]);
+
+    React.useEffect(reset, [reset]);
+
+    const loadMore = React.useCallback(() => {
+        if (next != null) {
+            load(next);
+        }
+    }, [load, next]);
+
+    return {items, error, isLoading, hasMore: !isDone, loadMore, reset};
+};
+
+// Opens a long-lived response: a GET for a call without input, a POST with it
+// as a JSON body otherwise.
+const openStream = async (
+    url: string,
+    payload: JSONValue | null,
+    method: "GET" | "POST",
+    accept: string,
+    signal?: AbortSignal,
+) => {
+    const headers = {
+        Accept: accept,
+        "X-CSRFToken": getCookieFromCookieString("csrftoken", document.cookie) ?? "",
+    };
+    const response =
+        method === "GET" && payload == null
+            ? await fetch(url, {headers, signal})
+            : await fetch(url, {
+                  method: "POST",
+                  body: JSON.stringify(payload),
+                  headers: {...headers, "Content-Type": "application/json"},
+                  signal,
+              });
+    if (response.status !== 200 || response.body == null) {
+        throw new Error(`Streaming ${url} failed with status ${response.status}`);
+    }
+    return response.body;
+};
+
+async function* readLines(body: ReadableStream<Uint8Array>): AsyncGenerator<string> {
+    const reader = body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffered = "";
+    try {
+        while (true) {
+            const {done, value} = await reader.read();
+            if (done) {
+                break;
+            }
+            const lines = (buffered + value).split("\n");
+            buffered = lines.pop() ?? "";
+            yield* lines;
+        }
+        if (buffered !== "") {
+            yield buffered;
+        }
+    } finally {
+        reader.cancel();
+    }
+}
+
+// Reads a streaming RPC's NDJSON body one row at a time, so memory stays flat
+// however many rows there are:
+//
+//     for await (const opera of server.operas.export_operas()) {
+//         ...
+//     }
+export async function* readStream<T>(
+    url: string,
+    payload: JSONValue | null,
+    method: "GET" | "POST",
+): AsyncGenerator<T> {
+    const body = await openStream(url, payload, method, "application/x-ndjson");
+    for await (const line of readLines(body)) {
+        if (line !== "") {
+            yield JSON.parse(line) as T;
+        }
+    }
+}
+
+const applyMergePatch = (target: unknown, patch: unknown): unknown => {
+    if (patch === null || typeof patch !== "object" || Array.isArray(patch)) {
+        return patch;
+    }
+    const result: Record<string, unknown> =
+        target !== null && typeof target === "object" && !Array.isArray(target)
+            ? {...(target as Record<string, unknown>)}
+            : {};
+    for (const [key, value] of Object.entries(patch)) {
+        if (value === null) {
+            delete result[key];
+        } else {
+            result[key] = applyMergePatch(result[key], value);
+        }
+    }
+    return result;
+};
+
+export class SubscriptionError extends Error {
+    constructor(
+        public status: number,
+        public data: unknown,
+    ) {
+        super(`Subscription failed with status ${status}`);
+    }
+}
+
+// Reads a subscribed query's server-sent events: its output now, then again
+// each time it changes. Ends with a SubscriptionError when a run fails, as
+// when the subscriber loses access.
+//
+//     for await (const roles of server.operas.subscribe_opera_roles({opera_id})) {
+//         ...
+//     }
+export async function* subscribeQuery<T>(
+    url: string,
+    payload: JSONValue | null,
+    method: "GET" | "POST",
+    signal?: AbortSignal,
+): AsyncGenerator<T> {
+    const body = await openStream(url, payload, method, "text/event-stream", signal);
+    let current: unknown = null;
+    let event = "message";
+    let data = "";
+    for await (const line of readLines(body)) {
+        if (line.startsWith("event:")) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith("data:")) {
+            data += line.slice(5).trim();
+        } else if (line === "" && data !== "") {
+            const parsed = JSON.parse(data);
+            if (event === "error") {
+                throw new SubscriptionError(parsed.status, parsed.data);
+            }
+            current = event === "patch" ? applyMergePatch(current, parsed) : parsed;
+            yield current as T;
+            event = "message";
+            data = "";
+        }
+    }
+}
+
+// The latest output of a subscribed query, null until the first arrives.
+// Changing `deps` subscribes again, and unmounting closes the stream.
+//
+//     const {data, error} = useSubscription(
+//         (signal) => server.operas.subscribe_opera_roles({opera_id}, signal),
+//         [opera_id],
+//     );
+export const useSubscription = <T,>(
+    subscribe: (signal: AbortSignal) => AsyncIterable<T>,
+    deps: React.DependencyList = [],
+) => {
+    const [data, setData] = React.useState<T | null>(null);
+    const [error, setError] = React.useState<unknown>(null);
+
+    React.useEffect(() => {
+        const controller = new AbortController();
+        setError(null);
+        (async () => {
+            try {
+                for await (const value of subscribe(controller.signal)) {
+                    setData(value);
+                }
+            } catch (caught) {
+                if (!controller.signal.aborted) {
+                    setError(caught);
+                }
+            }
+        })();
+        return () => controller.abort();
+    }, deps);
+
+    return {data, error};
+};
@@ -1,15 +1,30 @@
 import express from "express";
+import fs from "node:fs";
 import path from "node:path";
 import http from "node:http";
 import os from "node:os";
 import {SSRErrorResponse, serializeError} from "./errors.js";
 import {render} from "./render.mjs";
+import {createFramedServer} from "./framed.mjs";
 
-const socketPath = path.join(os.tmpdir(), `reactivated.${process.pid}.sock`);
+// Python picks the socket when it spawns us, so a restarted renderer comes
+// back where the old one was. The framed transport listens next to it.
+const socketPath =
+    process.env.REACTIVATED_SOCKET ??
+    path.join(os.tmpdir(), `reactivated.${process.pid}.sock`);
+const framedSocketPath = socketPath.replace(/\.sock$/, ".framed.sock");
+
+// A renderer that crashed leaves its sockets behind.
+fs.rmSync(socketPath, {force: true});
+fs.rmSync(framedSocketPath, {force: true});
 
 const app = express();
 
 app.use(express.json({limit: "200mb"}));
+// The supervisor's liveness check: answered only while the event loop is.
+app.get("/_reactivated/ping", (req, res) => {
+    res.send("pong");
+});
 app.use("/_reactivated/", async (req, res) => {
     try {
         render(req, res, "", "production", "index");
@@ -22,10 +37,14 @@ app.use("/_reactivated/", async (req, res) => {
 });
 
 const server = http.createServer(app);
-server.listen(socketPath, () => {
-    process.stdout.write(`RENDERER:${socketPath}:LISTENING`);
+const framedServer = createFramedServer(render);
+framedServer.listen(framedSocketPath, () => {
+    server.listen(socketPath, () => {
+        process.stdout.write(`RENDERER:${socketPath}:LISTENING\n`);
+    });
 });
 
 process.on("SIGTERM", () => {
     server.close();
+    framedServer.close();
 });
@@ -22,6 +22,7 @@ from .generation import generate as generate
 from .generation import run_generate_callbacks
 from .models import computed_foreign_key as computed_foreign_key  # noqa: F401
 from .models import computed_relation as computed_relation  # noqa: F401
+from .models import depends_on as depends_on  # noqa: F401
 from .pick import Pick as Pick  # noqa: F401
 from .pick import pick as pick  # noqa: F401
 from .templates import Template as Template  # noqa: F401
@@ -4,6 +4,8 @@ from typing import Annotated, Any, Callable, Literal, get_type_hints
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.http import HttpRequest
 from django.utils.functional import LazyObject
 from django.utils.module_loading import import_string
@@ -99,6 +101,7 @@ def register_processor_type(processor_path: str, pick: type[Pick]) -> None:
     """Override the typed shape for a context processor (usually one of
     Django's untyped builtins)."""
     TYPE_HINTS[processor_path] = {"return": pick}
+    clear_context_cache()
 
 
 class BaseContext(Pick):
@@ -129,6 +132,24 @@ def get_annotation_or_type_hints(item: Any) -> dict[str, Any]:
 
 _context_processors: list[Callable[[HttpRequest], dict[str, Any]]] | None = None
 _context_processor_paths: list[str] | None = None
+_context_class: type[Pick] | None = None
+
+
+def clear_context_cache() -> None:
+    """Forget the resolved processors and the compiled Context model. Runs
+    on ``register_processor_type`` and whenever ``TEMPLATES`` changes (e.g.
+    ``override_settings`` in tests); call it directly after swapping a
+    processor's annotations at runtime."""
+    global _context_processors, _context_processor_paths, _context_class
+    _context_processors = None
+    _context_processor_paths = None
+    _context_class = None
+
+
+@receiver(setting_changed)
+def _clear_context_cache_on_templates_change(setting: str, **kwargs: Any) -> None:
+    if setting == "TEMPLATES":
+        clear_context_cache()
 
 
 def get_context_processor_paths() -> list[str]:
@@ -166,6 +187,17 @@ def get_context_processors() -> list[Callable[[HttpRequest], dict[str, Any]]]:
 
 
 def get_context_class() -> type[Pick]:
+    """The Context model for the configured processors. Built once — this
+    imports every processor, resolves its return annotation, and compiles a
+    pydantic model — and reused by every render until
+    ``clear_context_cache``."""
+    global _context_class
+    if _context_class is None:
+        _context_class = build_context_class()
+    return _context_class
+
+
+def build_context_class() -> type[Pick]:
     context_processors: list[str] = get_context_processor_paths()
 
     all_fields: dict[str, Any] = {}
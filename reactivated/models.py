@@ -111,3 +111,30 @@ def computed_foreign_key(
         )
 
     return inner
+
+
+TComputed = TypeVar("TComputed")
+
+
+def depends_on(*paths: str) -> Callable[[TComputed], TComputed]:
+    """Declare the model fields a property, method or computed relation
+    reads, as pick-style dotted paths. Picks that serialize it then load
+    those columns (and join those relations) instead of deferring them and
+    reloading each row on access."""
+
+    def inner(computed: TComputed) -> TComputed:
+        target = (
+            computed.fget
+            if isinstance(computed, (property, ComputedRelation))
+            else computed
+        )
+        target.depends_on = paths  # type: ignore[union-attr]
+        return computed
+
+    return inner
+
+
+def get_depends_on(computed: Any) -> tuple[str, ...] | None:
+    if isinstance(computed, (property, ComputedRelation)):
+        computed = computed.fget
+    return getattr(computed, "depends_on", None)
@@ -0,0 +1,134 @@
+"""Caching rendered HTML.
+
+Server rendering is a function of its payload: the same template, props and
+context make the same page. With ``REACTIVATED_RENDER_CACHE`` naming one of
+your ``CACHES``, each render is stored under a digest of that payload and
+the release, and identical renders are answered from the cache without a
+trip to Node. Eviction is the cache backend's: ``LocMemCache`` is an LRU
+bounded by ``MAX_ENTRIES``, and entries expire after
+``REACTIVATED_RENDER_CACHE_TIMEOUT`` seconds.
+
+Two context values change on every request without changing the page: the
+CSRF token, which Django masks afresh each time it is read, and the CSP
+nonce. Both are swapped for placeholders in the payload before it is
+digested and sent to Node, and the real values are put back into the HTML on the way out,
+so a cached page never holds another request's token or nonce.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+
+# Plain lowercase letters, so JSON and HTML escaping leave them untouched
+# wherever the page embeds them.
+CSRF_TOKEN_PLACEHOLDER = "reactivatedcsrftokenplaceholder"
+CSP_NONCE_PLACEHOLDER = "reactivatedcspnonceplaceholder"
+
+
+class RenderCacheStats:
+    """Hits and misses for this process since it started, or since the
+    last ``reset()``."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+render_cache_stats = RenderCacheStats()
+
+
+def get_render_cache() -> BaseCache | None:
+    alias = getattr(settings, "REACTIVATED_RENDER_CACHE", None)
+    return None if alias is None else caches[alias]
+
+
+def get_secrets(csrf_token: Any, csp_nonce: Any) -> dict[str, str]:
+    """The per-request values in a render's context, keyed by the
+    placeholder that stands in for each."""
+    secrets = {}
+    if isinstance(csrf_token, str) and csrf_token:
+        secrets[CSRF_TOKEN_PLACEHOLDER] = csrf_token
+    if isinstance(csp_nonce, str) and csp_nonce:
+        secrets[CSP_NONCE_PLACEHOLDER] = csp_nonce
+    return secrets
+
+
+def redact(data: bytes, secrets: dict[str, str]) -> bytes:
+    """``data`` with each per-request value swapped for its placeholder."""
+    for placeholder, value in secrets.items():
+        data = data.replace(value.encode(), placeholder.encode())
+    return data
+
+
+class CachedRender:
+    """One render's entry in the cache: the payload to send Node on a miss,
+    with placeholders for the per-request values, the key it is stored
+    under, and the values to put back."""
+
+    def __init__(
+        self,
+        cache: BaseCache,
+        data: bytes,
+        template_name: str | None,
+        secrets: dict[str, str],
+    ) -> None:
+        self.cache = cache
+        self.secrets = {
+            placeholder.encode(): value.encode()
+            for placeholder, value in secrets.items()
+        }
+        self.data = data = redact(data, secrets)
+
+        digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+        release = os.environ.get("RELEASE_VERSION", "")
+        self.key = f"reactivated:render:{template_name}:{release}:{digest}"
+
+    def fill(self, html: bytes) -> bytes:
+        for placeholder, value in self.secrets.items():
+            html = html.replace(placeholder, value)
+        return html
+
+    def get(self) -> bytes | None:
+        html = self.cache.get(self.key)
+        render_cache_stats.record(html is not None)
+        return None if html is None else self.fill(html)
+
+    async def aget(self) -> bytes | None:
+        html = await self.cache.aget(self.key)
+        render_cache_stats.record(html is not None)
+        return None if html is None else self.fill(html)
+
+    def set(self, html: bytes) -> bytes:
+        self.cache.set(self.key, html, get_render_cache_timeout())
+        return self.fill(html)
+
+    async def aset(self, html: bytes) -> bytes:
+        await self.cache.aset(self.key, html, get_render_cache_timeout())
+        return self.fill(html)
+
+
+def get_render_cache_timeout() -> float | None:
+    return getattr(settings, "REACTIVATED_RENDER_CACHE_TIMEOUT", 300)
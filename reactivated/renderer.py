@@ -1,19 +1,35 @@
+from __future__ import annotations
+
+import asyncio
 import atexit
+import contextlib
+import itertools
 import logging
+import multiprocessing
 import os
+import queue
 import re
+import socket
+import struct
 import subprocess
+import tempfile
+import threading
+import time
 import urllib.parse
-from typing import Any
+import weakref
+from typing import Any, AsyncIterator, Callable, Iterator, NamedTuple
 
 import requests
 import requests_unixsocket
 import simplejson
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.http import HttpRequest
 from django.utils.html import escape
 
-renderer_process_addr: str | None = None
+from .render_cache import CachedRender, get_render_cache, get_secrets, redact
+from .utils import make_etag
+
 logger = logging.getLogger("django.server")
 
 
@@ -21,16 +37,187 @@ class SSRError(RuntimeError):
     pass
 
 
-def wait_and_get_addr() -> str:
-    if renderer := os.environ.get("REACTIVATED_RENDERER", None):
-        return renderer
+class RendererPool:
+    """A set of renderer addresses and their outstanding-request counts.
+
+    Dispatch is least-outstanding-requests, with ties broken by a rotating
+    cursor seeded from the pid: a sync Django worker only ever has one
+    render in flight, so without the rotation every worker would tie-break
+    to the first renderer. Renderers the supervisor has marked down are
+    skipped while any other is up.
+
+    The counts live in shared memory. A pool started before the fork —
+    ``start_renderer_pool(prefork=True)`` from gunicorn's ``on_starting``
+    hook, or at import time under ``preload_app`` — is inherited by every
+    worker, so the renderers and the load accounting are shared host-wide
+    instead of each Django process owning a private renderer.
+
+    Each render in flight is recorded against the pid that started it, so
+    the renders of a worker killed mid-render, by a gunicorn timeout say,
+    can be dropped by ``reap()`` instead of counting against their renderer
+    forever."""
+
+    # Renders in flight per renderer that can be attributed to a process.
+    # Past that, renders still dispatch, but go uncounted.
+    SLOTS = 64
+
+    def __init__(
+        self,
+        addresses: list[str],
+        processes: list[subprocess.Popen[str]] | None = None,
+    ) -> None:
+        assert addresses, "A renderer pool needs at least one address"
+        self.addresses = addresses
+        self.processes = processes or []
+        self.owner_pid = os.getpid()
+        # Row per renderer, one pid per render in flight, 0 when free.
+        self.holders = multiprocessing.Array("i", len(addresses) * self.SLOTS)
+        self.down = multiprocessing.Array("b", len(addresses))
+        self.supervisor: RendererSupervisor | None = None
+        self._cursor = itertools.count()
+
+    @property
+    def outstanding(self) -> list[int]:
+        """Renders in flight on each renderer."""
+        with self.holders.get_lock():
+            return self._counts()
+
+    def _counts(self) -> list[int]:
+        return [
+            sum(1 for pid in self.holders[row : row + self.SLOTS] if pid)
+            for row in range(0, len(self.holders), self.SLOTS)
+        ]
+
+    def _claim(self, index: int) -> int | None:
+        start = index * self.SLOTS
+        for slot in range(start, start + self.SLOTS):
+            if not self.holders[slot]:
+                self.holders[slot] = os.getpid()
+                return slot
+        return None
+
+    @contextlib.contextmanager
+    def acquire(self, exclude: str | None = None) -> Iterator[str]:
+        """Reserve the least-loaded renderer for the duration of one render,
+        other than ``exclude`` if there is a choice."""
+        size = len(self.addresses)
+
+        with self.holders.get_lock():
+            outstanding = self._counts()
+            # The pid keeps forked workers, which inherit the same cursor,
+            # from rotating in lockstep.
+            offset = os.getpid() + next(self._cursor)
+            index = min(
+                ((offset + step) % size for step in range(size)),
+                key=lambda candidate: (
+                    self.addresses[candidate] == exclude,
+                    self.down[candidate],
+                    outstanding[candidate],
+                ),
+            )
+            slot = self._claim(index)
+            if slot is None and self._reap():
+                slot = self._claim(index)
+
+        try:
+            yield self.addresses[index]
+        finally:
+            if slot is not None:
+                with self.holders.get_lock():
+                    self.holders[slot] = 0
+
+    def reap(self) -> int:
+        """Drop the renders of processes that have exited; how many."""
+        with self.holders.get_lock():
+            return self._reap()
+
+    def _reap(self) -> int:
+        alive: dict[int, bool] = {}
+        reaped = 0
+        for slot, pid in enumerate(self.holders[:]):
+            if not pid:
+                continue
+            if pid not in alive:
+                alive[pid] = _is_alive(pid)
+            if not alive[pid]:
+                self.holders[slot] = 0
+                reaped += 1
+        return reaped
+
+    def terminate(self) -> None:
+        # Forked workers inherit this atexit hook; only the process that
+        # spawned the renderers may stop them.
+        if os.getpid() != self.owner_pid:
+            return
+        if self.supervisor is not None:
+            self.supervisor.stop()
+        for process in self.processes:
+            process.terminate()
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RendererMetrics:
+    """Boot and restart timings for the renderers this process spawned."""
+
+    def __init__(self) -> None:
+        self.cold_starts: list[float] = []
+        self.restarts: list[float] = []
+        self._lock = threading.Lock()
+
+    def record_cold_start(self, seconds: float) -> None:
+        with self._lock:
+            self.cold_starts.append(seconds)
+
+    def record_restart(self, seconds: float) -> None:
+        with self._lock:
+            self.restarts.append(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "cold_start_seconds": max(self.cold_starts, default=None),
+                "restarts": len(self.restarts),
+                "last_restart_seconds": self.restarts[-1] if self.restarts else None,
+            }
+
+
+renderer_metrics = RendererMetrics()
+
+renderer_pool: RendererPool | None = None
+_renderer_pool_lock = threading.Lock()
+
 
-    global renderer_process_addr
+def get_renderer_workers(prefork: bool = False) -> int:
+    """``REACTIVATED_RENDERER_WORKERS``, or else one renderer per core for a
+    pool shared by every worker, and a single one for a process's own."""
+    workers: int | None = getattr(settings, "REACTIVATED_RENDERER_WORKERS", None)
+    if workers:
+        return workers
+    return (os.cpu_count() or 1) if prefork else 1
 
-    if renderer_process_addr is not None:
-        return renderer_process_addr
 
-    renderer_process = subprocess.Popen(
+def _renderer_socket(index: int) -> str:
+    # Chosen here rather than by Node so a restarted renderer comes back on
+    # the same path, which forked workers already have.
+    return os.path.join(
+        tempfile.gettempdir(), f"reactivated.{os.getpid()}.{index}.sock"
+    )
+
+
+def _spawn_renderer(address: str | None = None) -> subprocess.Popen[str]:
+    environment = {**os.environ.copy(), "NODE_ENV": "production"}
+    if address is not None:
+        environment["REACTIVATED_SOCKET"] = address
+    return subprocess.Popen(
         [
             "node",
             f"{settings.BASE_DIR}/node_modules/_reactivated/renderer.mjs",
@@ -38,19 +225,208 @@ def wait_and_get_addr() -> str:
         encoding="utf-8",
         stdout=subprocess.PIPE,
         cwd=settings.BASE_DIR,
-        env={**os.environ.copy(), "NODE_ENV": "production"},
+        env=environment,
+    )
+
+
+def _wait_for_address(renderer_process: subprocess.Popen[str]) -> str:
+    """Read the renderer's output up to its ``RENDERER:<address>:LISTENING``
+    line, then keep forwarding the rest to the log: left unread, a full pipe
+    would block the renderer on its next write."""
+    assert renderer_process.stdout is not None
+
+    for line in renderer_process.stdout:
+        if match := re.search(r"RENDERER:(.*?):LISTENING", line):
+            threading.Thread(
+                target=_forward_output, args=(renderer_process,), daemon=True
+            ).start()
+            return match.group(1).strip()
+        logger.info("Renderer: %s", line.rstrip())
+
+    raise SSRError(
+        f"The renderer exited with {renderer_process.wait()} before listening"
     )
-    atexit.register(lambda: renderer_process.terminate())
 
-    output = ""
 
-    for c in iter(lambda: renderer_process.stdout.read(1), b""):  # type: ignore[union-attr]
-        output += c
+def _forward_output(renderer_process: subprocess.Popen[str]) -> None:
+    assert renderer_process.stdout is not None
+    for line in renderer_process.stdout:
+        logger.info("Renderer: %s", line.rstrip())
+
+
+class RendererSupervisor:
+    """Restarts renderers that exit or stop answering.
+
+    Every ``interval`` seconds, each renderer is checked for having exited,
+    and pinged every ``ping_every`` checks; ``max_missed_pings`` unanswered
+    pings in a row mean its event loop is stuck. A failed renderer is marked
+    down, so renders go elsewhere, and respawned on the same socket after a
+    backoff that doubles with each consecutive failure, up to
+    ``max_backoff`` seconds. It runs in the process that spawned the
+    renderers; forked workers inherit the restarted renderers through their
+    unchanged addresses."""
+
+    def __init__(
+        self,
+        pool: RendererPool,
+        *,
+        interval: float = 1.0,
+        ping_every: int = 5,
+        max_missed_pings: int = 3,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.pool = pool
+        self.interval = interval
+        self.ping_every = ping_every
+        self.max_missed_pings = max_missed_pings
+        self.max_backoff = max_backoff
+        self.failures = [0] * len(pool.addresses)
+        self.missed_pings = [0] * len(pool.addresses)
+        self._started = [time.monotonic()] * len(pool.addresses)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="reactivated-renderer-supervisor", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        for check in itertools.count(1):
+            if self._stopped.wait(self.interval):
+                return
+            if reaped := self.pool.reap():
+                logger.warning("Dropped %d renders of exited workers", reaped)
+            for index in range(len(self.pool.addresses)):
+                if self.is_failed(index, ping=check % self.ping_every == 0):
+                    self.restart(index)
+
+    def ping(self, address: str) -> bool:
+        try:
+            response = request_renderer(
+                "GET", address, "/_reactivated/ping", timeout=self.interval * 5
+            )
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+
+    def is_failed(self, index: int, ping: bool) -> bool:
+        if self.pool.processes[index].poll() is not None:
+            logger.error("Renderer %s exited", self.pool.addresses[index])
+            return True
+        if not ping:
+            return False
+        if self.ping(self.pool.addresses[index]):
+            self.missed_pings[index] = 0
+            return False
+        self.missed_pings[index] += 1
+        if self.missed_pings[index] < self.max_missed_pings:
+            return False
+        logger.error("Renderer %s stopped answering", self.pool.addresses[index])
+        return True
+
+    def restart(self, index: int) -> None:
+        began = time.monotonic()
+        address = self.pool.addresses[index]
+        self.pool.down[index] = 1
+        self.missed_pings[index] = 0
+
+        # A renderer that stayed up a while starts the backoff over.
+        if began - self._started[index] > self.max_backoff * 2:
+            self.failures[index] = 0
+        backoff = min(self.max_backoff, 0.5 * 2 ** self.failures[index])
+        self.failures[index] += 1
+
+        old = self.pool.processes[index]
+        old.kill()
+        old.wait()
+        if self._stopped.wait(backoff):
+            return
+
+        process = _spawn_renderer(address)
+        self.pool.processes[index] = process
+        try:
+            _wait_for_address(process)
+        except SSRError:
+            logger.exception("Renderer %s failed to restart", address)
+            return
+
+        self._started[index] = time.monotonic()
+        self.pool.down[index] = 0
+        renderer_metrics.record_restart(self._started[index] - began)
+        logger.info(
+            "Renderer %s restarted in %.2fs", address, self._started[index] - began
+        )
+
+
+def start_renderer_pool(
+    workers: int | None = None, *, prefork: bool = False
+) -> RendererPool:
+    """Start the renderer pool, or return the one already running.
+
+    ``REACTIVATED_RENDERER`` (one address, or several separated by commas)
+    points at renderers managed elsewhere and spawns nothing. Otherwise
+    ``workers`` Node processes are spawned — ``REACTIVATED_RENDERER_WORKERS``
+    by default — and supervised. Call this with ``prefork=True`` in the
+    parent process before forking to share one pool across all Django
+    workers; without a setting, that pool gets one renderer per core, and a
+    pool each process starts for itself gets one."""
+    global renderer_pool
+
+    with _renderer_pool_lock:
+        if renderer_pool is not None:
+            return renderer_pool
 
-        if matches := re.findall(r"RENDERER:(.*?):LISTENING", output):
-            renderer_process_addr = matches[0].strip()
-            return renderer_process_addr
-    assert False, "Could not bind to renderer"
+        if renderer := os.environ.get("REACTIVATED_RENDERER", None):
+            renderer_pool = RendererPool(
+                [address.strip() for address in renderer.split(",") if address]
+            )
+            return renderer_pool
+
+        # Spawn everything first so the Node processes boot concurrently.
+        began = time.monotonic()
+        addresses = [
+            _renderer_socket(index)
+            for index in range(workers or get_renderer_workers(prefork))
+        ]
+        processes = [_spawn_renderer(address) for address in addresses]
+        for process in processes:
+            _wait_for_address(process)
+        renderer_metrics.record_cold_start(time.monotonic() - began)
+
+        pool = RendererPool(addresses, processes)
+        pool.supervisor = RendererSupervisor(pool)
+        pool.supervisor.start()
+        atexit.register(pool.terminate)
+        renderer_pool = pool
+        return pool
+
+
+def boot_renderer_pool(*, prefork: bool = False) -> None:
+    """Start the pool before serving, so the first request doesn't wait for
+    Node. Call it from a serving entry point, such as ``wsgi.py`` or
+    gunicorn's ``on_starting`` hook, and never from anything every
+    management command loads. ``prefork`` is as for
+    ``start_renderer_pool()``."""
+    if getattr(settings, "REACTIVATED_SERVER", False) is None:
+        return
+    pool = start_renderer_pool(prefork=prefork)
+    if pool.processes:
+        logger.info(
+            "Started %d renderers in %.2fs",
+            len(pool.processes),
+            renderer_metrics.snapshot()["cold_start_seconds"],
+        )
+
+
+def wait_and_get_addr() -> str:
+    """The first renderer address. Renders dispatch through
+    ``start_renderer_pool().acquire()``; this remains for callers that just
+    need somewhere to send a request."""
+    return start_renderer_pool().addresses[0]
 
 
 def get_accept_list(request: HttpRequest) -> list[str]:
@@ -75,58 +451,759 @@ def should_respond_with_json(request: HttpRequest) -> bool:
 session = requests_unixsocket.Session()  # type: ignore[no-untyped-call]
 
 
-def render_jsx_to_string(
-    request: HttpRequest,
-    context: Any,
-    props: Any,
-    entry_point: str | None = None,
-) -> str:
-    respond_with_json = should_respond_with_json(request)
+def get_renderer_timeout() -> float | None:
+    """Seconds a render may take before it is abandoned, or ``None`` to wait
+    forever. ``REACTIVATED_RENDERER_TIMEOUT``, 30 seconds by default."""
+    return getattr(settings, "REACTIVATED_RENDERER_TIMEOUT", 30.0)
+
 
+def _socket_path(address: str) -> str:
+    # Sometimes we are running tests and the CWD is outside BASE_DIR.  For
+    # example, the reactivated tests themselves.  Instead of using BASE_DIR as
+    # the prefix, we calculate the relative path to avoid the 100 character
+    # UNIX socket limit.
+    # But dots do not work for relative paths with sockets so we clear it.
+    rel_path = os.path.relpath(settings.BASE_DIR)
+    return address if rel_path == "." else os.path.join(rel_path, address)
+
+
+def request_renderer(
+    method: str, address: str, path: str, **kwargs: Any
+) -> requests.Response:
+    if "sock" in address:
+        socket = urllib.parse.quote_plus(_socket_path(address))
+        return session.request(method, f"http+unix://{socket}{path}", **kwargs)
+    return session.request(method, f"{address}{path}", **kwargs)
+
+
+def post_to_renderer(
+    address: str, *, headers: dict[str, str], data: str | bytes, stream: bool = False
+) -> requests.Response:
+    return request_renderer(
+        "POST",
+        address,
+        "/_reactivated/",
+        headers=headers,
+        data=data,
+        stream=stream,
+        timeout=get_renderer_timeout(),
+    )
+
+
+class RenderPayload(NamedTuple):
+    """A render as Node receives it: the UTF-8 JSON request body, the
+    template it names, and the per-request values in its context that the
+    render cache keeps out of its keys."""
+
+    data: bytes
+    template_name: str | None = None
+    secrets: dict[str, str] = {}
+
+
+def serialize_payload(
+    context: Any, props: Any, entry_point: str | None = None
+) -> RenderPayload:
     payload: dict[str, Any] = {"context": context, "props": props}
     if entry_point is not None:
         payload["entry_point"] = entry_point
-    data = simplejson.dumps(payload)
-    headers = {"Content-Type": "application/json"}
 
+    template_name = secrets = None
+    if isinstance(context, dict):
+        template_name = context.get("template_name")
+        request = context.get("request")
+        secrets = get_secrets(
+            context.get("csrf_token"),
+            request.get("csp_nonce") if isinstance(request, dict) else None,
+        )
+    return RenderPayload(
+        simplejson.dumps(payload).encode(), template_name, secrets or {}
+    )
+
+
+def _render_without_renderer(
+    request: HttpRequest, payload: RenderPayload
+) -> bytes | None:
+    """The responses that never reach Node: the debug view, and the raw JSON
+    for ``?format=json``, ``Accept: application/json``, ``?raw`` or
+    ``REACTIVATED_SERVER = None``."""
     if "debug" in request.GET:
-        return f"<html><body><h1>Debug response</h1><pre>{escape(data)}</pre></body></html>"
+        data = escape(payload.data.decode())
+        return f"<html><body><h1>Debug response</h1><pre>{data}</pre></body></html>".encode()
     elif (
-        respond_with_json
+        should_respond_with_json(request)
         or "raw" in request.GET
         or getattr(settings, "REACTIVATED_SERVER", False) is None
     ):
         request._is_reactivated_response = True  # type: ignore[attr-defined]
-        return data
+        # Tagged without the CSRF token and CSP nonce, which change on every
+        # request, so an unchanged page can be answered with a 304. A client
+        # keeping its last token is fine: masked tokens stay valid as long as
+        # the CSRF secret does, and the secret is part of the tag.
+        request._reactivated_etag = make_etag(  # type: ignore[attr-defined]
+            redact(payload.data, payload.secrets)
+            + b"\0"
+            + request.META.get("CSRF_COOKIE", "").encode()
+        )
+        return payload.data
+    return None
 
-    address = wait_and_get_addr()
-    path = "/_reactivated/"
 
-    if "sock" in address:
-        # Sometimes we are running tests and the CWD is outside BASE_DIR.  For
-        # example, the reactivated tests themselves.  Instead of using BASE_DIR as
-        # the prefix, we calculate the relative path to avoid the 100 character
-        # UNIX socket limit.
-        # But dots do not work for relative paths with sockets so we clear it.
-        rel_path = os.path.relpath(settings.BASE_DIR)
-        address = address if rel_path == "." else os.path.join(rel_path, address)
-        socket = urllib.parse.quote_plus(address)
-        response = session.post(
-            f"http+unix://{socket}{path}", headers=headers, data=data
-        )
-    else:
-        response = session.post(f"{address}{path}", headers=headers, data=data)
+def _get_cached_render(payload: RenderPayload) -> CachedRender | None:
+    if (cache := get_render_cache()) is None:
+        return None
+    return CachedRender(cache, payload.data, payload.template_name, payload.secrets)
+
 
-    if response.status_code == 200:
-        return response.text
+def _raise_for_renderer_error(content: bytes) -> None:
+    try:
+        error = simplejson.loads(content)
+    except ValueError:
+        raise Exception(content)
     else:
+        err_details = error.get("error", {})
+        exc = SSRError(err_details.get("message") or "")
+        stack = err_details.get("stack") or ""
+        exc.add_note(f"Client Stack:\n{stack}")
+        raise exc
+
+
+# The framed transport: a persistent connection per renderer, carrying
+# length-prefixed frames of (length, request id, type, payload). See
+# packages/reactivated/src/framed.mts for the Node side.
+FRAME_RENDER = 0x01
+FRAME_RENDER_STREAM = 0x02
+FRAME_CHUNK = 0x11
+FRAME_END = 0x12
+FRAME_ERROR = 0x13
+
+_frame_header = struct.Struct(">IIB")
+
+
+def get_framed_address(address: str) -> str | None:
+    """The framed socket next to a renderer's HTTP socket, when
+    ``REACTIVATED_RENDERER_TRANSPORT = "framed"`` and the renderer is one
+    of ours. Renderers reached over TCP always use HTTP."""
+    if getattr(settings, "REACTIVATED_RENDERER_TRANSPORT", "http") != "framed":
+        return None
+    if not address.endswith(".sock"):
+        return None
+    return _socket_path(f"{address.removesuffix('.sock')}.framed.sock")
+
+
+class FramedRender:
+    """One render in flight on a ``FramedConnection``: its frames, in the
+    order Node sent them."""
+
+    def __init__(
+        self,
+        connection: FramedConnection,
+        request_id: int,
+        frames: queue.SimpleQueue[tuple[int, bytes] | None],
+    ) -> None:
+        self._connection = connection
+        self._request_id = request_id
+        self._frames = frames
+
+    def next_frame(self) -> tuple[int, bytes]:
+        try:
+            frame = self._frames.get(timeout=get_renderer_timeout())
+        except queue.Empty:
+            self.close()
+            raise TimeoutError("The renderer did not answer in time")
+        if frame is None:
+            self.close()
+            raise ConnectionError("The renderer closed the connection")
+        return frame
+
+    def read(self) -> tuple[int, bytes]:
+        """The whole response, as an HTTP status code and a body."""
+        chunks = []
+        while True:
+            kind, payload = self.next_frame()
+            chunks.append(payload)
+            if kind != FRAME_CHUNK:
+                self.close()
+                return (200 if kind == FRAME_END else 500), b"".join(chunks)
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        try:
+            while True:
+                kind, payload = self.next_frame()
+                if payload:
+                    yield payload
+                if kind != FRAME_CHUNK:
+                    return
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        # Frames still on their way for an abandoned render are dropped.
+        self._connection.pending.pop(self._request_id, None)
+
+
+class FramedConnection:
+    """A persistent connection to a renderer's framed socket, shared by
+    every thread in the process. Each render is tagged with a request id,
+    and a reader thread routes every frame Node sends back to the render
+    waiting on it, so renders don't queue behind one another."""
+
+    def __init__(self, path: str) -> None:
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.owner_pid = os.getpid()
+        self.closed = False
+        self.pending: dict[int, queue.SimpleQueue[tuple[int, bytes] | None]] = {}
+        self._ids = itertools.count(1)
+        self._write_lock = threading.Lock()
+        threading.Thread(
+            target=self._read, name="reactivated-framed-renderer", daemon=True
+        ).start()
+
+    def send(self, kind: int, payload: bytes) -> FramedRender:
+        request_id = next(self._ids) % 2**32
+        frames: queue.SimpleQueue[tuple[int, bytes] | None] = queue.SimpleQueue()
+        self.pending[request_id] = frames
+        header = _frame_header.pack(len(payload) + 5, request_id, kind)
+
+        try:
+            with self._write_lock:
+                self.socket.sendall(header + payload)
+        except OSError:
+            self.pending.pop(request_id, None)
+            self.close()
+            raise
+
+        return FramedRender(self, request_id, frames)
+
+    def _read(self) -> None:
+        stream = self.socket.makefile("rb")
+        try:
+            while len(header := stream.read(_frame_header.size)) == _frame_header.size:
+                length, request_id, kind = _frame_header.unpack(header)
+                payload = stream.read(length - 5)
+                if (frames := self.pending.get(request_id)) is not None:
+                    frames.put((kind, payload))
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        with contextlib.suppress(OSError):
+            # Shutting down, not just closing, wakes the reader thread.
+            self.socket.shutdown(socket.SHUT_RDWR)
+        self.socket.close()
+        for frames in list(self.pending.values()):
+            frames.put(None)
+
+
+_framed_connections: dict[str, FramedConnection] = {}
+_framed_connections_lock = threading.Lock()
+
+
+def get_framed_connection(path: str) -> FramedConnection:
+    with _framed_connections_lock:
+        connection = _framed_connections.get(path)
+        # A connection inherited across a fork has no reader thread, and
+        # its socket is still the parent's: leave it be and open our own.
+        if (
+            connection is None
+            or connection.closed
+            or connection.owner_pid != os.getpid()
+        ):
+            connection = _framed_connections[path] = FramedConnection(path)
+        return connection
+
+
+# The renderer went away mid-request: it crashed or is being restarted.
+RENDERER_GONE = (
+    requests.ConnectionError,
+    ConnectionError,
+    FileNotFoundError,
+    asyncio.IncompleteReadError,
+)
+
+
+def _render_attempts() -> Iterator[
+    Callable[[str], contextlib.AbstractContextManager[Any]]
+]:
+    """Two tries at a render, as context managers taking the renderer's
+    address. A renderer that drops the connection has most likely crashed,
+    and the supervisor is already replacing it, so the first such failure is
+    logged and the render tried once more, on another renderer if there is
+    one. Errors from the render itself and timeouts are not retried."""
+
+    @contextlib.contextmanager
+    def first(address: str) -> Iterator[None]:
+        try:
+            yield
+        except RENDERER_GONE:
+            logger.warning("Renderer %s dropped a render, retrying", address)
+
+    yield first
+    yield lambda address: contextlib.nullcontext()
+
+
+def render_payload(
+    request: HttpRequest, payload: RenderPayload, cache: bool = True
+) -> bytes:
+    """Render through Node, or from ``REACTIVATED_RENDER_CACHE`` when one is
+    configured and ``cache`` is true. The payload goes out and the HTML
+    comes back as bytes, with no decoding or re-encoding on the way."""
+    headers = {"Content-Type": "application/json"}
+
+    if (rendered := _render_without_renderer(request, payload)) is not None:
+        return rendered
+
+    cached = _get_cached_render(payload) if cache else None
+    if cached is not None and (html := cached.get()) is not None:
+        return html
+    data = payload.data if cached is None else cached.data
+
+    pool = start_renderer_pool()
+    failed: str | None = None
+    for attempt in _render_attempts():
+        with pool.acquire(exclude=failed) as address, attempt(address):
+            if (framed := get_framed_address(address)) is not None:
+                render = get_framed_connection(framed).send(FRAME_RENDER, data)
+                status_code, content = render.read()
+            else:
+                response = post_to_renderer(address, headers=headers, data=data)
+                status_code, content = response.status_code, response.content
+            break
+        failed = address
+
+    if status_code != 200:
+        _raise_for_renderer_error(content)
+    return content if cached is None else cached.set(content)
+
+
+def render_jsx_to_string(
+    request: HttpRequest,
+    context: Any,
+    props: Any,
+    entry_point: str | None = None,
+    cache: bool = True,
+) -> str:
+    payload = serialize_payload(context, props, entry_point)
+    return render_payload(request, payload, cache=cache).decode()
+
+
+class RendererStream:
+    """The body of a streamed render, chunk by chunk as Node flushes it.
+
+    Holds its renderer until exhausted or closed — Django closes it when the
+    response finishes, even if the client went away before the first chunk.
+    Once the shell is out the status is committed, so a broken stream from
+    the renderer is logged and ends the body early rather than raising."""
+
+    def __init__(self, chunks: Iterator[bytes], release: Callable[[], None]):
+        self._chunks = chunks
+        self._release: Callable[[], None] | None = release
+
+    def __iter__(self) -> "RendererStream":
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self.close()
+            raise
+        except (requests.RequestException, OSError):
+            logger.exception("SSR stream from the renderer broke after the shell")
+            self.close()
+            raise StopIteration
+
+    def close(self) -> None:
+        if self._release is None:
+            return
+        release, self._release = self._release, None
+        release()
+
+
+def render_payload_to_stream(
+    request: HttpRequest, payload: RenderPayload
+) -> bytes | RendererStream:
+    """Like ``render_payload``, but Node flushes the shell as soon as it is
+    ready and the body streams while Suspense boundaries resolve.
+
+    Errors before the shell raise here, exactly as in the buffered path.
+    Responses that never reach Node come back as ``bytes``."""
+    headers = {"Content-Type": "application/json", "X-Reactivated-Stream": "1"}
+
+    if (rendered := _render_without_renderer(request, payload)) is not None:
+        return rendered
+
+    pool = start_renderer_pool()
+    failed: str | None = None
+
+    for attempt in _render_attempts():
+        reservation = contextlib.ExitStack()
+        address = reservation.enter_context(pool.acquire(exclude=failed))
+        try:
+            with attempt(address):
+                chunks = _open_stream(address, headers, payload.data, reservation)
+                return RendererStream(chunks, reservation.close)
+        except BaseException:
+            reservation.close()
+            raise
+        reservation.close()
+        failed = address
+
+    raise AssertionError("unreachable")
+
+
+def render_jsx_to_stream(
+    request: HttpRequest,
+    context: Any,
+    props: Any,
+    entry_point: str | None = None,
+) -> str | RendererStream:
+    payload = serialize_payload(context, props, entry_point)
+    rendered = render_payload_to_stream(request, payload)
+    return rendered.decode() if isinstance(rendered, bytes) else rendered
+
+
+def _open_stream(
+    address: str,
+    headers: dict[str, str],
+    data: bytes,
+    reservation: contextlib.ExitStack,
+) -> Iterator[bytes]:
+    """Send a streamed render and wait for its shell. What needs closing
+    once the stream is done goes on ``reservation``."""
+    if (framed := get_framed_address(address)) is not None:
+        render = get_framed_connection(framed).send(FRAME_RENDER_STREAM, data)
+        reservation.callback(render.close)
+        # Nothing comes before the shell but the shell or the error, or the
+        # end itself for an empty page.
+        kind, payload = render.next_frame()
+        if kind == FRAME_ERROR:
+            _raise_for_renderer_error(payload)
+        if kind == FRAME_END:
+            render.close()
+            return iter([payload] if payload else [])
+        return itertools.chain([payload], render.iter_chunks())
+
+    response = post_to_renderer(address, headers=headers, data=data, stream=True)
+    reservation.callback(response.close)
+    if response.status_code != 200:
+        _raise_for_renderer_error(response.content)
+    return response.iter_content(chunk_size=None)
+
+
+class AsyncRendererResponse:
+    """A renderer response read off an asyncio stream, up to the end of its
+    headers. The body is read on demand — whole with ``read()``, or chunk by
+    chunk with ``iter_chunks()`` — and once it has been read in full the
+    connection goes back to the client for the next render."""
+
+    def __init__(
+        self,
+        client: AsyncRendererClient,
+        address: str,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        status_code: int,
+        headers: dict[str, str],
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self._client = client
+        self._address = address
+        self._reader = reader
+        self._writer = writer
+        self._done = False
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        reader = self._reader
+        keep_alive = self.headers.get("connection", "").lower() != "close"
+        length = self.headers.get("content-length")
+
         try:
-            error = response.json()
-        except requests.JSONDecodeError:
-            raise Exception(response.content)
+            if self.headers.get("transfer-encoding", "").lower() == "chunked":
+                while size := int((await reader.readline()).split(b";")[0], 16):
+                    chunk = await reader.readexactly(size + 2)
+                    yield chunk[:-2]
+                # Trailers, if any, up to the blank line that ends the body.
+                while (await reader.readline()).strip():
+                    pass
+            elif length is not None:
+                remaining = int(length)
+                while remaining:
+                    chunk = await reader.read(min(remaining, 2**16))
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(chunk, remaining)
+                    remaining -= len(chunk)
+                    yield chunk
+            else:
+                while chunk := await reader.read(2**16):
+                    yield chunk
+                keep_alive = False
+        except BaseException:
+            # Including an iteration abandoned halfway: what is left of the
+            # body is still on the wire, so the connection can't be reused.
+            self.close()
+            raise
+
+        if not self._done:
+            self._done = True
+            if keep_alive:
+                self._client.release(self._address, reader, self._writer)
+            else:
+                self._writer.close()
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    def close(self) -> None:
+        if not self._done:
+            self._done = True
+            self._writer.close()
+
+
+class AsyncRendererClient:
+    """HTTP/1.1 to the renderers over asyncio streams, for async views.
+
+    Connections are kept alive and reused, up to ``max_idle`` per renderer.
+    Streams belong to the event loop that opened them, so each loop gets its
+    own client from ``get_async_renderer_client()``."""
+
+    def __init__(self, max_idle: int = 8) -> None:
+        self.max_idle = max_idle
+        self.idle: dict[
+            str, list[tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+        ] = {}
+
+    async def connect(
+        self, address: str
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if "sock" in address:
+            return await asyncio.open_unix_connection(_socket_path(address))
+        url = urllib.parse.urlsplit(address)
+        secure = url.scheme == "https"
+        return await asyncio.open_connection(
+            url.hostname, url.port or (443 if secure else 80), ssl=secure or None
+        )
+
+    def release(
+        self,
+        address: str,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        idle = self.idle.setdefault(address, [])
+        if len(idle) < self.max_idle and not writer.is_closing():
+            idle.append((reader, writer))
         else:
-            err_details = error.get("error", {})
-            exc = SSRError(err_details.get("message") or "")
-            stack = err_details.get("stack") or ""
-            exc.add_note(f"Client Stack:\n{stack}")
-            raise exc
+            writer.close()
+
+    def close(self) -> None:
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+    async def post(
+        self, address: str, *, headers: dict[str, str], data: bytes
+    ) -> AsyncRendererResponse:
+        idle = self.idle.get(address, [])
+        while idle:
+            reader, writer = idle.pop()
+            if writer.is_closing() or reader.at_eof():
+                writer.close()
+                continue
+            try:
+                return await self._exchange(address, reader, writer, headers, data)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The renderer dropped the idle connection, typically on its
+                # keep-alive timeout. Renders are idempotent: try the next.
+                continue
+
+        reader, writer = await self.connect(address)
+        return await self._exchange(address, reader, writer, headers, data)
+
+    async def _exchange(
+        self,
+        address: str,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        headers: dict[str, str],
+        data: bytes,
+    ) -> AsyncRendererResponse:
+        host = (
+            "localhost" if "sock" in address else urllib.parse.urlsplit(address).netloc
+        )
+        lines = [
+            "POST /_reactivated/ HTTP/1.1",
+            f"Host: {host}",
+            f"Content-Length: {len(data)}",
+            *(f"{name}: {value}" for name, value in headers.items()),
+        ]
+
+        try:
+            writer.write("\r\n".join([*lines, "", ""]).encode("latin-1") + data)
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise asyncio.IncompleteReadError(status_line, None)
+            status_code = int(status_line.split(b" ", 2)[1])
+
+            response_headers: dict[str, str] = {}
+            while line := (await reader.readline()).strip():
+                name, _, value = line.decode("latin-1").partition(":")
+                response_headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            writer.close()
+            raise
+
+        return AsyncRendererResponse(
+            self, address, reader, writer, status_code, response_headers
+        )
+
+
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncRendererClient
+] = weakref.WeakKeyDictionary()
+
+
+def get_async_renderer_client() -> AsyncRendererClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncRendererClient()
+    return client
+
+
+async def _astart_renderer_pool() -> RendererPool:
+    # Spawning renderers blocks until they listen; only the first render
+    # in a process can get here, and it waits in a thread.
+    return renderer_pool or await sync_to_async(start_renderer_pool)()
+
+
+async def arender_payload(
+    request: HttpRequest, payload: RenderPayload, cache: bool = True
+) -> bytes:
+    """``render_payload`` for async views. Waiting on the renderer holds no
+    thread; past ``REACTIVATED_RENDERER_TIMEOUT`` it raises
+    ``TimeoutError``."""
+    headers = {"Content-Type": "application/json"}
+
+    if (rendered := _render_without_renderer(request, payload)) is not None:
+        return rendered
+
+    cached = _get_cached_render(payload) if cache else None
+    if cached is not None and (html := await cached.aget()) is not None:
+        return html
+    data = payload.data if cached is None else cached.data
+
+    pool = await _astart_renderer_pool()
+    client = get_async_renderer_client()
+
+    failed: str | None = None
+    for attempt in _render_attempts():
+        with pool.acquire(exclude=failed) as address, attempt(address):
+            async with asyncio.timeout(get_renderer_timeout()):
+                response = await client.post(address, headers=headers, data=data)
+                content = await response.read()
+            break
+        failed = address
+
+    if response.status_code != 200:
+        _raise_for_renderer_error(content)
+    return content if cached is None else await cached.aset(content)
+
+
+async def arender_jsx_to_string(
+    request: HttpRequest,
+    context: Any,
+    props: Any,
+    entry_point: str | None = None,
+    cache: bool = True,
+) -> str:
+    payload = serialize_payload(context, props, entry_point)
+    return (await arender_payload(request, payload, cache=cache)).decode()
+
+
+class AsyncRendererStream:
+    """``RendererStream`` for async views: under ASGI, Django iterates it
+    on the event loop, so the body streams without holding a thread."""
+
+    def __init__(
+        self, response: AsyncRendererResponse, release: Callable[[], None]
+    ) -> None:
+        self._response = response
+        self._chunks = response.iter_chunks()
+        self._release: Callable[[], None] | None = release
+
+    def __aiter__(self) -> AsyncRendererStream:
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            return await anext(self._chunks)
+        except StopAsyncIteration:
+            self.close()
+            raise
+        except (ConnectionError, asyncio.IncompleteReadError):
+            logger.exception("SSR stream from the renderer broke after the shell")
+            self.close()
+            raise StopAsyncIteration
+
+    def close(self) -> None:
+        if self._release is None:
+            return
+        release, self._release = self._release, None
+        self._response.close()
+        release()
+
+
+async def arender_payload_to_stream(
+    request: HttpRequest, payload: RenderPayload
+) -> bytes | AsyncRendererStream:
+    """``render_payload_to_stream`` for async views. The timeout covers the
+    wait for the shell, not the stream after it."""
+    headers = {"Content-Type": "application/json", "X-Reactivated-Stream": "1"}
+
+    if (rendered := _render_without_renderer(request, payload)) is not None:
+        return rendered
+
+    pool = await _astart_renderer_pool()
+    client = get_async_renderer_client()
+
+    failed: str | None = None
+    for attempt in _render_attempts():
+        reservation = contextlib.ExitStack()
+        address = reservation.enter_context(pool.acquire(exclude=failed))
+        try:
+            with attempt(address):
+                async with asyncio.timeout(get_renderer_timeout()):
+                    response = await client.post(
+                        address, headers=headers, data=payload.data
+                    )
+                    if response.status_code != 200:
+                        _raise_for_renderer_error(await response.read())
+                return AsyncRendererStream(response, reservation.close)
+        except BaseException:
+            reservation.close()
+            raise
+        reservation.close()
+        failed = address
+
+    raise AssertionError("unreachable")
+
+
+async def arender_jsx_to_stream(
+    request: HttpRequest,
+    context: Any,
+    props: Any,
+    entry_point: str | None = None,
+) -> str | AsyncRendererStream:
+    payload = serialize_payload(context, props, entry_point)
+    rendered = await arender_payload_to_stream(request, payload)
+    return rendered.decode() if isinstance(rendered, bytes) else rendered
@@ -90,6 +90,8 @@ from django.http import HttpRequest, HttpResponse
 from django.urls import path as django_path
 from django.urls.resolvers import URLPattern
 
+from .rpc.bulkhead import Bulkhead, as_bulkhead
+from .rpc.cache import QueryCache
 from .rpc.core import (
     RPC,
     RPCDecorator,
@@ -101,6 +103,9 @@ from .rpc.core import (
     anyone,
     build_rpc_decorator,
 )
+from .rpc.executor import RequestExecutor
+from .rpc.singleflight import SingleFlight
+from .rpc.subscriptions import Subscription
 from .templates import Template
 from .transport import DJANGO_CONVERTERS, resolved_hints, url_segment
 
@@ -362,6 +367,7 @@ class Scope(Generic[TValue, TRoot]):
         log: "Literal['errors'] | bool" = False,
         atomic_requests: bool = True,
         methods: "list[Literal['GET', 'POST']] | None" = None,
+        max_concurrency: "int | Bulkhead | None" = None,
     ) -> "RPCDecorator[TValue]": ...
 
     def rpc(
@@ -372,6 +378,7 @@ class Scope(Generic[TValue, TRoot]):
         log: "Literal['errors'] | bool" = False,
         atomic_requests: bool = True,
         methods: "list[Literal['GET', 'POST']] | None" = None,
+        max_concurrency: "int | Bulkhead | None" = None,
     ) -> Any:
         """A procedure on this scope: the chain resolves + gates, its product
         is injected as the handler's first arg (the principal), and a scope
@@ -383,6 +390,7 @@ class Scope(Generic[TValue, TRoot]):
             log=log,
             atomic_requests=atomic_requests,
             methods=methods,
+            max_concurrency=max_concurrency,
         )
         if fn is not None:
             return decorator(fn)
@@ -730,17 +738,48 @@ class Router(Generic[TAnonymous]):
     global registry, no circular imports."""
 
     @overload
-    def __init__(self: "Router[HttpRequest]") -> None: ...
+    def __init__(
+        self: "Router[HttpRequest]",
+        *,
+        executor: RequestExecutor | None = None,
+        max_concurrency: int | Bulkhead | None = None,
+    ) -> None: ...
 
     @overload
-    def __init__(self, request_type: type[TAnonymous]) -> None: ...
+    def __init__(
+        self,
+        request_type: type[TAnonymous],
+        *,
+        executor: RequestExecutor | None = None,
+        max_concurrency: int | Bulkhead | None = None,
+    ) -> None: ...
 
-    def __init__(self, request_type: Any = HttpRequest) -> None:
+    def __init__(
+        self,
+        request_type: Any = HttpRequest,
+        *,
+        executor: RequestExecutor | None = None,
+        max_concurrency: int | Bulkhead | None = None,
+    ) -> None:
+        """``executor`` leases its procedures a thread per call; without one
+        they use the ``REACTIVATED_RPC_MAX_THREADS`` executor, if set.
+        ``max_concurrency`` caps the calls in flight across all of them."""
         self.request_type = request_type
+        self.executor = executor
+        self.bulkhead = as_bulkhead(max_concurrency)
         self.handlers: dict[str, RPC] = {}
         self._views: list[View] = []
         self._builtin_scopes: dict[str, Scope[Any, Any]] = {}
 
+    def _bulkheads(self, max_concurrency: "int | Bulkhead | None") -> list[Bulkhead]:
+        """The procedure's own limit, then the router's, so a call waiting on
+        its own never holds one of the router's slots."""
+        return [
+            bulkhead
+            for bulkhead in (as_bulkhead(max_concurrency), self.bulkhead)
+            if bulkhead is not None
+        ]
+
     # -- built-in gates ------------------------------------------------------
 
     def _builtin(self, word: str, fn: Callable[..., object]) -> "Scope[Any, Any]":
@@ -784,6 +823,7 @@ class Router(Generic[TAnonymous]):
         log: "Literal['errors'] | bool" = False,
         atomic_requests: bool = True,
         methods: "list[Literal['GET', 'POST']] | None" = None,
+        max_concurrency: "int | Bulkhead | None" = None,
     ) -> RPCDecorator[TPrincipal]: ...
 
     @overload
@@ -795,6 +835,7 @@ class Router(Generic[TAnonymous]):
         log: "Literal['errors'] | bool" = False,
         atomic_requests: bool = True,
         methods: "list[Literal['GET', 'POST']] | None" = None,
+        max_concurrency: "int | Bulkhead | None" = None,
     ) -> RPCDecorator[TAnonymous]: ...
 
     def rpc(
@@ -805,6 +846,7 @@ class Router(Generic[TAnonymous]):
         log: "Literal['errors'] | bool" = False,
         atomic_requests: bool = True,
         methods: "list[Literal['GET', 'POST']] | None" = None,
+        max_concurrency: "int | Bulkhead | None" = None,
     ) -> Any:
         if isinstance(access, Scope):
             return build_rpc_decorator(
@@ -816,6 +858,8 @@ class Router(Generic[TAnonymous]):
                 atomic_requests=atomic_requests,
                 is_query=False,
                 methods=methods,
+                executor=self.executor,
+                bulkheads=self._bulkheads(max_concurrency),
             )
         # Public: the request itself is the principal (the identity gate).
         decorator = build_rpc_decorator(
@@ -827,6 +871,8 @@ class Router(Generic[TAnonymous]):
             atomic_requests=atomic_requests,
             is_query=False,
             methods=methods,
+            executor=self.executor,
+            bulkheads=self._bulkheads(max_concurrency),
         )
         # Bare @router.rpc: `access` is actually the handler — register it now.
         return decorator if access is None else decorator(access)
@@ -844,6 +890,12 @@ class Router(Generic[TAnonymous]):
         *,
         csrf_exempt: bool = False,
         log: "Literal['errors'] | bool" = False,
+        cache: "QueryCache | None" = None,
+        single_flight: "SingleFlight | None" = None,
+        read_only: bool = False,
+        replica: str | None = None,
+        max_concurrency: "int | Bulkhead | None" = None,
+        subscription: "Subscription | None" = None,
     ) -> RPCDecorator[TPrincipal]: ...
 
     @overload
@@ -853,6 +905,12 @@ class Router(Generic[TAnonymous]):
         *,
         csrf_exempt: bool = False,
         log: "Literal['errors'] | bool" = False,
+        cache: "QueryCache | None" = None,
+        single_flight: "SingleFlight | None" = None,
+        read_only: bool = False,
+        replica: str | None = None,
+        max_concurrency: "int | Bulkhead | None" = None,
+        subscription: "Subscription | None" = None,
     ) -> RPCDecorator[TAnonymous]: ...
 
     def query(
@@ -861,6 +919,12 @@ class Router(Generic[TAnonymous]):
         *,
         csrf_exempt: bool = False,
         log: "Literal['errors'] | bool" = False,
+        cache: "QueryCache | None" = None,
+        single_flight: "SingleFlight | None" = None,
+        read_only: bool = False,
+        replica: str | None = None,
+        max_concurrency: "int | Bulkhead | None" = None,
+        subscription: "Subscription | None" = None,
     ) -> Any:
         if isinstance(access, Scope):
             return build_rpc_decorator(
@@ -871,6 +935,13 @@ class Router(Generic[TAnonymous]):
                 log=log,
                 atomic_requests=False,
                 is_query=True,
+                cache=cache,
+                single_flight=single_flight,
+                executor=self.executor,
+                bulkheads=self._bulkheads(max_concurrency),
+                read_only=read_only,
+                replica=replica,
+                subscription=subscription,
             )
         decorator = build_rpc_decorator(
             self.handlers,
@@ -880,6 +951,13 @@ class Router(Generic[TAnonymous]):
             log=log,
             atomic_requests=False,
             is_query=True,
+            cache=cache,
+            single_flight=single_flight,
+            executor=self.executor,
+            bulkheads=self._bulkheads(max_concurrency),
+            read_only=read_only,
+            replica=replica,
+            subscription=subscription,
         )
         return decorator if access is None else decorator(access)
 
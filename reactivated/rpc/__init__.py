@@ -2,11 +2,39 @@
 live at their top-level homes: ``reactivated.pick``,
 ``reactivated.templates``, ``reactivated.forms``."""
 
-from .core import anyone
-from .observer import RequestStatus, rpc_observer
+from .bulkhead import Bulkhead, BulkheadFull
+from .cache import QueryCache, invalidate_query_cache
+from .core import anyone, warm_rpc_adapters
+from .events import RPCEvent
+from .executor import RequestExecutor
+from .observer import RequestStatus, rpc_batch_observer, rpc_observer
+from .pagination import Page, PageInput
+from .readonly import ReadOnlyError, ReplicaRouter
+from .singleflight import CacheFlightBackend, SingleFlight
+from .streaming import Stream
+from .subscriptions import LocalPubSub, PubSubBackend, Subscription, publish
 
 __all__ = [
+    "Bulkhead",
+    "BulkheadFull",
+    "CacheFlightBackend",
+    "LocalPubSub",
+    "Page",
+    "PageInput",
+    "PubSubBackend",
+    "QueryCache",
+    "RPCEvent",
+    "ReadOnlyError",
+    "ReplicaRouter",
+    "RequestExecutor",
     "RequestStatus",
+    "SingleFlight",
+    "Stream",
+    "Subscription",
     "anyone",
+    "invalidate_query_cache",
+    "publish",
+    "rpc_batch_observer",
     "rpc_observer",
+    "warm_rpc_adapters",
 ]
@@ -0,0 +1,184 @@
+"""Many procedure calls in one HTTP round trip.
+
+A screen that fires a dozen RPCs on mount pays a dozen times for the
+middleware stack, the session load and the CSRF check. ``mount()`` adds
+``rpc/_batch/`` next to any router with procedures. It takes an ordered
+list of ``{name, params, input}`` and answers with one
+``{status, data}`` per call, the status code and JSON body that call
+would have had on its own URL.
+
+Each call goes through the same handler as its own URL, so access,
+validation, transactions and the observer behave the same. Runs of
+adjacent queries are read-only, so they are awaited together. A mutation
+waits for everything before it and holds back everything after it, so a
+batch reads its own writes in order.
+
+A procedure returning a ``Stream`` has no single body to put in the
+batch, so it is refused with a 400 and never runs. Subscribed queries
+answer with their output, as a plain call would.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+from typing import Any, get_origin
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.db import transaction
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    JsonResponse,
+    QueryDict,
+)
+from django.urls import path
+from django.urls.resolvers import URLPattern
+from django.utils.datastructures import MultiValueDict
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from .core import RPC, RPC_PREFIX, _get_combined_rpc_registry, process_errors
+from .streaming import Stream
+
+BATCH_URL = f"{RPC_PREFIX}/_batch/"
+BATCH_NAME = f"{RPC_PREFIX}__batch"
+
+STREAMING_REFUSED = (
+    b'{"status":400,"data":{"error":"Streaming calls cannot be batched"}}'
+)
+
+
+class BatchCall(BaseModel):
+    name: str
+    params: dict[str, Any] = {}
+    input: Any = None
+
+
+batch_adapter = TypeAdapter(list[BatchCall])
+
+
+def get_batch_max_calls() -> int:
+    return getattr(settings, "REACTIVATED_RPC_BATCH_MAX_CALLS", 50)
+
+
+def _call_request(request: HttpRequest, rpc: RPC, call: BatchCall) -> HttpRequest:
+    """The request this call would have made on its own. Input always
+    travels as a JSON body, queries included, and the answer is always
+    JSON."""
+    body = json.dumps(call.input).encode()
+    method = "POST" if rpc["input"] is not None else rpc["method"]
+
+    sub = copy.copy(request)
+    sub.method = method
+    sub.path = sub.path_info = f"/{rpc['url']}"
+    sub.META = {
+        **{
+            key: value
+            for key, value in request.META.items()
+            if key != "HTTP_IF_NONE_MATCH"
+        },
+        "REQUEST_METHOD": method,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "HTTP_ACCEPT": "application/json",
+    }
+    sub.GET = QueryDict()
+    sub._body = body
+    sub._post = QueryDict()  # type: ignore[attr-defined]
+    sub._files = MultiValueDict()  # type: ignore[attr-defined]
+    sub.__dict__.pop("headers", None)
+    return sub
+
+
+async def _close_streaming(response: HttpResponseBase) -> None:
+    """Stop a streaming response that will never be read, so its generator
+    releases what it holds."""
+    iterator: Any = getattr(response, "_iterator", None)
+    if hasattr(iterator, "aclose"):
+        await iterator.aclose()
+    elif hasattr(iterator, "close"):
+        await sync_to_async(iterator.close)()
+
+
+def _url_kwargs(rpc: RPC, params: dict[str, Any]) -> dict[str, Any] | None:
+    """Convert params the way the URL converters would, or ``None`` where
+    the URL would not have resolved."""
+    try:
+        return {name: kind(params[name]) for kind, name in rpc["params"]}
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def _dispatch(
+    request: HttpRequest, registry: dict[str, RPC], call: BatchCall
+) -> bytes:
+    rpc = registry.get(f"{RPC_PREFIX}_{call.name}")
+    kwargs = None if rpc is None else _url_kwargs(rpc, call.params)
+    if rpc is None or kwargs is None:
+        return b'{"status":404,"data":null}'
+    if get_origin(rpc["output"]) is Stream:
+        return STREAMING_REFUSED
+
+    sub = _call_request(request, rpc, call)
+    response: HttpResponseBase
+    try:
+        response = await rpc["handler"](sub, **kwargs)
+    except Exception as error:
+        response = await sync_to_async(response_for_exception)(sub, error)
+
+    if response.streaming:
+        await _close_streaming(response)
+        return STREAMING_REFUSED
+    assert isinstance(response, HttpResponse)
+    is_json = response.get("Content-Type", "").startswith("application/json")
+    data = response.content if is_json and response.content else b"null"
+    return b'{"status":%d,"data":%s}' % (response.status_code, data)
+
+
+async def batch_view(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        calls = batch_adapter.validate_json(request.body)
+    except ValidationError as error:
+        return JsonResponse(process_errors(error), safe=False, status=400)
+    if len(calls) > get_batch_max_calls():
+        return JsonResponse(
+            {"error": f"At most {get_batch_max_calls()} calls per batch"}, status=400
+        )
+
+    registry = _get_combined_rpc_registry()
+    results: list[bytes] = []
+    queries: list[BatchCall] = []
+
+    async def run_queries() -> None:
+        results.extend(
+            await asyncio.gather(
+                *(_dispatch(request, registry, call) for call in queries)
+            )
+        )
+        queries.clear()
+
+    for call in calls:
+        rpc = registry.get(f"{RPC_PREFIX}_{call.name}")
+        if rpc is not None and rpc["method"] == "GET":
+            queries.append(call)
+            continue
+        await run_queries()
+        results.append(await _dispatch(request, registry, call))
+    await run_queries()
+
+    return HttpResponse(
+        b"[" + b",".join(results) + b"]", content_type="application/json"
+    )
+
+
+def batch_paths() -> list[URLPattern]:
+    return [
+        path(BATCH_URL, transaction.non_atomic_requests(batch_view), name=BATCH_NAME)
+    ]
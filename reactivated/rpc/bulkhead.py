@@ -0,0 +1,123 @@
+"""Concurrency limits for procedures.
+
+One slow, popular procedure can take every database connection and
+thread the process has, and every other procedure waits behind it. A
+``Bulkhead`` admits at most ``max_concurrency`` calls at once. Up to
+``max_waiting`` more wait their turn for at most ``timeout`` seconds, and
+the rest are turned away at once with a ``503`` and a ``Retry-After``.
+
+Pass ``max_concurrency=`` an ``int`` for a limit of its own, or a shared
+``Bulkhead`` to put several procedures, such as all of a scope's, behind
+one limit. ``Router(max_concurrency=...)`` limits all of a router's
+procedures together, on top of their own limits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+from typing import Literal
+
+from django.http import JsonResponse
+
+
+class BulkheadFull(Exception):
+    """Why a call was turned away, and how loaded its bulkhead was."""
+
+    def __init__(
+        self, reason: Literal["full", "timeout"], active: int, waiting: int
+    ) -> None:
+        super().__init__(
+            f"Bulkhead {reason}: {active} calls running, {waiting} waiting"
+        )
+        self.reason = reason
+        self.active = active
+        self.waiting = waiting
+
+
+class Bulkhead:
+    def __init__(
+        self,
+        max_concurrency: int,
+        *,
+        max_waiting: int = 0,
+        timeout: float = 1.0,
+        retry_after: int = 1,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Concurrent futures, so a slot can be handed between the event
+        # loops of different requests.
+        self._waiters: collections.deque[concurrent.futures.Future[None]] = (
+            collections.deque()
+        )
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self.active < self.max_concurrency:
+                self.active += 1
+                self.admitted += 1
+                return
+            if len(self._waiters) >= self.max_waiting:
+                self.rejected += 1
+                raise BulkheadFull("full", self.active, len(self._waiters))
+            waiter: concurrent.futures.Future[None] = concurrent.futures.Future()
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(waiter), self.timeout)
+        except BaseException as error:
+            timed_out = isinstance(error, asyncio.TimeoutError)
+            with self._lock:
+                # Still pending means no slot was handed over.
+                handed = not waiter.cancel()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                if timed_out:
+                    self.timed_out += 1
+                active, waiting = self.active, len(self._waiters)
+            if handed:
+                self.release()
+            if timed_out:
+                raise BulkheadFull("timeout", active, waiting) from None
+            raise
+        with self._lock:
+            self.admitted += 1
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    # The slot passes straight on, so ``active`` stays put.
+                    waiter.set_result(None)
+                    return
+            self.active -= 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "active": self.active,
+                "waiting": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+    def reject(self) -> JsonResponse:
+        response = JsonResponse({"error": "OVERLOADED"}, status=503)
+        response["Retry-After"] = str(self.retry_after)
+        return response
+
+
+def as_bulkhead(limit: int | Bulkhead | None) -> Bulkhead | None:
+    return Bulkhead(limit) if isinstance(limit, int) else limit
@@ -0,0 +1,147 @@
+"""Caching query results.
+
+Queries are GET-only and have no side effects, so a query declared with
+``cache=QueryCache(...)`` stores its serialized output in one of your
+``CACHES`` and answers repeat calls from it. The scope chain or access
+function still runs on every call, so a cached result is only ever served
+to a caller who could have fetched it; validation, the handler and
+serialization are skipped. By default a result is only served back to the
+same caller for the same params and input; sharing one across callers or
+inputs has to be asked for.
+
+Keys carry the digest of the generated pick schema, so a deploy that
+changes what any pick serializes starts from an empty cache. Mutations
+drop results early with ``invalidate_query_cache(*tags)``.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import uuid
+from typing import Any, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import transaction
+from django.http import HttpRequest
+from pydantic import BaseModel
+
+
+@dataclasses.dataclass(frozen=True)
+class QueryCache:
+    """How to cache one query.
+
+    ``params`` varies the key on URL params, ``principal`` on who is asking
+    (the principal's ``pk``, or the request user's for public queries) and
+    ``input`` on the validated input: all of it by default, or only the
+    named fields. Set ``principal=False``, or list fewer fields, only for
+    results that really are the same for every caller or value. ``tags``
+    may name URL params in braces, like ``"opera:{opera_id}"``. ``alias``
+    picks the backend, ``REACTIVATED_RPC_CACHE`` by default."""
+
+    timeout: float | None = 60
+    params: bool = True
+    principal: bool = True
+    input: Sequence[str] | None = None
+    tags: Sequence[str] = ()
+    alias: str | None = None
+
+    def get_cache(self) -> BaseCache:
+        return caches[self.alias or get_query_cache_alias()]
+
+
+def get_query_cache_alias() -> str:
+    return getattr(settings, "REACTIVATED_RPC_CACHE", "default")
+
+
+def _tag_key(tag: str) -> str:
+    return f"reactivated:rpc:tag:{tag}"
+
+
+def principal_id(principal: Any) -> Any:
+    """Who is asking: the principal's ``pk``, or the request user's for
+    public procedures, whose principal is the request itself."""
+    if isinstance(principal, HttpRequest):
+        principal = getattr(principal, "user", None)
+    return getattr(principal, "pk", None)
+
+
+def _encode(value: Any) -> Any:
+    return value.model_dump(mode="json") if isinstance(value, BaseModel) else str(value)
+
+
+def vary_digest(values: list[Any]) -> str:
+    encoded = json.dumps(values, sort_keys=True, default=_encode).encode()
+    return hashlib.blake2b(encoded, digest_size=20).hexdigest()
+
+
+def _schema_digest() -> str:
+    import pick_schema
+
+    return getattr(pick_schema, "SCHEMA_DIGEST", "")
+
+
+class CachedQuery:
+    """One call's entry: the key it is stored under, which folds in the
+    current version of each of its tags."""
+
+    def __init__(
+        self,
+        config: QueryCache,
+        rpc_name: str,
+        *,
+        kwargs: dict[str, Any],
+        principal: Any,
+        payload: Any,
+    ) -> None:
+        self.config = config
+        self.cache = config.get_cache()
+
+        tags = [_tag_key(tag.format(**kwargs)) for tag in config.tags]
+        versions = self.cache.get_many(tags)
+        for tag in tags:
+            if tag not in versions:
+                self.cache.add(tag, uuid.uuid4().hex, None)
+                versions[tag] = self.cache.get(tag)
+
+        digest = vary_digest(
+            [
+                kwargs if config.params else None,
+                principal_id(principal) if config.principal else None,
+                (
+                    payload
+                    if config.input is None
+                    else [_field(payload, name) for name in config.input]
+                ),
+                [versions[tag] for tag in tags],
+            ]
+        )
+        self.key = f"reactivated:rpc:{rpc_name}:{_schema_digest()}:{digest}"
+
+    def get(self) -> bytes | None:
+        output: bytes | None = self.cache.get(self.key)
+        return output
+
+    def set(self, output: bytes) -> None:
+        self.cache.set(self.key, output, self.config.timeout)
+
+
+def _field(payload: Any, name: str) -> Any:
+    if isinstance(payload, dict):
+        return payload.get(name)
+    return getattr(payload, name, None)
+
+
+def invalidate_query_cache(*tags: str, alias: str | None = None) -> None:
+    """Drop every cached result under any of ``tags``. Inside a transaction
+    this waits for the commit, so a query running in between can't cache
+    the data being replaced."""
+    cache = caches[alias or get_query_cache_alias()]
+
+    def bump() -> None:
+        cache.set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+
+    transaction.on_commit(bump)
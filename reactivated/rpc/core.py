@@ -3,6 +3,7 @@ from __future__ import annotations
 __all__ = ["InlinePick", "PickArgs"]
 
 import ast
+import contextlib
 import datetime
 import decimal
 import enum
@@ -27,6 +28,7 @@ from typing import (
     Awaitable,
     Callable,
     Concatenate,
+    ContextManager,
     Coroutine,
     Generic,
     Literal,
@@ -53,7 +55,12 @@ from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
 from django.db import models as dj_models
 from django.db import transaction
 from django.db.models.fields.reverse_related import ForeignObjectRel
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
 from django.utils.functional import LazyObject
 from django.utils.html import escape
@@ -63,6 +70,12 @@ import reactivated.rpc.patches  # noqa: F401
 
 if TYPE_CHECKING:
     from ..forms.schema import FieldDescriptor
+    from .bulkhead import Bulkhead
+    from .cache import QueryCache
+    from .executor import RequestExecutor
+    from .singleflight import SingleFlight
+    from .subscriptions import Subscription
+    from .timing import RPCTimings
 from pydantic import (
     BaseModel,
     ConfigDict,
@@ -83,10 +96,14 @@ from typing_extensions import ParamSpec
 
 from reactivated.fields import _EnumField
 from reactivated.stubs import _GenericAlias
-from reactivated.utils import ClassLookupDict
+from reactivated.utils import ClassLookupDict, make_etag, respond_with_etag
 
 from ..registry import Thing
 from ..transport import DJANGO_CONVERTERS, url_segment
+from .pagination import Page
+from .planner import build_plan, pick_holder_for
+from .streaming import CONTENT_TYPE as STREAM_CONTENT_TYPE
+from .streaming import Stream, stream_rows
 from .utils import module_name_to_app_name
 
 
@@ -453,24 +470,32 @@ class RequestTransaction:
     must order the commit or rollback against observer writes close
     explicitly, and ``__aexit__`` is the safety net for everything else."""
 
-    def __init__(self, enabled: bool) -> None:
+    def __init__(self, enabled: bool, timings: "RPCTimings | None" = None) -> None:
         self._atomic = transaction.atomic() if enabled else None
+        self._timings = timings
+
+    def _phase(self, name: str) -> ContextManager[None]:
+        if self._timings is None:
+            return contextlib.nullcontext()
+        return self._timings.phase(name)
 
     async def __aenter__(self) -> "RequestTransaction":
         if self._atomic is not None:
-            await sync_to_async(self._atomic.__enter__)()
+            with self._phase("transaction"):
+                await sync_to_async(self._atomic.__enter__)()
         return self
 
     async def close(self, error: BaseException | None = None) -> None:
         if self._atomic is None:
             return
         atomic, self._atomic = self._atomic, None
-        if error is None:
-            await sync_to_async(atomic.__exit__)(None, None, None)
-        else:
-            await sync_to_async(atomic.__exit__)(
-                type(error), error, error.__traceback__
-            )
+        with self._phase("commit"):
+            if error is None:
+                await sync_to_async(atomic.__exit__)(None, None, None)
+            else:
+                await sync_to_async(atomic.__exit__)(
+                    type(error), error, error.__traceback__
+                )
 
     async def __aexit__(
         self,
@@ -490,6 +515,66 @@ class ResolvedInput(NamedTuple):
     payload_kwargs: dict[str, Any]
 
 
+# Bumped whenever pick_schema is reloaded in-process, so adapters compiled
+# against the previous generation's classes are rebuilt instead of reused.
+_schema_generation = 0
+
+
+class RPCAdapters:
+    """The pydantic adapters for one procedure's body and return type. Each
+    TypeAdapter compiles a core schema plus validator and serializer, so
+    they are built once — on first call, or at boot via ``warm()`` — and
+    kept on the registry entry. Building needs the generated
+    ``pick_schema`` module, which is why it cannot happen at decoration
+    time."""
+
+    def __init__(self, input: Any, output: Any) -> None:
+        self.input_type = input
+        self.output_type = output
+        self._input: TypeAdapter[Any] | None = None
+        self._output: TypeAdapter[Any] | None = None
+        self._version: tuple[int, int] | None = None
+
+    def _build(self) -> None:
+        import pick_schema
+
+        version = (id(pick_schema), _schema_generation)
+        if self._version == version:
+            return
+        self._output = TypeAdapter(self.output_type)
+        self._input = (
+            TypeAdapter(self.input_type) if self.input_type is not None else None
+        )
+        self._version = version
+
+    @property
+    def output(self) -> TypeAdapter[Any]:
+        self._build()
+        assert self._output is not None
+        return self._output
+
+    @property
+    def input(self) -> TypeAdapter[Any]:
+        self._build()
+        assert self._input is not None, "RPC has no body"
+        return self._input
+
+    def warm(self) -> None:
+        self._build()
+
+
+def warm_rpc_adapters() -> int:
+    """Build the adapters of every mounted procedure, and the pick name
+    index, now rather than on each one's first request. Call once urls are loaded — e.g. after
+    ``get_wsgi_application()`` or in a gunicorn ``post_worker_init`` hook.
+    Returns the number of procedures warmed."""
+    pick_index.build()
+    registry = _get_combined_rpc_registry()
+    for rpc_call in registry.values():
+        rpc_call["adapters"].warm()
+    return len(registry)
+
+
 RPCCall = TypeVar("RPCCall", bound=Callable[..., Any])
 
 THttpRequest = TypeVar("THttpRequest", bound=HttpRequest)
@@ -526,7 +611,22 @@ def build_rpc_decorator(
     atomic_requests: bool = True,
     is_query: bool = False,
     methods: list[Literal["GET", "POST"]] | None = None,
+    cache: "QueryCache | None" = None,
+    single_flight: "SingleFlight | None" = None,
+    executor: "RequestExecutor | None" = None,
+    read_only: bool = False,
+    replica: str | None = None,
+    bulkheads: "Sequence[Bulkhead]" = (),
+    subscription: "Subscription | None" = None,
 ) -> RPCDecorator[Any]:
+    assert cache is None or is_query, "Only queries can be cached"
+    assert subscription is None or is_query, "Only queries can be subscribed to"
+    read_only = read_only or replica is not None
+    assert not read_only or (is_query and not atomic_requests), (
+        "Only queries can be read-only"
+    )
+    assert single_flight is None or is_query, "Only queries can be coalesced"
+
     def decorator(rpc_call: RPCCall) -> RPCCall:
         rpc_name = f"{RPC_PREFIX}_{rpc_call.__name__}"
         sig = inspect.signature(rpc_call)
@@ -581,24 +681,96 @@ def build_rpc_decorator(
 
         allowed_methods = methods or [effective_method]
 
+        adapters = RPCAdapters(rpc_form, rpc_output)
+        output_pick = pick_holder_for(rpc_output)
+        is_stream = get_origin(rpc_output) is Stream
+        assert not is_stream or (
+            cache is None and single_flight is None and subscription is None
+        ), "Streams can be neither cached, coalesced nor subscribed to"
+
         def get_response(
             *, input: Any, content: Any, status_code: int, is_ui: bool
         ) -> HttpResponse:
+            """``content`` is either a JSON-able value or, from the output
+            adapter, JSON already encoded to bytes."""
             if is_ui is True:
+                if isinstance(content, bytes):
+                    content = json.loads(content)
                 data = json.dumps(content, indent=4)
                 return HttpResponse(
                     f"<html><body><h1>Input</h1><pre>{escape(input)}</pre><h1>Debug response</h1><pre>{escape(data)}</pre></body></html>",
                     status=status_code,
                 )
+            elif isinstance(content, bytes):
+                return HttpResponse(
+                    content, status=status_code, content_type="application/json"
+                )
             else:
                 return JsonResponse(content, safe=False, status=status_code)
 
         async def wrapped_rpc_call(request: Any, *args: Any, **kwargs: Any) -> Any:
+            from .bulkhead import BulkheadFull
+            from .executor import get_default_executor
+            from .observer import RequestStatus, notify_observer, observer_wants_timings
+            from .timing import RPCTimings, install_query_counter, server_timing_enabled
+
+            timed = server_timing_enabled()
+            timings = RPCTimings() if timed or observer_wants_timings() else None
+            request_executor = executor or get_default_executor()
+
+            async with contextlib.AsyncExitStack() as admitted:
+                # Waiting for a slot holds no thread or connection, so it
+                # comes before the executor lease.
+                for bulkhead in bulkheads:
+                    queued: ContextManager[None] = (
+                        timings.phase("queue") if timings else contextlib.nullcontext()
+                    )
+                    try:
+                        with queued:
+                            await bulkhead.acquire()
+                    except BulkheadFull as error:
+                        try:
+                            await notify_observer(
+                                request,
+                                rpc_name,
+                                log,
+                                RequestStatus.REJECTED,
+                                None,
+                                None,
+                                None,
+                                error,
+                                timings,
+                            )
+                        except Exception:
+                            logging.getLogger(__name__).exception("RPC observer failed")
+                        return bulkhead.reject()
+                    admitted.callback(bulkhead.release)
+
+                if request_executor is not None:
+                    await admitted.enter_async_context(request_executor.affinity())
+                if timings is None:
+                    return await call_rpc(None, request, *args, **kwargs)
+                await sync_to_async(install_query_counter)()
+                with timings.counting():
+                    response = await call_rpc(timings, request, *args, **kwargs)
+            if timed:
+                response.headers["Server-Timing"] = timings.header()
+            return response
+
+        async def call_rpc(
+            timings: "RPCTimings | None", request: Any, *args: Any, **kwargs: Any
+        ) -> Any:
             import pick_schema  # noqa:F401
 
-            from .observer import RequestStatus, get_observer
+            from .cache import CachedQuery
+            from .observer import RequestStatus, notify_observer, observer_wants_parsed
+            from .readonly import get_replica_alias, guarded, install_write_guard
+            from .singleflight import Flight
 
-            rpc_output_adapter = TypeAdapter(rpc_output)
+            rpc_output_adapter = adapters.output
+            url_kwargs = {
+                name: kwargs[name] for _, name in rpc_params if name in kwargs
+            }
 
             async def _notify_observer(
                 *,
@@ -608,11 +780,8 @@ def build_rpc_decorator(
                 body: bytes | None = None,
                 exception: BaseException | None = None,
             ) -> None:
-                observer = get_observer()
-                if observer is None:
-                    return
                 try:
-                    await observer(
+                    await notify_observer(
                         request,
                         rpc_name,
                         log,
@@ -621,19 +790,120 @@ def build_rpc_decorator(
                         output,
                         body,
                         exception,
+                        timings,
                     )
                 except Exception:
                     logging.getLogger(__name__).exception("RPC observer failed")
 
             is_async = inspect.iscoroutinefunction(rpc_call)
 
+            def _dump(validated_model: Any) -> bytes:
+                # An unevaluated queryset for a list of picks is planned
+                # before it runs, so its relations load in a fixed number
+                # of queries rather than lazily per row. So is a page's.
+                if isinstance(validated_model, Page):
+                    optimize = output_pick.optimize if output_pick else None
+                    validated_model = validated_model.resolve(optimize)
+                elif isinstance(validated_model, dj_models.QuerySet):
+                    if output_pick is not None:
+                        validated_model = output_pick.optimize(validated_model)
+                    validated_model = list(validated_model)
+                return rpc_output_adapter.dump_json(validated_model)
+
+            def _phase(name: str) -> ContextManager[None]:
+                if timings is None:
+                    return contextlib.nullcontext()
+                return timings.phase(name)
+
+            def _reads() -> ContextManager[None]:
+                """Around the handler and serialization: reads from the
+                replica, and no writes, for read-only queries."""
+                if not read_only:
+                    return contextlib.nullcontext()
+                return guarded(replica or get_replica_alias())
+
             # Serialization must run in sync context for sync handlers
             # because .returns calls model_validate during serialization
-            async def _serialize(validated_model: Any) -> Any:
-                if is_async:
-                    return rpc_output_adapter.dump_python(validated_model, mode="json")
-                return await sync_to_async(rpc_output_adapter.dump_python)(
-                    validated_model, mode="json"
+            async def _serialize(validated_model: Any) -> bytes:
+                if is_async and not isinstance(
+                    validated_model, (dj_models.QuerySet, Page)
+                ):
+                    return _dump(validated_model)
+                return await sync_to_async(_dump)(validated_model)
+
+            def _stream(validated_model: Any) -> StreamingHttpResponse:
+                """Rows go out as they are read, after the transaction has
+                closed and the observer has heard of the call."""
+                from .subscriptions import is_asgi
+
+                rows = (
+                    validated_model.rows
+                    if isinstance(validated_model, Stream)
+                    else validated_model
+                )
+                return StreamingHttpResponse(
+                    stream_rows(
+                        rows,
+                        rpc_output_adapter.dump_json,
+                        optimize=output_pick.optimize if output_pick else None,
+                        reads=_reads,
+                        asgi=is_asgi(request),
+                    ),
+                    content_type=STREAM_CONTENT_TYPE,
+                )
+
+            def _respond(resolved: ResolvedInput, output: bytes) -> HttpResponse:
+                response = get_response(
+                    input=resolved.data,
+                    content=output,
+                    status_code=200,
+                    is_ui=resolved.is_ui,
+                )
+                # A poll that gets the same bytes back gets a 304 instead,
+                # whether its input came in the URL or as a body.
+                if is_query and not resolved.is_ui:
+                    return respond_with_etag(
+                        request, response, make_etag(output), safe=True
+                    )
+                return response
+
+            def _parsed_body() -> Any:
+                return json.loads(request.body) if observer_wants_parsed() else None
+
+            async def _validate_body(
+                txn: RequestTransaction, rpc_form_adapter: TypeAdapter[Any]
+            ) -> HttpResponse | ResolvedInput | None:
+                """Parse and validate the raw JSON body in one pass, without
+                building it as Python objects first. ``None`` leaves the body
+                to ``json.loads``: pydantic's parser rejects a few documents
+                that it accepts, such as ``NaN``, and a body only counts as
+                malformed if both reject it."""
+                try:
+                    payload = await sync_to_async(rpc_form_adapter.validate_json)(
+                        request.body, context={"user": request.user}
+                    )
+                except ValidationError as validation_error:
+                    if any(
+                        error["type"] == "json_invalid"
+                        for error in validation_error.errors()
+                    ):
+                        return None
+                    processed = process_errors(validation_error)
+                    await txn.close()
+                    await _notify_observer(
+                        status=RequestStatus.INVALID,
+                        input=_parsed_body(),
+                        output=processed,
+                        exception=validation_error,
+                    )
+                    return get_response(
+                        input=None, content=processed, status_code=400, is_ui=False
+                    )
+
+                return ResolvedInput(
+                    data=_parsed_body(),
+                    is_ui=False,
+                    payload_kwargs={str(rpc_form_name): payload},
                 )
 
             async def _resolve_input(
@@ -644,7 +914,7 @@ def build_rpc_decorator(
                         return JsonResponse({"error": "Method not allowed"}, status=405)
                     return ResolvedInput(data=None, is_ui=False, payload_kwargs={})
 
-                rpc_form_adapter = TypeAdapter(rpc_form)
+                rpc_form_adapter = adapters.input
 
                 # Handle GET requests for debug UI or when explicitly allowed
                 if (
@@ -675,6 +945,9 @@ def build_rpc_decorator(
                 elif request.method == "GET":
                     return JsonResponse({"error": "Method not allowed"}, status=405)
                 else:
+                    validated = await _validate_body(txn, rpc_form_adapter)
+                    if validated is not None:
+                        return validated
                     try:
                         data = json.loads(request.body)
                     except Exception as error:
@@ -714,15 +987,18 @@ def build_rpc_decorator(
             # lock rows (select_for_update) that the handler then mutates, so
             # the chain, validation, handler, and serialization share it.
             # thread_sensitive sync_to_async pins every sync block below to
-            # one thread, which is what lets a transaction opened here span
-            # them. Every exit closes the transaction BEFORE its observer
-            # notification — commit and rollback alike — so a failing
-            # observer write (e.g. a DB request log) can neither be swallowed
-            # by an error rollback nor mark a committed-and-reported success
-            # for silent rollback.
-            async with RequestTransaction(atomic_requests) as txn:
+            # one thread (the call's leased thread, under a RequestExecutor),
+            # which is what lets a transaction opened here span them. Every
+            # exit closes the transaction BEFORE its observer notification —
+            # commit and rollback alike — so a failing observer write (e.g. a
+            # DB request log) can neither be swallowed by an error rollback
+            # nor mark a committed-and-reported success for silent rollback.
+            async with RequestTransaction(atomic_requests, timings) as txn:
                 if scope_adapter is not None:
-                    outcome = await sync_to_async(scope_adapter.run)(request, kwargs)
+                    with _phase("scope"):
+                        outcome = await sync_to_async(scope_adapter.run)(
+                            request, kwargs
+                        )
                     if isinstance(outcome, ScopeDenied):
                         logger.debug(
                             "rpc %s: scope failure %r coerced to denied",
@@ -733,7 +1009,8 @@ def build_rpc_decorator(
                     access_check = outcome
                 else:
                     assert access is not None
-                    access_check = await access(request)
+                    with _phase("scope"):
+                        access_check = await access(request)
 
                 if access_check is False:
                     return JsonResponse({"error": "UNAUTHORIZED"}, status=401)
@@ -769,55 +1046,142 @@ def build_rpc_decorator(
                         return await rpc_call(principal, **call_kwargs)
                     return await sync_to_async(rpc_call)(principal, **call_kwargs)
 
-                resolved = await _resolve_input(txn)
+                with _phase("input"):
+                    resolved = await _resolve_input(txn)
                 if isinstance(resolved, HttpResponse):
                     return resolved
 
-                try:
-                    validated_model = await _call_handler(
-                        **resolved.payload_kwargs, **kwargs
+                cached = None
+                if cache is not None and not resolved.is_ui:
+                    with _phase("cache"):
+                        cached = await sync_to_async(CachedQuery)(
+                            cache,
+                            rpc_name,
+                            kwargs=url_kwargs,
+                            principal=principal,
+                            payload=resolved.payload_kwargs.get(str(rpc_form_name)),
+                        )
+                        hit = await sync_to_async(cached.get)()
+                    if hit is not None:
+                        await txn.close()
+                        await _notify_observer(
+                            status=RequestStatus.CACHE_HIT,
+                            input=resolved.data,
+                            output=json.loads(hit) if observer_wants_parsed() else None,
+                            body=request.body,
+                        )
+                        return _respond(resolved, hit)
+
+                if read_only:
+                    await sync_to_async(install_write_guard)()
+
+                flight = None
+                if single_flight is not None and not resolved.is_ui:
+                    flight = Flight(
+                        single_flight,
+                        rpc_name,
+                        kwargs=url_kwargs,
+                        principal=principal,
+                        payload=resolved.payload_kwargs.get(str(rpc_form_name)),
                     )
-                except AssertionError as error:
+
+                # Entered before joining, so a leader that fails anywhere
+                # still releases the calls waiting on it.
+                async with flight or contextlib.nullcontext():
+                    if flight is not None:
+                        with _phase("flight"):
+                            shared = await flight.join()
+                        if shared is not None:
+                            await txn.close()
+                            await _notify_observer(
+                                status=RequestStatus.COALESCED,
+                                input=resolved.data,
+                                output=(
+                                    json.loads(shared)
+                                    if observer_wants_parsed()
+                                    else None
+                                ),
+                                body=request.body,
+                            )
+                            return _respond(resolved, shared)
+
+                    try:
+                        with _phase("handler"), _reads():
+                            validated_model = await _call_handler(
+                                **resolved.payload_kwargs, **kwargs
+                            )
+                    except AssertionError as error:
+                        await txn.close()
+                        await _notify_observer(
+                            status=RequestStatus.INVALID,
+                            input=resolved.data,
+                            body=request.body,
+                            exception=error,
+                        )
+                        return get_response(
+                            input=resolved.data,
+                            content=list(error.args),
+                            status_code=400,
+                            is_ui=resolved.is_ui,
+                        )
+                    except Exception as error:
+                        await txn.close(error)
+                        await _notify_observer(
+                            status=RequestStatus.ERROR,
+                            input=resolved.data,
+                            body=request.body,
+                            exception=error,
+                        )
+                        raise
+
+                    if is_stream:
+                        await txn.close()
+                        await _notify_observer(
+                            status=RequestStatus.SUCCESS,
+                            input=resolved.data,
+                            body=request.body,
+                        )
+                        return _stream(validated_model)
+
+                    with _phase("serialize"), _reads():
+                        output = await _serialize(validated_model)
+                    if flight is not None:
+                        await flight.land(output)
+                    if cached is not None:
+                        await sync_to_async(cached.set)(output)
                     await txn.close()
                     await _notify_observer(
-                        status=RequestStatus.INVALID,
-                        input=resolved.data,
-                        body=request.body,
-                        exception=error,
-                    )
-                    return get_response(
-                        input=resolved.data,
-                        content=list(error.args),
-                        status_code=400,
-                        is_ui=resolved.is_ui,
-                    )
-                except Exception as error:
-                    await txn.close(error)
-                    await _notify_observer(
-                        status=RequestStatus.ERROR,
+                        status=RequestStatus.SUCCESS,
                         input=resolved.data,
+                        output=json.loads(output) if observer_wants_parsed() else None,
                         body=request.body,
-                        exception=error,
                     )
-                    raise
-
-                output = await _serialize(validated_model)
-                await txn.close()
-                await _notify_observer(
-                    status=RequestStatus.SUCCESS,
-                    input=resolved.data,
-                    output=output,
-                    body=request.body,
-                )
-                return get_response(
-                    input=resolved.data,
-                    content=output,
-                    status_code=200,
-                    is_ui=resolved.is_ui,
+                    return _respond(resolved, output)
+
+        async def subscribable_rpc_call(request: Any, *args: Any, **kwargs: Any) -> Any:
+            """Hold the query open for a caller asking for events, running
+            it again, in full, on each publish."""
+            from .subscriptions import is_asgi, subscribe, wants_events
+
+            assert subscription is not None
+            if not wants_events(request):
+                return await wrapped_rpc_call(request, *args, **kwargs)
+            if not is_asgi(request):
+                return JsonResponse(
+                    {"error": "Subscriptions need an ASGI server"}, status=406
                 )
+            return subscribe(
+                request,
+                subscription,
+                kwargs,
+                lambda run: wrapped_rpc_call(run, *args, **kwargs),
+            )
 
+        rpc_handler = (
+            wrapped_rpc_call if subscription is None else subscribable_rpc_call
+        )
         if csrf_exempt is True:
-            wrapped_rpc_call.csrf_exempt = True  # type: ignore[attr-defined]
+            rpc_handler.csrf_exempt = True  # type: ignore[attr-defined]
 
         handlers[rpc_name] = {
             "name": rpc_call.__name__,
@@ -828,7 +1192,9 @@ def build_rpc_decorator(
             "output": rpc_output,
             "params": rpc_params,
             "method": effective_method,
-            "handler": transaction.non_atomic_requests(wrapped_rpc_call),
+            "handler": transaction.non_atomic_requests(rpc_handler),
+            "adapters": adapters,
+            "subscription": subscription,
         }
 
         return rpc_call
@@ -1158,6 +1524,8 @@ RDefinitions = dict[str, RSchema]
 
 P = TypeVar("P", bound="Pick")
 
+TModel = TypeVar("TModel", bound=dj_models.Model)
+
 
 # Similar to Django Ninja and djantic, we wrap our Django model with this proxy
 # class so we can better interpret querysets and related managers.
@@ -1381,13 +1749,15 @@ else:
                 as_dict = pick_args.as_dict
                 module = mod  # type: ignore[assignment]
 
+                fallback_name = auto
+
                 @classmethod
-                def get_class_name(holder_cls) -> str:
+                def find_class_name(holder_cls) -> str | None:
                     if holder_cls.module is not None:
                         for var_name, var_val in inspect.getmembers(holder_cls.module):
                             if var_val is holder_cls:
                                 return var_name
-                    return auto
+                    return None
 
                 @classmethod
                 def __get_pydantic_core_schema__(
@@ -1633,12 +2003,26 @@ class BasePickHolder:
     read_only_fields: list[str]
     write_only_fields: list[str]
     optional_fields: list[str] = []
+    depends_on: list[str] = []
     as_dict: bool = False
 
     @classmethod
     def proxy(cls, _instance: dj_models.Model, **kwargs: Any) -> "PickProxy":
         return PickProxy(_instance, **kwargs)
 
+    @classmethod
+    def optimize(
+        cls, queryset: dj_models.QuerySet[TModel]
+    ) -> dj_models.QuerySet[TModel]:
+        """Add the select_related/prefetch_related this pick's fields need,
+        so serializing the queryset costs a fixed number of queries instead of
+        one per relation per row."""
+        plan = cls.__dict__.get("_query_plan")
+        if plan is None:
+            plan = build_plan(cls)
+            cls._query_plan = plan  # type: ignore[attr-defined]
+        return plan.apply(queryset)
+
     @classmethod  # type: ignore[misc]
     @property
     def input(cls) -> Any:
@@ -1700,6 +2084,8 @@ class BasePickHolder:
                         definitions=definitions,
                     )
 
+            pick_holder = cls
+
             @classmethod
             def get_name(i_cls) -> str:
                 return (cls.get_name() or "TODO") + "_output"
@@ -1735,6 +2121,8 @@ class BasePickHolder:
     @property
     def returns(cls) -> Any:
         class ReturnsRef(Ref):
+            pick_holder = cls
+
             @classmethod
             def get_name(r_cls) -> str:
                 # Same name as output for schema purposes
@@ -1779,41 +2167,46 @@ class BasePickHolder:
 
     @classmethod
     def dereference(cls) -> Type[Pick]:
-
-        schema = importlib.import_module("pick_schema")
-
-        pick_class = getattr(schema, cls.get_name())
-        return pick_class  # type: ignore[no-any-return]
+        return pick_index.dereference(cls)
 
     @classmethod
     def model_validate(cls: Type[BasePickHolder], *args: Any, **kwargs: Any) -> Any:
         return cls.dereference().model_validate(*args, **kwargs)
 
     @classmethod
-    def get_class_name(cls: Type[BasePickHolder]) -> str:
+    def is_same_pick(cls, other: Any) -> bool:
+        return (
+            isinstance(other, type)
+            and issubclass(other, BasePickHolder)
+            and other
+            is not BasePickHolder  # In case we import BasePickHolder in the same file we use pick
+            and other.module == cls.module
+            and other.fields == cls.fields
+            and other.extra_fields == cls.extra_fields
+            and other.read_only_fields == cls.read_only_fields
+            and other.write_only_fields == cls.write_only_fields
+            and other.optional_fields == cls.optional_fields
+            and other.model_class is cls.model_class
+            and other.as_dict == cls.as_dict
+        )
+
+    @classmethod
+    def find_class_name(cls: Type[BasePickHolder]) -> str | None:
+        """Scan the defining module for the variable this pick is bound to.
+        Linear in the module's size: use ``get_class_name``, which indexes
+        the answer."""
         pick_name: str | None = None
 
         for var_name, var_val in inspect.getmembers(cls.module):
-            if (
-                isinstance(var_val, type)
-                and issubclass(var_val, BasePickHolder)
-                and var_val
-                is not BasePickHolder  # In case we import BasePickHolder in the same file we use pick
-                and var_val.module == cls.module
-                and var_val.fields == cls.fields
-                and var_val.extra_fields == cls.extra_fields
-                and var_val.read_only_fields == cls.read_only_fields
-                and var_val.write_only_fields == cls.write_only_fields
-                and var_val.optional_fields == cls.optional_fields
-                and var_val.model_class is cls.model_class
-                and var_val.as_dict == cls.as_dict
-            ):
+            if cls.is_same_pick(var_val):
                 pick_name = var_name
 
-        assert pick_name is not None, "Could not determine name"
-
         return pick_name
 
+    @classmethod
+    def get_class_name(cls: Type[BasePickHolder]) -> str:
+        return pick_index.class_name(cls)
+
     @classmethod
     def get_pretty_name(cls: Type[BasePickHolder]) -> str | None:
         for app_config in apps.get_app_configs():
@@ -1824,7 +2217,7 @@ class BasePickHolder:
 
     @classmethod
     def get_name(cls: Type[BasePickHolder]) -> str:
-        return f"{cls.module.__name__}.{cls.get_class_name()}".replace(".", "_")
+        return pick_index.name(cls)
 
     @classmethod
     def get_schema(
@@ -1973,6 +2366,78 @@ class BasePickHolder:
 # TODO: I think models_registry is unused?
 models_registry: list[Type[BaseModel]] = []
 picks_registry: list[Type[BasePickHolder]] = []
+
+
+class PickIndex:
+    """Name and ``pick_schema`` class for every pick, each resolved once.
+
+    Names come from scanning the defining module, and dereferencing goes
+    through the generated module; both sit on the serialization path, so
+    the answers are kept here. A name is only indexed once the scan finds
+    it, so a lookup made while the module is still executing falls back
+    without poisoning the index. Dereferenced classes are dropped whenever
+    ``pick_schema`` is replaced or reloaded. Under DEBUG every hit is
+    checked against the module, so a rebound name fails loudly."""
+
+    def __init__(self) -> None:
+        self.class_names: dict[type[BasePickHolder], str] = {}
+        self.names: dict[type[BasePickHolder], str] = {}
+        self.classes: dict[type[BasePickHolder], Type[Pick]] = {}
+        self._version: tuple[int, int] | None = None
+
+    def class_name(self, holder: type[BasePickHolder]) -> str:
+        class_name = self.class_names.get(holder)
+
+        if class_name is None:
+            class_name = holder.find_class_name()
+            if class_name is None:
+                fallback = getattr(holder, "fallback_name", None)
+                assert fallback is not None, "Could not determine name"
+                return fallback  # type: ignore[no-any-return]
+            self.class_names[holder] = class_name
+        elif settings.DEBUG:
+            assert holder.is_same_pick(getattr(holder.module, class_name, None)), (
+                f"{holder.module.__name__}.{class_name} no longer refers to this pick"
+            )
+
+        return class_name
+
+    def name(self, holder: type[BasePickHolder]) -> str:
+        name = self.names.get(holder)
+        if name is None:
+            class_name = self.class_name(holder)
+            name = f"{holder.module.__name__}.{class_name}".replace(".", "_")
+            if holder in self.class_names:
+                self.names[holder] = name
+        return name
+
+    def dereference(self, holder: type[BasePickHolder]) -> Type[Pick]:
+        schema = sys.modules.get("pick_schema") or importlib.import_module(
+            "pick_schema"
+        )
+        version = (id(schema), _schema_generation)
+        if version != self._version:
+            self.classes.clear()
+            self._version = version
+
+        pick_class = self.classes.get(holder)
+        if pick_class is None:
+            pick_class = getattr(schema, holder.get_name())
+            self.classes[holder] = pick_class
+        return pick_class
+
+    def build(self) -> None:
+        """Resolve every registered pick now, e.g. at boot."""
+        for holder in picks_registry:
+            if holder not in self.class_names:
+                class_name = holder.find_class_name()
+                if class_name is None:
+                    continue
+                self.class_names[holder] = class_name
+            self.name(holder)
+
+
+pick_index = PickIndex()
 manually_exported_registry: dict[str, Type[object]] = {}
 # name -> (value, annotation or None)
 exported_values_registry: dict[str, tuple[Any, Any]] = {}
@@ -2230,6 +2695,8 @@ class RPC(TypedDict):
     params: list[tuple[type, str]]
     method: Literal["GET", "POST"]
     handler: Callable[..., Coroutine[Any, Any, JsonResponse]]
+    adapters: RPCAdapters
+    subscription: "Subscription | None"
 
 
 def pick(
@@ -2240,6 +2707,7 @@ def pick(
     write_only_fields: list[str] | None = None,
     optional_fields: list[str] | None = None,
     extra_fields: dict[str, Any] | None = None,
+    depends_on: list[str] | None = None,
     as_dict: bool = False,
 ) -> Any:
     """Create a typed data shape from a Django model's fields.
@@ -2267,6 +2735,11 @@ def pick(
       default: absent and explicit null are indistinguishable after
       validation (use model_fields_set if a call site needs to tell them
       apart), and a model default would be shadowed by the implicit None.
+
+    Loading (what ``optimize`` fetches for serialization):
+    - depends_on: model paths read by code the fields list does not show —
+      typically whatever builds the extra_fields values. They load along
+      with the picked fields instead of being deferred.
     """
     for optional_field_name in optional_fields or []:
         optional_descriptor = meta_model._meta.get_field(optional_field_name)
@@ -2285,6 +2758,7 @@ def pick(
     _read_only_fields = read_only_fields
     _write_only_fields = write_only_fields
     _optional_fields = optional_fields
+    _depends_on = depends_on
     frm = inspect.stack()[1]
     mod = inspect.getmodule(frm[0])
     _as_dict = as_dict
@@ -2296,6 +2770,7 @@ def pick(
         read_only_fields = _read_only_fields or []
         write_only_fields = _write_only_fields or []
         optional_fields = _optional_fields or []
+        depends_on = _depends_on or []
         as_dict = _as_dict
         module = mod  # type: ignore[assignment]
 
@@ -2819,6 +3294,18 @@ def generate_server_schema(skip_cache: bool = False) -> None:
                     )
                 )
 
+            # Typing surface only: the mypy plugin resolves pick() classes
+            # to this one, while MyPick.optimize() runs on the holder.
+            model_path = ast.unparse(model_ref)
+            class_body.extend(
+                ast.parse(
+                    "@staticmethod\n"
+                    f"def optimize(queryset: QuerySet[{model_path}]) "
+                    f"-> QuerySet[{model_path}]:\n"
+                    "    return queryset\n"
+                ).body
+            )
+
         class_def = ast.ClassDef(
             name=schema_title,
             type_params=[],
@@ -2853,6 +3340,13 @@ def generate_server_schema(skip_cache: bool = False) -> None:
     )
     module.body.insert(0, import_node)
 
+    import_node = ast.ImportFrom(
+        module="django.db.models",
+        names=[ast.alias(name="QuerySet", asname=None)],
+        level=0,
+    )
+    module.body.insert(0, import_node)
+
     import_node = ast.ImportFrom(
         module="reactivated.rpc.core",
         names=[
@@ -2870,6 +3364,16 @@ def generate_server_schema(skip_cache: bool = False) -> None:
     )
     module.body.insert(0, import_node)
 
+    # Read by the query cache, so results cached against one schema are
+    # never served under another.
+    module.body.append(
+        ast.Assign(
+            targets=[ast.Name(id="SCHEMA_DIGEST", ctx=ast.Store())],
+            value=ast.Constant(value=digest),
+            lineno=0,
+        )
+    )
+
     source_code = "# Digest: %s\n" % digest
     source_code += "# flake8: noqa\n"
     source_code += "# autoflake: skip_file\n"
@@ -2895,12 +3399,16 @@ def generate_client_schema(skip_cache: bool = False) -> None:
     from ..forms.django import register_widgets_in_reactivated
     from ..templates import template_registry
 
+    global _schema_generation
+
     importlib.reload(pick_schema)
+    _schema_generation += 1
 
     register_widgets_in_reactivated()
 
     EXTRA = """
-    import {getCookieFromCookieString} from "reactivated/dist/rpc";
+    import {getCookieFromCookieString, readStream, subscribeQuery} from "reactivated/dist/rpc";
+    import type {Cursor} from "reactivated/dist/rpc";
 
     export type RPCResult<TSuccess> = {
         type: "success";
@@ -3005,15 +3513,36 @@ def generate_client_schema(skip_cache: bool = False) -> None:
         else:
             payload_expr = "null"
 
+        # Name and params let the requester send the call through the
+        # batch endpoint instead of its own URL.
+        param_names = ", ".join(n for _, n in rpc_params)
+        call_expr = f'{{name: "{call_name}", params: {{{param_names}}}}}'
+
         app_path = module_name_to_app_name(rpc_call["module"])
         assert app_path is not None, rpc_call["module"]
         rpc_node = server_node.at(app_path.split("."))
+        if get_origin(rpc_call["output"]) is Stream:
+            # A stream is read a row at a time, straight from its own URL.
+            rpc_node.body.append(
+                f"export function {call_name}({args_str}) {{\n"
+                f'    return readStream<Schema["{rpc_output_name}"]>({url_expr}, {payload_expr}, "{rpc_call["method"]}");\n'
+                f"}}"
+            )
+            continue
         rpc_node.body.append(
             f"export async function {call_name}({args_str}) {{\n"
             f'    const {{rpc}} = await import("@reactivated");\n'
-            f'    return rpc.requester({url_expr}, {payload_expr}, "{rpc_call["method"]}") as unknown as Promise<RPCResult<Schema["{rpc_output_name}"]>>;\n'
+            f'    return rpc.requester({url_expr}, {payload_expr}, "{rpc_call["method"]}", {call_expr}) as unknown as Promise<RPCResult<Schema["{rpc_output_name}"]>>;\n'
             f"}}"
         )
+        if rpc_call["subscription"] is not None:
+            # The same call held open: its output now, and again on change.
+            subscribe_args = ", ".join([*ts_args, "signal?: AbortSignal"])
+            rpc_node.body.append(
+                f"export function subscribe_{call_name}({subscribe_args}) {{\n"
+                f'    return subscribeQuery<Schema["{rpc_output_name}"]>({url_expr}, {payload_expr}, "{rpc_call["method"]}", signal);\n'
+                f"}}"
+            )
 
     model_fields = {
         (f"{model.__module__}.{model.__qualname__}".replace(".", "_")): (model, ...)
@@ -0,0 +1,224 @@
+"""Observing procedures off the request path.
+
+An observer registered with ``rpc_observer`` is awaited before each
+response goes out, so whatever it does, such as writing a request log,
+adds to every call's latency. One registered with ``rpc_batch_observer``
+is not: each call appends an ``RPCEvent`` to a bounded in-process queue
+and moves on. A background thread hands the queued events to the observer
+in batches, either every ``flush_interval`` seconds or as soon as
+``batch_size`` events are waiting, so a log can be written with one
+``bulk_create`` per batch.
+
+``sample_rate`` keeps that fraction of successful calls. Failures, invalid
+input and malformed bodies are always kept. When the queue holds
+``max_size`` events, ``drop="newest"`` turns away new events and
+``drop="oldest"`` discards the oldest to make room. ``event_queue_stats``
+counts both.
+
+An event outlives its request and is read on another thread, so it holds
+a snapshot of what observers need rather than the request itself: the
+path, the method and the user's ``pk``. The raw body is only kept with
+``body=True``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import collections
+import dataclasses
+import logging
+import os
+import random
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Literal
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject, empty
+
+if TYPE_CHECKING:
+    from .observer import RequestStatus
+    from .timing import RPCTimings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class RPCEvent:
+    path: str
+    method: str
+    user_id: Any
+    rpc_name: str
+    log: Literal["errors"] | bool
+    status: RequestStatus
+    input: Any
+    output: Any
+    body: bytes | None
+    exception: BaseException | None
+    timings: RPCTimings | None
+
+
+RPCBatchObserverFunc = Callable[[list[RPCEvent]], None]
+
+
+async def get_user_id(request: HttpRequest) -> Any:
+    """The ``pk`` of the request's user, loading the user off the event
+    loop if nothing in the call has yet."""
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject) and user.__dict__["_wrapped"] is empty:
+        if (auser := getattr(request, "auser", None)) is None:
+            return await sync_to_async(_pk)(user)
+        user = await auser()
+    return _pk(user)
+
+
+def _pk(user: Any) -> Any:
+    return getattr(user, "pk", None)
+
+
+class EventQueueStats:
+    """What happened to the events of this process since it started, or
+    since the last ``reset()``."""
+
+    KINDS = ("queued", "sampled_out", "dropped", "delivered", "failed")
+
+    def __init__(self) -> None:
+        self.counts = dict.fromkeys(self.KINDS, 0)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, count: int = 1) -> None:
+        with self._lock:
+            self.counts[kind] += count
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = dict.fromkeys(self.KINDS, 0)
+
+
+event_queue_stats = EventQueueStats()
+
+
+class EventQueue:
+    def __init__(
+        self,
+        observer: RPCBatchObserverFunc,
+        *,
+        batch_size: int = 100,
+        max_size: int = 10000,
+        flush_interval: float = 1.0,
+        sample_rate: float = 1.0,
+        drop: Literal["newest", "oldest"] = "newest",
+    ) -> None:
+        self.observer = observer
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.drop = drop
+        self._events: collections.deque[RPCEvent] = collections.deque()
+        self._ready = threading.Condition()
+        # Held while a batch is delivered, so batches arrive one at a time
+        # and in order, whether the worker or flush() delivers them.
+        self._delivering = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._pid: int | None = None
+        self._closed = False
+
+    def put(self, event: RPCEvent) -> None:
+        from .observer import RequestStatus
+
+        sampled = event.status in (
+            RequestStatus.SUCCESS,
+            RequestStatus.CACHE_HIT,
+            RequestStatus.COALESCED,
+        )
+        if sampled and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            event_queue_stats.record("sampled_out")
+            return
+
+        with self._ready:
+            if len(self._events) >= self.max_size:
+                event_queue_stats.record("dropped")
+                if self.drop == "newest":
+                    return
+                self._events.popleft()
+            self._events.append(event)
+            event_queue_stats.record("queued")
+            if len(self._events) >= self.batch_size:
+                self._ready.notify()
+        self._start_worker()
+
+    def _start_worker(self) -> None:
+        # A forked worker process inherits the queue but not its thread.
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._ready:
+            if self._worker is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._worker = threading.Thread(
+                target=self._run, name="reactivated-rpc-events", daemon=True
+            )
+            self._worker.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            with self._ready:
+                self._ready.wait_for(
+                    lambda: len(self._events) >= self.batch_size or self._closed,
+                    timeout=self.flush_interval,
+                )
+            self.flush()
+            # The worker thread outlives requests, so nothing else closes
+            # its connections.
+            close_old_connections()
+        connections.close_all()
+
+    def flush(self) -> None:
+        """Deliver every queued event now, on this thread."""
+        with self._delivering:
+            while True:
+                with self._ready:
+                    count = min(self.batch_size, len(self._events))
+                    batch = [self._events.popleft() for _ in range(count)]
+                if not batch:
+                    break
+                try:
+                    self.observer(batch)
+                    event_queue_stats.record("delivered", len(batch))
+                except Exception:
+                    event_queue_stats.record("failed", len(batch))
+                    logger.exception("RPC batch observer failed")
+
+    def close(self) -> None:
+        self._closed = True
+        with self._ready:
+            self._ready.notify()
+        self.flush()
+
+
+_queue: EventQueue | None = None
+
+
+def get_event_queue() -> EventQueue | None:
+    return _queue
+
+
+def set_event_queue(queue: EventQueue | None) -> None:
+    """Replace the queue; the one it replaces delivers what it holds and
+    stops."""
+    global _queue
+    previous, _queue = _queue, queue
+    if previous is not None:
+        previous.close()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    if _queue is not None:
+        _queue.close()
@@ -0,0 +1,135 @@
+"""Which threads run a procedure's sync work.
+
+Every sync step of a procedure — its transaction, scope chain, validation,
+handler and serialization — goes through thread-sensitive
+``sync_to_async``, so that all of them land on one thread and a
+transaction opened by the first spans the rest. Left to asgiref, that one
+thread is either the process-wide sync thread, shared by every request in
+flight, or, under Django's ``ASGIHandler``, a thread started for the
+request and thrown away after it, along with its database connection.
+
+A ``RequestExecutor`` keeps a bounded pool of threads instead and leases
+one to each procedure call for as long as it runs. The call keeps its
+thread affinity, different calls run in parallel, and the threads and
+their connections are reused. Once every thread is leased, calls wait
+for one to be returned.
+
+Under WSGI a procedure's sync work already goes back to the request's own
+thread, and the executor stays out of the way.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import os
+import threading
+from typing import AsyncIterator
+
+from asgiref.sync import AsyncToSync, SyncToAsync, ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+
+class RequestExecutor:
+    """Up to ``max_threads`` threads, one per procedure call in flight.
+    Defaults to the CPU count plus four, like ``ThreadPoolExecutor``."""
+
+    def __init__(self, max_threads: int | None = None) -> None:
+        self.max_threads = max_threads or min(32, (os.cpu_count() or 1) + 4)
+        self._idle: list[concurrent.futures.ThreadPoolExecutor] = []
+        self._started = 0
+        self._waiters: collections.deque[
+            concurrent.futures.Future[concurrent.futures.ThreadPoolExecutor]
+        ] = collections.deque()
+        self._lock = threading.Lock()
+
+    async def _lease(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            if self._started < self.max_threads:
+                self._started += 1
+                return concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="reactivated-rpc"
+                )
+            # Concurrent futures, so a thread can be handed between the
+            # event loops of different requests.
+            waiter: concurrent.futures.Future[concurrent.futures.ThreadPoolExecutor]
+            waiter = concurrent.futures.Future()
+            self._waiters.append(waiter)
+
+        try:
+            return await asyncio.wrap_future(waiter)
+        except asyncio.CancelledError:
+            if not waiter.cancel():
+                # Handed over just as the call was cancelled.
+                self._return(waiter.result())
+            raise
+
+    def close(self) -> None:
+        """Close the connections of the idle threads and stop them. Threads
+        still leased are left alone."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+        for thread in idle:
+            thread.submit(connections.close_all).result()
+            thread.shutdown()
+
+    def _return(self, thread: concurrent.futures.ThreadPoolExecutor) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(thread)
+                    return
+            self._idle.append(thread)
+
+    @contextlib.asynccontextmanager
+    async def affinity(self) -> AsyncIterator[None]:
+        """Run the thread-sensitive sync work inside the block on one leased
+        thread."""
+        if getattr(AsyncToSync.executors, "current", None) is not None:
+            yield
+            return
+
+        # asgiref has no public way to hand a context a thread, so this sets
+        # its internals directly. pyproject.toml pins the asgiref releases
+        # known to have them, and a test checks they are still there.
+        thread = await self._lease()
+        context = ThreadSensitiveContext()  # type: ignore[no-untyped-call]
+        token = SyncToAsync.thread_sensitive_context.set(context)
+        SyncToAsync.context_to_thread_executor[context] = thread
+        try:
+            yield
+        finally:
+            try:
+                # Django only closes the connections of the thread that ends
+                # the request, so the leased thread honours CONN_MAX_AGE here.
+                await sync_to_async(close_old_connections)()
+            finally:
+                SyncToAsync.context_to_thread_executor.pop(context, None)
+                SyncToAsync.thread_sensitive_context.reset(token)
+                self._return(thread)
+
+
+_default_executor: RequestExecutor | None = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_executor() -> RequestExecutor | None:
+    """The executor shared by routers that don't set their own, sized by
+    ``REACTIVATED_RPC_MAX_THREADS``. ``None`` when that isn't set, which
+    leaves procedures on asgiref's threads."""
+    global _default_executor
+
+    max_threads = getattr(settings, "REACTIVATED_RPC_MAX_THREADS", None)
+    if max_threads is None:
+        return None
+    with _default_executor_lock:
+        if _default_executor is None or _default_executor.max_threads != max_threads:
+            _default_executor = RequestExecutor(max_threads)
+        return _default_executor
@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 import enum
-from typing import Any, Callable, Coroutine, Literal
+from typing import Any, Callable, Coroutine, Literal, overload
 
 from django.http import HttpRequest
 
+from .events import (
+    EventQueue,
+    RPCBatchObserverFunc,
+    RPCEvent,
+    get_user_id,
+    set_event_queue,
+)
+from .timing import RPCTimings
+
 
 class RequestStatus(enum.Enum):
     ERROR = "ERROR"
     MALFORMED = "MALFORMED"
     INVALID = "INVALID"
     SUCCESS = "SUCCESS"
+    CACHE_HIT = "CACHE_HIT"
+    COALESCED = "COALESCED"
+    REJECTED = "REJECTED"
 
 
 RPCObserverFunc = Callable[
@@ -27,14 +39,157 @@ RPCObserverFunc = Callable[
     Coroutine[Any, Any, None],
 ]
 
-_observer: RPCObserverFunc | None = None
+RPCTimedObserverFunc = Callable[
+    [
+        HttpRequest,  # request
+        str,  # rpc_name
+        Literal["errors"] | bool,  # log
+        RequestStatus,  # status
+        Any,  # input
+        Any,  # output
+        bytes | None,  # body
+        BaseException | None,  # exception
+        RPCTimings,  # timings
+    ],
+    Coroutine[Any, Any, None],
+]
+
+_observer: RPCObserverFunc | RPCTimedObserverFunc | None = None
+_observer_parsed = True
+_observer_timed = False
+
+
+@overload
+def rpc_observer(fn: RPCObserverFunc) -> RPCObserverFunc: ...
+
+
+@overload
+def rpc_observer(
+    *, parsed: bool = True, timings: Literal[False] = False
+) -> Callable[[RPCObserverFunc], RPCObserverFunc]: ...
 
 
-def rpc_observer(fn: RPCObserverFunc) -> RPCObserverFunc:
-    global _observer
+@overload
+def rpc_observer(
+    *, parsed: bool = True, timings: Literal[True]
+) -> Callable[[RPCTimedObserverFunc], RPCTimedObserverFunc]: ...
+
+
+def rpc_observer(
+    fn: RPCObserverFunc | None = None, *, parsed: bool = True, timings: bool = False
+) -> Any:
+    """Register the RPC observer. RPCs validate the raw body and encode the
+    response without ever building Python objects for either; with
+    ``parsed=False`` they stay that way, and the observer gets ``None`` for
+    the input and for a successful output. Otherwise both are parsed for
+    it. With ``timings=True`` it gets a last argument too, the call's
+    ``RPCTimings``."""
+
+    def register(fn: Any) -> Any:
+        set_event_queue(None)
+        _register(fn, parsed=parsed, timings=timings)
+        return fn
+
+    return register if fn is None else register(fn)
+
+
+def _register(fn: Any, *, parsed: bool, timings: bool) -> None:
+    global _observer, _observer_parsed, _observer_timed
     _observer = fn
-    return fn
+    _observer_parsed = parsed
+    _observer_timed = timings
+
+
+def rpc_batch_observer(
+    *,
+    parsed: bool = True,
+    timings: bool = False,
+    body: bool = False,
+    batch_size: int = 100,
+    max_size: int = 10000,
+    flush_interval: float = 1.0,
+    sample_rate: float = 1.0,
+    drop: Literal["newest", "oldest"] = "newest",
+) -> Callable[[RPCBatchObserverFunc], RPCBatchObserverFunc]:
+    """Register a sync RPC observer that receives lists of ``RPCEvent`` on a
+    background thread instead of being awaited by each call. Events keep
+    the raw body only with ``body=True``. See ``reactivated.rpc.events``
+    for the queue's options."""
+    keep_body = body
+
+    def register(fn: RPCBatchObserverFunc) -> RPCBatchObserverFunc:
+        queue = EventQueue(
+            fn,
+            batch_size=batch_size,
+            max_size=max_size,
+            flush_interval=flush_interval,
+            sample_rate=sample_rate,
+            drop=drop,
+        )
 
+        async def enqueue(
+            request: HttpRequest,
+            rpc_name: str,
+            log: Literal["errors"] | bool,
+            status: RequestStatus,
+            input: Any,
+            output: Any,
+            body: bytes | None,
+            exception: BaseException | None,
+            timings: RPCTimings | None = None,
+        ) -> None:
+            queue.put(
+                RPCEvent(
+                    path=request.path,
+                    method=request.method or "",
+                    user_id=await get_user_id(request),
+                    rpc_name=rpc_name,
+                    log=log,
+                    status=status,
+                    input=input,
+                    output=output,
+                    body=body if keep_body else None,
+                    exception=exception,
+                    timings=timings,
+                )
+            )
 
-def get_observer() -> RPCObserverFunc | None:
+        set_event_queue(queue)
+        _register(enqueue, parsed=parsed, timings=timings)
+        return fn
+
+    return register
+
+
+def get_observer() -> RPCObserverFunc | RPCTimedObserverFunc | None:
     return _observer
+
+
+def observer_wants_parsed() -> bool:
+    return _observer is not None and _observer_parsed
+
+
+def observer_wants_timings() -> bool:
+    return _observer is not None and _observer_timed
+
+
+async def notify_observer(
+    request: HttpRequest,
+    rpc_name: str,
+    log: Literal["errors"] | bool,
+    status: RequestStatus,
+    input: Any,
+    output: Any,
+    body: bytes | None,
+    exception: BaseException | None,
+    timings: RPCTimings | None,
+) -> None:
+    observer = _observer
+    if observer is None:
+        return
+    args = (request, rpc_name, log, status, input, output, body, exception)
+    if _observer_timed:
+        assert timings is not None
+        await observer(*args, timings)  # type: ignore[call-arg]
+    else:
+        await observer(*args)  # type: ignore[call-arg]
@@ -0,0 +1,211 @@
+"""Keyset pagination for query outputs.
+
+A query returning ``list[X.returns]`` sends every row at once, and paging
+it with an offset costs a scan of every row before the page. One
+returning ``Page[X.returns]`` sends ``{items, next}`` instead: at most
+``limit`` rows, and a cursor for the rest, or ``null`` on the last page.
+
+The cursor holds the ordering values of the page's last row, so the next
+page starts where that one ended with a ``WHERE`` on those values rather
+than an ``OFFSET``. Order by columns that are indexed and never null; the
+primary key is added as the last ordering column, so rows that tie on the
+others are neither skipped nor repeated. A cursor only makes sense for the
+ordering that produced it.
+
+The queryset is planned like any list of picks, so every page costs the
+same fixed number of queries.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import Any, Generic, Sequence, TypeVar, get_args
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models as dj_models
+from django.db.models import F, Q
+from pydantic import (
+    BaseModel,
+    Field,
+    GetCoreSchemaHandler,
+    field_validator,
+)
+from pydantic_core import core_schema
+
+from .planner import pick_holder_for
+
+T = TypeVar("T")
+
+DEFAULT_MAX_LIMIT = 100
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    encoded = json.dumps(list(values), cls=DjangoJSONEncoder).encode()
+    return base64.urlsafe_b64encode(encoded).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise ValueError("Invalid cursor") from error
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+class PageInput(BaseModel):
+    """The body of a paginated query. Subclass it to add filters."""
+
+    cursor: str | None = None
+    limit: int = Field(default=20, ge=1)
+
+    @field_validator("cursor")
+    @classmethod
+    def _check_cursor(cls, cursor: str | None) -> str | None:
+        if cursor is not None:
+            decode_cursor(cursor)
+        return cursor
+
+
+def _ordering_field(model: type[dj_models.Model], path: str) -> Any:
+    """The model field an ordering names, through relations, or ``None``
+    for anything else, such as an annotation."""
+    field: Any = None
+    for part in path.split("__"):
+        if model is None:
+            return None
+        try:
+            field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        model = field.related_model
+    return field
+
+
+class Page(Generic[T]):
+    """An unevaluated page of ``queryset``. Build it with ``Page.of`` and
+    return it; the RPC plans, runs and serializes it.
+
+    A cursor from another ordering, or with a value its column can't hold,
+    raises ``AssertionError``, so the call answers with a 400."""
+
+    def __init__(
+        self,
+        queryset: dj_models.QuerySet[Any],
+        *,
+        order_by: Sequence[str],
+        cursor: str | None,
+        limit: int,
+    ) -> None:
+        pk = {"pk", queryset.model._meta.pk.name}
+        unique = any(field.removeprefix("-") in pk for field in order_by)
+        self.order_by = [*order_by, *([] if unique else ["pk"])]
+        self.limit = limit
+        self.queryset = queryset
+        self.after = None
+        if cursor is not None:
+            self.after = self._check_cursor(cursor)
+
+    def _check_cursor(self, cursor: str) -> list[Any]:
+        try:
+            values = decode_cursor(cursor)
+        except ValueError:
+            raise AssertionError("Invalid cursor")
+        if len(values) != len(self.order_by):
+            raise AssertionError("The cursor belongs to a different ordering")
+        checked = []
+        for field, value in zip(self.order_by, values):
+            column = _ordering_field(self.queryset.model, field.removeprefix("-"))
+            try:
+                checked.append(value if column is None else column.to_python(value))
+            except ValidationError:
+                raise AssertionError("Invalid cursor")
+        return checked
+
+    @classmethod
+    def of(
+        cls,
+        queryset: dj_models.QuerySet[Any],
+        page: PageInput,
+        *,
+        order_by: Sequence[str],
+        max_limit: int = DEFAULT_MAX_LIMIT,
+    ) -> Page[Any]:
+        return cls(
+            queryset,
+            order_by=order_by,
+            cursor=page.cursor,
+            limit=min(page.limit, max_limit),
+        )
+
+    def _after(self) -> Q:
+        """Rows past the cursor: past it on the first column, or tied on the
+        first and past it on the second, and so on."""
+        assert self.after is not None
+        condition = Q()
+        tied = Q()
+        for field, value in zip(self.order_by, self.after):
+            name = field.removeprefix("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= tied & Q(**{f"{name}__{lookup}": value})
+            tied &= Q(**{name: value})
+        return condition
+
+    def resolve(self, optimize: Any = None) -> dict[str, Any]:
+        """Run the page: the rows, and the cursor for the rest.
+
+        ``optimize`` is the pick's planner. The ordering values ride along
+        as annotations, so reading them for the cursor never loads a
+        deferred column."""
+        queryset = self.queryset
+        if optimize is not None:
+            queryset = optimize(queryset)
+        if self.after is not None:
+            queryset = queryset.filter(self._after())
+        keys = {
+            f"_page_{index}": F(field.removeprefix("-"))
+            for index, field in enumerate(self.order_by)
+        }
+        rows = list(
+            queryset.annotate(**keys).order_by(*self.order_by)[: self.limit + 1]
+        )
+
+        cursor = None
+        if len(rows) > self.limit:
+            rows = rows[: self.limit]
+            cursor = encode_cursor([getattr(rows[-1], key) for key in keys])
+        return {"items": rows, "next": cursor}
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        (item,) = get_args(source) or (Any,)
+        items: Any = list[item]  # type: ignore[valid-type]
+        holder = pick_holder_for(items)
+        brand = holder.get_name() if holder is not None else "Page"
+        # Branded by the item, so the client cannot hand one query's cursor
+        # to another.
+        cursor = core_schema.str_schema(
+            metadata={
+                "pydantic_js_functions": [
+                    lambda schema, handler: {
+                        "type": "string",
+                        "tsType": f'Cursor<"{brand}">',
+                    }
+                ]
+            }
+        )
+        return core_schema.typed_dict_schema(
+            {
+                "items": core_schema.typed_dict_field(handler.generate_schema(items)),
+                "next": core_schema.typed_dict_field(
+                    core_schema.nullable_schema(cursor)
+                ),
+            }
+        )
@@ -0,0 +1,248 @@
+"""Query planning for picks.
+
+A pick's dotted field paths already say which relations serialization will
+walk. Left alone, ``ModelToPick`` walks them lazily — one query per foreign
+key per row, and one ``list(manager.all())`` per related manager per row.
+The planner turns the same paths into a tree of relations and applies it up
+front: single-valued hops (forward foreign keys and one-to-ones, in either
+direction) become ``select_related`` joins, and many-valued hops become a
+``Prefetch`` whose queryset carries the rest of the tree beneath it.
+
+The same tree records the columns each model's fields read, and every other
+column is deferred. Properties, methods and computed relations declare what
+they read with ``depends_on``, as does the pick itself for its extra fields.
+A model with an undeclared computed field keeps all of its columns, since
+deferring one it reads would cost a query per row. Relations the planner
+cannot see through are left to lazy loading, exactly as before.
+"""
+
+from __future__ import annotations
+
+from types import NoneType, UnionType
+from typing import TYPE_CHECKING, Any, TypeVar, Union, get_args, get_origin
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models as dj_models
+from django.db.models import Prefetch
+from django.db.models.fields.reverse_related import ForeignObjectRel
+from django.db.models.query import ModelIterable
+
+if TYPE_CHECKING:
+    from .core import BasePickHolder
+
+TModel = TypeVar("TModel", bound=dj_models.Model)
+
+
+class PlanNode:
+    """One model in the plan: the relations serialization reaches from it,
+    keyed by the lookup name Django's queryset API expects, and the columns
+    it reads. A node whose fields include a computed value with no declared
+    dependencies is not projectable: all of its columns load."""
+
+    def __init__(
+        self,
+        model: type[dj_models.Model],
+        multiple: bool = False,
+        link: str | None = None,
+    ) -> None:
+        self.model = model
+        self.multiple = multiple
+        # The field on this model that points back at the parent, for
+        # reverse relations: prefetching and joining both match on it.
+        self.link = link
+        self.relations: dict[str, PlanNode] = {}
+        self.columns: set[str] = set()
+        self.projectable = True
+
+    def add_path(self, chain: list[str]) -> PlanNode | None:
+        """Record the relations along ``chain`` (a pick field split on dots)
+        and return the node that owns its last segment, or ``None`` if the
+        path leaves what the ORM can plan."""
+        node = self
+        for segment in chain[:-1]:
+            child = node.relation(segment)
+            if child is None:
+                node.add_computed(segment)
+                return None
+            node = child
+        return node
+
+    def add_field(self, path: str) -> None:
+        chain = path.split(".")
+        owner = self.add_path(chain)
+        if owner is not None:
+            owner.add_column(chain[-1])
+
+    def add_column(self, name: str) -> None:
+        if name == "pk":
+            return
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            self.add_computed(name)
+            return
+        if getattr(field, "concrete", False):
+            self.columns.add(field.name)
+
+    def add_computed(self, name: str) -> None:
+        """Properties, methods and computed relations run on the instance,
+        so whatever they read must be loaded: their declared dependencies
+        if any, every column otherwise."""
+        from ..models import get_depends_on
+
+        depends_on = get_depends_on(getattr(self.model, name, None))
+        if depends_on is None:
+            self.projectable = False
+            return
+        for path in depends_on:
+            self.add_field(path)
+
+    def relation(self, name: str) -> PlanNode | None:
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+        if not field.is_relation or field.related_model is None:
+            return None
+
+        if isinstance(field, ForeignObjectRel):
+            lookup = field.get_accessor_name()
+            link = field.field.name
+        else:
+            lookup = field.name
+            link = None
+            # The foreign key column itself is what select_related joins on.
+            if field.concrete:
+                self.columns.add(field.name)
+        assert lookup is not None
+
+        child = self.relations.get(lookup)
+        if child is None:
+            child = PlanNode(
+                field.related_model,  # type: ignore[arg-type]
+                multiple=bool(field.many_to_many or field.one_to_many),
+                link=link,
+            )
+            if link is not None:
+                child.columns.add(link)
+            self.relations[lookup] = child
+        return child
+
+    def deferred(self) -> list[str]:
+        if not self.projectable:
+            return []
+        return [
+            field.name
+            for field in self.model._meta.fields
+            if field.concrete
+            and not field.primary_key
+            and field.name not in self.columns
+        ]
+
+    def lookups(self, prefix: str = "") -> tuple[list[str], list[Prefetch], list[str]]:
+        select_related: list[str] = []
+        prefetch_related: list[Prefetch] = []
+        defer = [f"{prefix}{name}" for name in self.deferred()]
+
+        for name, child in self.relations.items():
+            path = f"{prefix}{name}"
+            if child.multiple:
+                related = child.model._default_manager.all()
+                prefetch_related.append(Prefetch(path, queryset=child.apply(related)))
+            else:
+                select_related.append(path)
+                nested_select, nested_prefetch, nested_defer = child.lookups(
+                    f"{path}__"
+                )
+                select_related.extend(nested_select)
+                prefetch_related.extend(nested_prefetch)
+                defer.extend(nested_defer)
+
+        return select_related, prefetch_related, defer
+
+    def apply(self, queryset: dj_models.QuerySet[TModel]) -> dj_models.QuerySet[TModel]:
+        """Apply the plan to ``queryset`` without disturbing what the caller
+        already asked for. Evaluated, ``values()`` and combined querysets
+        are returned untouched, as are prefetch lookups the caller set up
+        with their own queryset and any only()/defer() they applied."""
+        if (
+            queryset._result_cache is not None
+            or not issubclass(queryset._iterable_class, ModelIterable)
+            or queryset.query.combinator is not None
+        ):
+            return queryset
+
+        select_related, prefetch_related, defer = self.lookups()
+
+        # select_related() with no arguments already follows every non-null
+        # foreign key; naming some would narrow it, and the related columns
+        # the plan would defer are no longer the plan's to defer.
+        if queryset.query.select_related is True:
+            defer = [name for name in defer if "__" not in name]
+        elif select_related:
+            queryset = queryset.select_related(*select_related)
+
+        if defer and queryset.query.deferred_loading == (frozenset(), True):
+            queryset = queryset.defer(*defer)
+
+        existing = {
+            lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+            for lookup in queryset._prefetch_related_lookups  # type: ignore[attr-defined]
+        }
+        prefetch_related = [
+            lookup for lookup in prefetch_related if lookup.prefetch_to not in existing
+        ]
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        return queryset
+
+
+def _add_holder(node: PlanNode, holder: type[BasePickHolder]) -> None:
+    # Only what the output serializes: write-only fields never leave the
+    # server.
+    for field in holder.fields:
+        if isinstance(field, tuple):
+            # (relation, NestedPick): the nested pick's fields hang off the
+            # relation, so plan them from there.
+            field_name, nested = field
+            if field_name in holder.write_only_fields:
+                continue
+            target = node.add_path([*field_name.split("."), "id"])
+            if target is not None and hasattr(nested, "fields"):
+                _add_holder(target, nested)
+        elif field not in holder.write_only_fields:
+            node.add_field(field)
+
+    for path in holder.depends_on:
+        node.add_field(path)
+
+
+def build_plan(holder: type[BasePickHolder]) -> PlanNode:
+    root = PlanNode(holder.model_class)
+    _add_holder(root, holder)
+    return root
+
+
+def pick_holder_for(annotation: Any) -> type[BasePickHolder] | None:
+    """The pick behind a list-of-picks output annotation — ``list[X.returns]``,
+    ``Page[X.returns]`` or ``Stream[X.returns]``, optionally ``| None`` — or
+    ``None`` if there isn't exactly one."""
+    from .core import BasePickHolder
+    from .pagination import Page
+    from .streaming import Stream
+
+    origin = get_origin(annotation)
+
+    if origin is Union or origin is UnionType:
+        candidates = [arg for arg in get_args(annotation) if arg is not NoneType]
+        return pick_holder_for(candidates[0]) if len(candidates) == 1 else None
+
+    if origin in (list, Page, Stream):
+        (item,) = get_args(annotation)
+        holder = getattr(item, "pick_holder", item)
+        if isinstance(holder, type) and issubclass(holder, BasePickHolder):
+            return holder
+
+    return None
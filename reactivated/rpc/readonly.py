@@ -0,0 +1,93 @@
+"""Read-only queries.
+
+Queries already run without the request transaction. One declared with
+``read_only=True`` also promises not to write: any statement other than a
+read that its handler or serialization sends to any database raises
+``ReadOnlyError`` before it runs. With ``ReplicaRouter`` in your
+``DATABASE_ROUTERS``, the same queries read from a replica: the alias
+given as ``replica=``, or ``REACTIVATED_RPC_REPLICA``.
+
+Only the handler and serialization are covered. The scope chain, the
+query cache and the observer run as they would for any query, on the
+primary.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import re
+from typing import Any, Callable, Iterator
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from reactivated.utils import install_execute_wrapper
+
+# The first keyword of every statement a read may send, including the
+# session and savepoint statements Django issues around them.
+READ_STATEMENTS = frozenset(
+    ["SELECT", "EXPLAIN", "SHOW", "SET", "SAVEPOINT", "RELEASE", "ROLLBACK"]
+)
+
+# A WITH may wrap a write, as in Postgres's ``WITH d AS (DELETE ...)
+# SELECT ...``, so it only passes without a write keyword outside quotes.
+_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_WRITE_KEYWORDS = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+_read_only: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "reactivated_read_only", default=False
+)
+_replica: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "reactivated_replica", default=None
+)
+
+
+class ReadOnlyError(DatabaseError):
+    pass
+
+
+def get_replica_alias() -> str | None:
+    return getattr(settings, "REACTIVATED_RPC_REPLICA", None)
+
+
+@contextlib.contextmanager
+def guarded(replica: str | None) -> Iterator[None]:
+    """Reads inside the block go to ``replica``, when ``ReplicaRouter`` is
+    installed, and writes raise."""
+    read_only_token = _read_only.set(True)
+    replica_token = _replica.set(replica)
+    try:
+        yield
+    finally:
+        _replica.reset(replica_token)
+        _read_only.reset(read_only_token)
+
+
+def _write_guard(
+    execute: Callable[..., Any], sql: str, params: Any, many: bool, context: Any
+) -> Any:
+    if _read_only.get() and not _is_read(sql):
+        raise ReadOnlyError(f"A read-only query attempted a write: {sql[:200]}")
+    return execute(sql, params, many, context)
+
+
+def _is_read(sql: str) -> bool:
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if keyword == "WITH":
+        return not _WRITE_KEYWORDS.search(_QUOTED.sub("", sql))
+    return keyword in READ_STATEMENTS
+
+
+def install_write_guard() -> None:
+    """Put the write guard on this thread's connections. It stays there,
+    idle outside ``guarded()`` blocks, so each thread pays for it once."""
+    install_execute_wrapper(_write_guard)
+
+
+class ReplicaRouter:
+    """Sends the reads of read-only queries to their replica, and leaves
+    every other routing decision to the routers after it."""
+
+    def db_for_read(self, model: Any, **hints: Any) -> str | None:
+        return _replica.get()
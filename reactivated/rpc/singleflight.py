@@ -0,0 +1,205 @@
+"""Coalescing identical concurrent queries.
+
+When many clients ask for the same query at once, a query declared with
+``single_flight=SingleFlight()`` runs once: the first call leads, and the
+calls that arrive while it runs wait for it and answer with its serialized
+output. Calls are identical when they name the same procedure with the
+same URL params, input and principal. ``SingleFlight(shared=True)``
+drops the principal, for queries whose result is the same for everyone
+allowed to ask.
+
+Coalescing is per process by default. A ``backend`` extends it across
+processes: ``CacheFlightBackend`` elects one leader host-wide through one
+of your ``CACHES`` and hands its output to the others.
+
+Only a successful output is shared. When the leader fails or its input is
+rejected, the calls waiting on it run on their own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import threading
+import time
+import uuid
+from types import TracebackType
+from typing import Any, Protocol
+
+from django.core.cache import caches
+
+from .cache import _schema_digest, principal_id, vary_digest
+
+
+class FlightBackend(Protocol):
+    async def acquire(self, key: str) -> str | None:
+        """A token if this call leads the flight, or ``None`` if a call in
+        another process already does."""
+        ...
+
+    async def wait(self, key: str) -> bytes | None:
+        """The output of the flight another process leads, or ``None`` if
+        it ends without one."""
+        ...
+
+    async def release(self, key: str, token: str, output: bytes | None) -> None: ...
+
+
+class CacheFlightBackend:
+    """Cross-process flights through a Django cache. The leader holds a lock
+    entry naming its flight, and publishes its output under that name. The
+    others poll for it every ``poll_interval`` seconds, for up to
+    ``timeout``."""
+
+    def __init__(
+        self, alias: str = "default", timeout: float = 30, poll_interval: float = 0.01
+    ) -> None:
+        self.alias = alias
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    async def acquire(self, key: str) -> str | None:
+        token = uuid.uuid4().hex
+        added = await caches[self.alias].aadd(f"{key}:lock", token, self.timeout)
+        return token if added else None
+
+    async def wait(self, key: str) -> bytes | None:
+        cache = caches[self.alias]
+        token = await cache.aget(f"{key}:lock")
+        deadline = time.monotonic() + self.timeout
+        while token is not None and time.monotonic() < deadline:
+            output: bytes | None = await cache.aget(f"{key}:{token}")
+            if output is not None:
+                return output
+            if await cache.aget(f"{key}:lock") != token:
+                # The leader finished between the two reads, or failed.
+                output = await cache.aget(f"{key}:{token}")
+                return output
+            await asyncio.sleep(self.poll_interval)
+        return None
+
+    async def release(self, key: str, token: str, output: bytes | None) -> None:
+        cache = caches[self.alias]
+        if output is not None:
+            await cache.aset(f"{key}:{token}", output, self.timeout)
+        if await cache.aget(f"{key}:lock") == token:
+            await cache.adelete(f"{key}:lock")
+
+
+@dataclasses.dataclass(frozen=True)
+class SingleFlight:
+    shared: bool = False
+    backend: FlightBackend | None = None
+
+
+class SingleFlightStats:
+    """Executions and coalesced calls for this process since it started,
+    or since the last ``reset()``."""
+
+    def __init__(self) -> None:
+        self.executed = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def record(self, coalesced: bool) -> None:
+        with self._lock:
+            if coalesced:
+                self.coalesced += 1
+            else:
+                self.executed += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.executed = self.coalesced = 0
+
+
+single_flight_stats = SingleFlightStats()
+
+# Concurrent futures rather than asyncio ones: under WSGI every request has
+# its own event loop, and the calls coalescing may be on any of them.
+_flights: dict[str, concurrent.futures.Future[bytes | None]] = {}
+_flights_lock = threading.Lock()
+
+
+class Flight:
+    """One call's place in a flight. ``join()`` either returns the output
+    another call produced, or makes this call the leader, which must
+    ``land()`` its output; leaving the ``async with`` block without
+    landing releases the calls waiting on it to run on their own."""
+
+    def __init__(
+        self,
+        config: SingleFlight,
+        rpc_name: str,
+        *,
+        kwargs: dict[str, Any],
+        principal: Any,
+        payload: Any,
+    ) -> None:
+        self.backend = config.backend
+        owner = None if config.shared else principal_id(principal)
+        digest = vary_digest([kwargs, owner, payload])
+        self.key = f"reactivated:rpc:flight:{rpc_name}:{_schema_digest()}:{digest}"
+        self._future: concurrent.futures.Future[bytes | None] | None = None
+        self._token: str | None = None
+
+    async def join(self) -> bytes | None:
+        with _flights_lock:
+            leader = _flights.get(self.key)
+            if leader is None:
+                self._future = _flights[self.key] = concurrent.futures.Future()
+
+        if leader is not None:
+            # Shielded: cancelling one waiting call must not cancel the
+            # future every other call is waiting on.
+            output = await asyncio.shield(asyncio.wrap_future(leader))
+        elif self.backend is not None:
+            self._token = await self.backend.acquire(self.key)
+            output = None if self._token else await self.backend.wait(self.key)
+            if output is not None:
+                # Led elsewhere: hand it on to the calls waiting here.
+                self._finish(output)
+        else:
+            output = None
+
+        if output is not None:
+            single_flight_stats.record(coalesced=True)
+        return output
+
+    async def land(self, output: bytes) -> None:
+        if self._future is None:
+            return
+        single_flight_stats.record(coalesced=False)
+        await self._release(output)
+
+    async def _release(self, output: bytes | None) -> None:
+        self._finish(output)
+        if self.backend is not None and self._token is not None:
+            token, self._token = self._token, None
+            await self.backend.release(self.key, token, output)
+
+    def _finish(self, output: bytes | None) -> None:
+        future, self._future = self._future, None
+        if future is None:
+            return
+        with _flights_lock:
+            if _flights.get(self.key) is future:
+                del _flights[self.key]
+        if not future.done():
+            future.set_result(output)
+
+    async def __aenter__(self) -> Flight:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self._release(None)
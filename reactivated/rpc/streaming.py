@@ -0,0 +1,150 @@
+"""Streaming outputs.
+
+A procedure returning ``list[X.returns]`` builds the whole JSON array in
+memory before the first byte goes out, so an export of a hundred thousand
+rows needs room for all of them at once. One returning ``Stream[X.returns]``
+sends its rows as NDJSON, one JSON value per line, as they are read:
+``REACTIVATED_RPC_STREAM_CHUNK_SIZE`` rows at a time, 500 unless set, so
+memory stays flat however many rows there are.
+
+Return ``Stream(rows)``, where ``rows`` is a queryset, any iterable or an
+async iterable. A queryset is planned like any list of picks and read with
+``iterator()``, a chunk of rows and their relations at a time. The status
+line goes out before the first row is read, so the call counts as a
+success from then on. An error partway through cuts the stream short.
+
+Under WSGI, rows that aren't async are read by a plain generator on the
+server's thread, since Django would collect an async one in memory first.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    ContextManager,
+    Generic,
+    Iterable,
+    Iterator,
+    TypeVar,
+    get_args,
+)
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models as dj_models
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+T = TypeVar("T")
+
+CONTENT_TYPE = "application/x-ndjson"
+
+
+def get_stream_chunk_size() -> int:
+    return getattr(settings, "REACTIVATED_RPC_STREAM_CHUNK_SIZE", 500)
+
+
+class Stream(Generic[T]):
+    """Rows to send one at a time. On the client, and in the schema, a
+    ``Stream[T]`` is typed by ``T``, the type of one row."""
+
+    def __init__(self, rows: Iterable[Any] | AsyncIterable[Any]) -> None:
+        self.rows = rows
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        (item,) = get_args(source) or (Any,)
+        return handler.generate_schema(item)
+
+
+def stream_rows(
+    rows: Iterable[Any] | AsyncIterable[Any],
+    dump: Callable[[Any], bytes],
+    *,
+    optimize: Callable[[Any], Any] | None = None,
+    reads: Callable[[], ContextManager[None]] = contextlib.nullcontext,
+    asgi: bool = True,
+) -> Iterator[bytes] | AsyncIterator[bytes]:
+    """NDJSON for ``rows``, a chunk of lines at a time.
+
+    Rows are read and serialized inside ``reads()``, the read-only guard of
+    the call. Under ASGI that happens on a worker thread, since both may
+    query; otherwise ``asgi`` is false and a sync iterator is returned."""
+    chunk_size = get_stream_chunk_size()
+
+    def encode(chunk: list[Any]) -> bytes:
+        return b"".join(dump(row) + b"\n" for row in chunk)
+
+    # Before the async check: querysets are async iterables too.
+    if isinstance(rows, dj_models.QuerySet):
+        queryset = optimize(rows) if optimize is not None else rows
+        iterator = queryset.iterator(chunk_size=chunk_size)
+    elif isinstance(rows, AsyncIterable):
+        return _stream_async(rows, encode, chunk_size, reads)
+    else:
+        iterator = iter(rows)
+    if not asgi:
+        return _stream_wsgi(iterator, encode, chunk_size, reads)
+    return _stream_sync(iterator, encode, chunk_size, reads)
+
+
+def _stream_wsgi(
+    rows: Iterator[Any],
+    encode: Callable[[list[Any]], bytes],
+    chunk_size: int,
+    reads: Callable[[], ContextManager[None]],
+) -> Iterator[bytes]:
+    while True:
+        with reads():
+            chunk = encode(list(itertools.islice(rows, chunk_size)))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _stream_sync(
+    rows: Iterator[Any],
+    encode: Callable[[list[Any]], bytes],
+    chunk_size: int,
+    reads: Callable[[], ContextManager[None]],
+) -> AsyncIterator[bytes]:
+    def next_chunk() -> bytes:
+        return encode(list(itertools.islice(rows, chunk_size)))
+
+    while True:
+        with reads():
+            chunk = await sync_to_async(next_chunk)()
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _stream_async(
+    rows: AsyncIterable[Any],
+    encode: Callable[[list[Any]], bytes],
+    chunk_size: int,
+    reads: Callable[[], ContextManager[None]],
+) -> AsyncIterator[bytes]:
+    iterator = aiter(rows)
+    done = False
+    while not done:
+        chunk: list[Any] = []
+        # Never yield inside reads(): the context it sets must be reset in
+        # the same step that set it.
+        with reads():
+            while len(chunk) < chunk_size:
+                try:
+                    chunk.append(await anext(iterator))
+                except StopAsyncIteration:
+                    done = True
+                    break
+            encoded = await sync_to_async(encode)(chunk) if chunk else b""
+        if encoded:
+            yield encoded
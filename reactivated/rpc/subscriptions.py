@@ -0,0 +1,263 @@
+"""Subscribing to queries.
+
+A screen that polls a query every few seconds sends one request per tab
+per interval, whether or not anything changed. A query declared with
+``subscription=Subscription(topics=[...])`` can also be held open: a call
+asking for ``text/event-stream`` gets server-sent events instead of one
+response. The first event carries the query's output. After that, the
+query runs again each time something calls ``publish()`` on one of its
+topics, and an event goes out only when the output changed.
+
+Each run is a full call of the query, scope chain or access function
+included, so a subscriber who loses access gets an ``error`` event and the
+stream ends. Topics may name URL params in braces, like
+``"opera:{opera_id}"``, just as ``QueryCache`` tags do.
+
+Events are ``data``, with the whole output; ``patch``, a JSON merge patch
+(RFC 7386) against the previous output, sent instead when it is smaller;
+and ``error``, with the status and body of a failed run. A comment goes
+out every ``keepalive`` seconds so proxies keep the stream open.
+
+Subscriptions need ASGI. Under WSGI a held-open stream would tie up a
+worker until the subscriber leaves, so a request for events there is
+refused with a 406.
+
+Publishing is in-process by default. ``REACTIVATED_RPC_PUBSUB`` names a
+``PubSubBackend`` class to fan out across processes or hosts, such as one
+built on Redis or Postgres ``LISTEN``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import dataclasses
+import json
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Protocol, Sequence
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections, transaction
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+CONTENT_TYPE = "text/event-stream"
+
+_UNSET = object()
+
+
+@dataclasses.dataclass(frozen=True)
+class Subscription:
+    """How to hold one query open: the topics whose publishes run it
+    again, and how often to send a keepalive."""
+
+    topics: Sequence[str]
+    keepalive: float = 15
+
+
+class Listener(Protocol):
+    async def wait(self, timeout: float) -> bool:
+        """Whether any of the topics was published to within ``timeout``
+        seconds, or since the last call. Publishes in between run
+        together."""
+        ...
+
+    def close(self) -> None: ...
+
+
+class PubSubBackend(Protocol):
+    def listen(self, topics: Sequence[str]) -> Listener:
+        """Start listening, from inside the subscriber's event loop."""
+        ...
+
+    def publish(self, topic: str) -> None: ...
+
+
+class _LocalListener:
+    def __init__(self, backend: LocalPubSub, topics: Sequence[str]) -> None:
+        self.backend = backend
+        self.topics = list(topics)
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self) -> None:
+        # Publishers run on any thread, and each subscriber waits in the
+        # event loop of its own request.
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+    def close(self) -> None:
+        self.backend._remove(self)
+
+
+class LocalPubSub:
+    """Publishes reach the subscribers of this process only."""
+
+    def __init__(self) -> None:
+        self._listeners: dict[str, set[_LocalListener]] = {}
+        self._lock = threading.Lock()
+
+    def listen(self, topics: Sequence[str]) -> Listener:
+        listener = _LocalListener(self, topics)
+        with self._lock:
+            for topic in listener.topics:
+                self._listeners.setdefault(topic, set()).add(listener)
+        return listener
+
+    def _remove(self, listener: _LocalListener) -> None:
+        with self._lock:
+            for topic in listener.topics:
+                listeners = self._listeners.get(topic, set())
+                listeners.discard(listener)
+                if not listeners:
+                    self._listeners.pop(topic, None)
+
+    def publish(self, topic: str) -> None:
+        with self._lock:
+            listeners = list(self._listeners.get(topic, ()))
+        for listener in listeners:
+            listener.notify()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(set().union(*self._listeners.values()))
+
+
+_backend: PubSubBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_pubsub() -> PubSubBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            path = getattr(settings, "REACTIVATED_RPC_PUBSUB", None)
+            _backend = import_string(path)() if path else LocalPubSub()
+        return _backend
+
+
+def publish(*topics: str) -> None:
+    """Run the subscribed queries listening on any of ``topics`` again.
+    Inside a transaction this waits for the commit, so they see the data
+    being published."""
+    backend = get_pubsub()
+
+    def send() -> None:
+        for topic in topics:
+            backend.publish(topic)
+
+    transaction.on_commit(send)
+
+
+def wants_events(request: HttpRequest) -> bool:
+    return CONTENT_TYPE in request.headers.get("Accept", "")
+
+
+def is_asgi(request: HttpRequest) -> bool:
+    return isinstance(request, ASGIRequest)
+
+
+def merge_patch(old: Any, new: Any) -> dict[str, Any] | None:
+    """A JSON merge patch taking ``old`` to ``new``, or ``None`` when there
+    is none: either isn't an object, or ``new`` sets a value to ``null``,
+    which a merge patch reads as removing it."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return None
+    patch: dict[str, Any] = dict.fromkeys(old.keys() - new.keys())
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        if value is None:
+            return None
+        if isinstance(value, dict) and isinstance(old.get(key), dict):
+            nested = merge_patch(old[key], value)
+            if nested is None:
+                return None
+            patch[key] = nested
+        else:
+            patch[key] = value
+    return patch
+
+
+def _event(name: str, data: Any) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _run_request(request: HttpRequest) -> HttpRequest:
+    """A copy of the subscribing request for one run, asking for JSON and
+    with nothing to compare an ETag against."""
+    run = copy.copy(request)
+    run.META = {
+        key: value for key, value in request.META.items() if key != "HTTP_IF_NONE_MATCH"
+    }
+    run.META["HTTP_ACCEPT"] = "application/json"
+    run.__dict__.pop("headers", None)
+    return run
+
+
+def _close_idle_connections() -> None:
+    """Connections would otherwise stay open, idle, as long as the
+    subscriber does. One inside a transaction, as in tests, stays."""
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+async def events(
+    request: HttpRequest,
+    config: Subscription,
+    kwargs: dict[str, Any],
+    run: Callable[[HttpRequest], Awaitable[HttpResponse]],
+) -> AsyncIterator[bytes]:
+    # Listen before the first run, so nothing published during it is
+    # missed.
+    listener = get_pubsub().listen([topic.format(**kwargs) for topic in config.topics])
+    # Read now, so every run's copy of the request shares it.
+    request.body
+    last: Any = _UNSET
+    try:
+        while True:
+            response = await run(_run_request(request))
+            await sync_to_async(_close_idle_connections)()
+            is_json = response.get("Content-Type", "").startswith("application/json")
+            data = json.loads(response.content) if is_json else None
+            if response.status_code != 200:
+                yield _event("error", {"status": response.status_code, "data": data})
+                return
+            if data != last:
+                full = _event("data", data)
+                patch = merge_patch(last, data)
+                partial = _event("patch", patch) if patch is not None else None
+                yield partial if partial and len(partial) < len(full) else full
+                last = data
+            while not await listener.wait(config.keepalive):
+                yield b": keepalive\n\n"
+    finally:
+        listener.close()
+
+
+def subscribe(
+    request: HttpRequest,
+    config: Subscription,
+    kwargs: dict[str, Any],
+    run: Callable[[HttpRequest], Awaitable[HttpResponse]],
+) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(
+        events(request, config, kwargs, run), content_type=CONTENT_TYPE
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stops nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,86 @@
+"""Where a procedure call's time goes.
+
+Each call is split into phases: ``transaction`` (opening the request
+transaction), ``scope`` (the scope chain or access function), ``input``
+(parsing and validating the body), ``cache`` and ``flight`` (looking up a
+cached or in-flight result), ``handler``, ``serialize`` and ``commit``.
+With ``REACTIVATED_RPC_SERVER_TIMING = True`` every response carries them
+in a ``Server-Timing`` header. An observer registered with
+``rpc_observer(timings=True)`` receives them, with the number of queries
+the call sent, as ``RPCTimings``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import time
+from typing import Any, Callable, Iterator
+
+from django.conf import settings
+
+from reactivated.utils import install_execute_wrapper
+
+_timings: contextvars.ContextVar[RPCTimings | None] = contextvars.ContextVar(
+    "reactivated_rpc_timings", default=None
+)
+
+
+def server_timing_enabled() -> bool:
+    return getattr(settings, "REACTIVATED_RPC_SERVER_TIMING", False)
+
+
+class RPCTimings:
+    """Nanoseconds spent in each phase of one call, in the order the phases
+    ran, and the queries sent on the call's thread. Phases a call never
+    reached are missing."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter_ns()
+        self.phases: dict[str, int] = {}
+        self.queries = 0
+
+    @property
+    def total(self) -> int:
+        return time.perf_counter_ns() - self.started
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.phases[name] = (
+                self.phases.get(name, 0) + time.perf_counter_ns() - start
+            )
+
+    @contextlib.contextmanager
+    def counting(self) -> Iterator[None]:
+        """Count the queries sent inside the block, by code running in this
+        context, once ``install_query_counter()`` has run on their thread."""
+        token = _timings.set(self)
+        try:
+            yield
+        finally:
+            _timings.reset(token)
+
+    def header(self) -> str:
+        metrics = [
+            f"{name};dur={duration / 1e6:.3f}" for name, duration in self.phases.items()
+        ]
+        metrics.append(f'db;desc="{self.queries} queries"')
+        metrics.append(f"total;dur={self.total / 1e6:.3f}")
+        return ", ".join(metrics)
+
+
+def _query_counter(
+    execute: Callable[..., Any], sql: str, params: Any, many: bool, context: Any
+) -> Any:
+    timings = _timings.get()
+    if timings is not None:
+        timings.queries += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter() -> None:
+    install_execute_wrapper(_query_counter)
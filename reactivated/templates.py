@@ -2,45 +2,196 @@ from __future__ import annotations
 
 from typing import Any, ClassVar, Type
 
+import simplejson
+from asgiref.sync import sync_to_async
 from django.contrib import admin
-from django.http import HttpRequest, HttpResponse
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from django.template.response import TemplateResponse
 from django.utils.safestring import mark_safe
+from pydantic import model_validator
 
 from .context import get_context_class, get_context_processors
-from .renderer import render_jsx_to_string
-from .rpc.core import Pick
+from .render_cache import get_secrets
+from .renderer import (
+    AsyncRendererStream,
+    RendererStream,
+    RenderPayload,
+    arender_payload,
+    arender_payload_to_stream,
+    render_payload,
+    render_payload_to_stream,
+)
+from .rpc.core import BasePickHolder, Pick
+from .rpc.planner import pick_holder_for
+from .utils import respond_with_etag
 
 template_registry: dict[str, Type[Template]] = {}
 
+# Template class -> {field name: pick} for fields typed as a list of picks.
+_queryset_picks: dict[type, dict[str, type[BasePickHolder]]] = {}
+
+
+def get_queryset_picks(
+    template_class: type[Template],
+) -> dict[str, type[BasePickHolder]]:
+    picks = _queryset_picks.get(template_class)
+    if picks is None:
+        picks = {}
+        for name, field in template_class.model_fields.items():
+            holder = pick_holder_for(field.annotation)
+            if holder is not None:
+                picks[name] = holder
+        _queryset_picks[template_class] = picks
+    return picks
+
 
 class Template(Pick):
     _abstract: ClassVar[bool] = True
+    # Set to False for templates whose HTML isn't a function of their props
+    # and context alone, to keep them out of REACTIVATED_RENDER_CACHE.
+    _render_cache: ClassVar[bool] = True
 
     def __init_subclass__(cls, **kwargs: Any) -> None:
         super().__init_subclass__(**kwargs)
         if not cls.__dict__.get("_abstract", False):
             template_registry[cls.__name__] = cls
 
-    def render_to_string(
-        self, request: HttpRequest, entry_point: str | None = None
-    ) -> str:
-        props = self.model_dump(mode="json")
-
+    @model_validator(mode="before")
+    @classmethod
+    def _optimize_querysets(cls, values: Any) -> Any:
+        """A queryset passed for a list-of-picks prop is planned before
+        validation evaluates it."""
+        if not isinstance(values, dict):
+            return values
+        picks = get_queryset_picks(cls)
+        if not picks:
+            return values
+        return {
+            name: (
+                picks[name].optimize(value)
+                if name in picks and isinstance(value, QuerySet)
+                else value
+            )
+            for name, value in values.items()
+        }
+
+    def get_context(self, request: HttpRequest) -> Pick:
         context_dict: dict[str, Any] = {"template_name": self.__class__.__name__}
         for processor in get_context_processors():
             context_dict.update(processor(request))
 
         Context = get_context_class()
-        context = Context(**context_dict).model_dump(mode="json")
+        return Context(**context_dict)
 
-        return render_jsx_to_string(request, context, props, entry_point=entry_point)
+    def get_payload(
+        self, request: HttpRequest, entry_point: str | None = None
+    ) -> RenderPayload:
+        """The renderer's request body, encoded straight to bytes by the
+        pydantic serializers, without building the intermediate dicts."""
+        context = self.get_context(request)
+        parts = [
+            b'{"context":',
+            context.__pydantic_serializer__.to_json(context),
+            b',"props":',
+            self.__pydantic_serializer__.to_json(self),
+        ]
+        if entry_point is not None:
+            parts += [b',"entry_point":', simplejson.dumps(entry_point).encode()]
+        parts.append(b"}")
+
+        secrets = get_secrets(
+            getattr(context, "csrf_token", None),
+            getattr(getattr(context, "request", None), "csp_nonce", None),
+        )
+        return RenderPayload(b"".join(parts), self.__class__.__name__, secrets)
+
+    def render_to_bytes(
+        self, request: HttpRequest, entry_point: str | None = None
+    ) -> bytes:
+        payload = self.get_payload(request, entry_point)
+        return render_payload(request, payload, cache=self._render_cache)
+
+    def render_to_string(
+        self, request: HttpRequest, entry_point: str | None = None
+    ) -> str:
+        return self.render_to_bytes(request, entry_point).decode()
+
+    def render_to_stream(
+        self, request: HttpRequest, entry_point: str | None = None
+    ) -> bytes | RendererStream:
+        return render_payload_to_stream(request, self.get_payload(request, entry_point))
+
+    def _overrides_render_to_string(self) -> bool:
+        # render_to_string is the hook render() has always honored, so
+        # subclasses overriding it keep working.
+        return type(self).render_to_string is not Template.render_to_string
 
     def render(self, request: HttpRequest, status: int = 200) -> HttpResponse:
-        response = HttpResponse(self.render_to_string(request), status=status)
+        if self._overrides_render_to_string():
+            rendered = self.render_to_string(request).encode()
+        else:
+            rendered = self.render_to_bytes(request)
+        return self._respond(request, rendered, status)
+
+    def stream(self, request: HttpRequest, status: int = 200) -> HttpResponseBase:
+        """Like ``render``, but the response starts with the shell while
+        Suspense boundaries are still rendering."""
+        rendered = self.render_to_stream(request)
+        if isinstance(rendered, bytes):
+            return self._respond(request, rendered, status)
+        return StreamingHttpResponse(
+            rendered, status=status, content_type="text/html; charset=utf-8"
+        )
+
+    async def arender_to_bytes(
+        self, request: HttpRequest, entry_point: str | None = None
+    ) -> bytes:
+        # Context processors and lazy relations may query the database, so
+        # the payload is built in a thread. The render itself is not.
+        payload = await sync_to_async(self.get_payload)(request, entry_point)
+        return await arender_payload(request, payload, cache=self._render_cache)
+
+    async def arender_to_string(
+        self, request: HttpRequest, entry_point: str | None = None
+    ) -> str:
+        return (await self.arender_to_bytes(request, entry_point)).decode()
+
+    async def arender_to_stream(
+        self, request: HttpRequest, entry_point: str | None = None
+    ) -> bytes | AsyncRendererStream:
+        payload = await sync_to_async(self.get_payload)(request, entry_point)
+        return await arender_payload_to_stream(request, payload)
+
+    async def arender(self, request: HttpRequest, status: int = 200) -> HttpResponse:
+        """``render`` for async views."""
+        if self._overrides_render_to_string():
+            rendered = (await sync_to_async(self.render_to_string)(request)).encode()
+        else:
+            rendered = await self.arender_to_bytes(request)
+        return self._respond(request, rendered, status)
+
+    async def astream(
+        self, request: HttpRequest, status: int = 200
+    ) -> HttpResponseBase:
+        """``stream`` for async views, to be served over ASGI."""
+        rendered = await self.arender_to_stream(request)
+        if isinstance(rendered, bytes):
+            return self._respond(request, rendered, status)
+        return StreamingHttpResponse(
+            rendered, status=status, content_type="text/html; charset=utf-8"
+        )
+
+    def _respond(
+        self, request: HttpRequest, rendered: bytes, status: int
+    ) -> HttpResponse:
+        response = HttpResponse(rendered, status=status)
 
         if getattr(request, "_is_reactivated_response", False) is True:
             response["content-type"] = "application/json"
+            if (etag := getattr(request, "_reactivated_etag", None)) is not None:
+                return respond_with_etag(request, response, etag)
 
         return response
 
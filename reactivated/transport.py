@@ -11,7 +11,9 @@ here, once.
 reduces to a ``(route, reverse-name)`` table (the ``Mountable`` protocol),
 and Django's reverse namespace is global, so duplicate detection must span
 all of them. Per-router checks cannot see a views router and an RPC router
-claiming the same name; ``mount()`` can.
+claiming the same name; ``mount()`` can. It also adds the RPC batch
+endpoint (``reactivated.rpc.batch``) whenever something mounted has
+procedures.
 """
 
 import types
@@ -86,10 +88,13 @@ def mount(*items: "Mountable | types.ModuleType") -> list[URLPattern]:
         else:
             raise TypeError(f"mount: not a module or Mountable: {item!r}")
 
+    from .rpc.batch import BATCH_NAME, BATCH_URL, batch_paths
+
     routers = list(resolved.values())
-    seen_routes: dict[str, str] = {}
-    seen_names: dict[str, str] = {}
-    patterns: list[URLPattern] = []
+    has_procedures = any(getattr(router, "handlers", None) for router in routers)
+    seen_routes: dict[str, str] = {BATCH_URL: BATCH_NAME} if has_procedures else {}
+    seen_names: dict[str, str] = {BATCH_NAME: BATCH_URL} if has_procedures else {}
+    patterns: list[URLPattern] = batch_paths() if has_procedures else []
     for router in routers:
         for route, name in router.routes():
             if route in seen_routes:
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import collections.abc
+import hashlib
 import inspect
 import time
 import urllib.request
 from collections.abc import Sequence
-from typing import Any, get_args, get_type_hints
+from typing import Any, Callable, get_args, get_type_hints
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections
 from django.db.models import Manager
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
 from django.utils.functional import Promise
+from django.utils.http import parse_etags, quote_etag
 
 from reactivated_dev.procs import get_free_port as get_free_port
 
@@ -27,6 +32,37 @@ def wait_for_http(url: str, timeout: float = 45.0) -> bool:
     return False
 
 
+def make_etag(content: bytes) -> str:
+    return quote_etag(hashlib.blake2b(content, digest_size=16).hexdigest())
+
+
+def respond_with_etag(
+    request: HttpRequest, response: HttpResponse, etag: str, *, safe: bool = False
+) -> HttpResponse:
+    """Tag ``response`` with a strong ETag, and answer a GET whose
+    If-None-Match already names it with an empty 304 instead. With ``safe``,
+    any method is answered that way, for reads whose input is a body."""
+    response.headers["ETag"] = etag
+    if safe and request.method not in ("GET", "HEAD"):
+        matches = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag not in matches and "*" not in matches:
+            return response
+        not_modified = HttpResponseNotModified()
+        not_modified.headers["ETag"] = etag
+        return not_modified
+    conditional = get_conditional_response(request, etag=etag, response=response)
+    assert isinstance(conditional, HttpResponse)
+    return conditional
+
+
+def install_execute_wrapper(wrapper: Callable[..., Any]) -> None:
+    """Put ``wrapper`` on this thread's connections for good, once. It goes
+    first in line, so ``execute_wrapper()`` blocks still pop their own."""
+    for connection in connections.all():
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, wrapper)
+
+
 # Mock is_simple_callable for now
 # instead of the more sophisticated one from rest_framework.fields
 def is_simple_callable(possible_callable: Any) -> bool:
@@ -0,0 +1,84 @@
+"""Python-side render overhead of ``Template.render_to_string``.
+
+Measures everything up to the renderer call — props and context
+serialization, context processors, and building the Context model — with
+``REACTIVATED_SERVER = None`` so no Node process is involved. The
+"rebuilt" column clears the context cache before every render, which is
+what each page view paid before the Context model was cached.
+
+The second table serializes a page with about 2 MB of props both ways: to
+dicts with ``model_dump`` and then to JSON with simplejson, as renders did
+before, and straight to bytes with the pydantic serializer, as they do now.
+
+    python scripts/benchmarks/render.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sample.server.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from reactivated.context import clear_context_cache  # noqa: E402
+from reactivated.renderer import serialize_payload  # noqa: E402
+from reactivated.templates import Template  # noqa: E402
+
+settings.REACTIVATED_SERVER = None
+
+
+class BenchmarkPage(Template):
+    title: str
+    rows: list[dict[str, int]]
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    request = RequestFactory().get("/")
+    request.user = AnonymousUser()
+    template = BenchmarkPage(
+        title="Benchmark", rows=[{"id": index} for index in range(20)]
+    )
+
+    def cached() -> None:
+        template.render_to_string(request)
+
+    def rebuilt() -> None:
+        clear_context_cache()
+        template.render_to_string(request)
+
+    cached()
+    for label, fn in (("rebuilt", rebuilt), ("cached", cached)):
+        seconds = min(timeit.repeat(fn, number=iterations, repeat=3))
+        print(f"{label:>8}: {seconds / iterations * 1e6:8.1f} µs/render")
+
+    large = BenchmarkPage(
+        title="Benchmark",
+        rows=[{"id": index, "value": index * 7} for index in range(80000)],
+    )
+
+    def dicts() -> None:
+        serialize_payload(
+            large.get_context(request).model_dump(mode="json"),
+            large.model_dump(mode="json"),
+        )
+
+    def single_pass() -> None:
+        large.get_payload(request)
+
+    size = len(large.get_payload(request).data) / 1e6
+    print(f"\n{size:.1f} MB of props")
+    for label, fn in (("dicts", dicts), ("bytes", single_pass)):
+        seconds = min(timeit.repeat(fn, number=10, repeat=3))
+        print(f"{label:>8}: {seconds / 10 * 1e3:8.1f} ms/render")
+
+
+if __name__ == "__main__":
+    main()
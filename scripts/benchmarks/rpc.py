@@ -0,0 +1,100 @@
+"""Per-RPC overhead of request parsing and response encoding.
+
+An RPC that echoes a list of rows back is called with a small and a large
+body. "dicts" is the pipeline RPCs used to run: ``json.loads``,
+``validate_python``, ``dump_python(mode="json")`` and a ``JsonResponse``.
+"bytes" is the one they run now: ``validate_json`` on the raw body and
+``dump_json`` straight into an ``HttpResponse``. "handler" is the whole
+procedure, access check and all, with no observer registered.
+
+    python scripts/benchmarks/rpc.py [iterations]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sample.server.settings")
+django.setup()
+
+from asgiref.sync import async_to_sync  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.http import HttpRequest, HttpResponse, JsonResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from reactivated.router import Router  # noqa: E402
+from reactivated.rpc.core import generate_server_schema  # noqa: E402
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+    score: float
+
+
+router = Router(HttpRequest)
+
+
+@router.rpc(atomic_requests=False)
+def echo(request: HttpRequest, form: list[Row]) -> list[Row]:
+    return form
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    schema_dir = tempfile.mkdtemp()
+    settings.REACTIVATED_SERVER_SCHEMA = schema_dir
+    sys.path.insert(0, schema_dir)
+    generate_server_schema(skip_cache=True)
+
+    rpc = router.handlers["rpc_echo"]
+    adapters = rpc["adapters"]
+    factory = RequestFactory()
+
+    for rows in (10, 10000):
+        body = json.dumps(
+            [
+                {"id": index, "name": f"Row {index}", "score": index / 3}
+                for index in range(rows)
+            ]
+        ).encode()
+
+        def dicts() -> None:
+            form = adapters.input.validate_python(json.loads(body))
+            output = adapters.output.dump_python(form, mode="json")
+            JsonResponse(output, safe=False)
+
+        def single_pass() -> None:
+            form = adapters.input.validate_json(body)
+            HttpResponse(
+                adapters.output.dump_json(form), content_type="application/json"
+            )
+
+        def handler() -> None:
+            request = factory.post(
+                "/rpc/echo/", data=body, content_type="application/json"
+            )
+            request.user = AnonymousUser()
+            async_to_sync(rpc["handler"])(request)
+
+        number = max(1, iterations * 10 // rows)
+        print(f"{rows} rows, {len(body) / 1e3:.1f} KB")
+        for label, fn in (
+            ("dicts", dicts),
+            ("bytes", single_pass),
+            ("handler", handler),
+        ):
+            fn()
+            seconds = min(timeit.repeat(fn, number=number, repeat=3))
+            print(f"{label:>8}: {seconds / number * 1e6:10.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
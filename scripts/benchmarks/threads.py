@@ -0,0 +1,99 @@
+"""Procedure throughput under concurrent load, by thread strategy.
+
+Many calls are in flight at once, each to a sync procedure that spends a
+few milliseconds blocked, the way a handler waits on its database.
+"shared" is asgiref's process-wide sync thread, where every call queues
+behind the others. "per request" is what Django's ``ASGIHandler`` does,
+starting a thread for each request and discarding it after. "executor" is
+a ``RequestExecutor``, which leases each call one of a bounded pool of
+reused threads.
+
+    python scripts/benchmarks/threads.py [calls] [concurrency]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sample.server.settings")
+django.setup()
+
+from asgiref.sync import ThreadSensitiveContext  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.http import HttpRequest  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from reactivated.router import Router  # noqa: E402
+from reactivated.rpc import RequestExecutor  # noqa: E402
+from reactivated.rpc.core import generate_server_schema  # noqa: E402
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+
+
+def build(executor: RequestExecutor | None) -> Any:
+    router = Router(HttpRequest, executor=executor)
+
+    @router.rpc(atomic_requests=False)
+    def lookup(request: HttpRequest, form: list[Row]) -> list[Row]:
+        time.sleep(0.002)
+        return form
+
+    return router
+
+
+async def load(router: Router[Any], calls: int, concurrency: int, fresh: bool) -> float:
+    factory = RequestFactory()
+    handler = router.handlers["rpc_lookup"]["handler"]
+    body = b'[{"id": 1, "name": "Row"}]'
+    slots = asyncio.Semaphore(concurrency)
+
+    async def call() -> None:
+        request = factory.post(
+            "/rpc/lookup/", data=body, content_type="application/json"
+        )
+        request.user = AnonymousUser()
+        async with slots:
+            if fresh:
+                async with ThreadSensitiveContext():  # type: ignore[no-untyped-call]
+                    await handler(request)
+            else:
+                await handler(request)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    schema_dir = tempfile.mkdtemp()
+    settings.REACTIVATED_SERVER_SCHEMA = schema_dir
+    sys.path.insert(0, schema_dir)
+    generate_server_schema(skip_cache=True)
+
+    print(f"{calls} calls, {concurrency} at a time")
+    for label, executor, fresh in (
+        ("shared", None, False),
+        ("per request", None, True),
+        ("executor", RequestExecutor(max_threads=concurrency), False),
+    ):
+        router = build(executor)
+        asyncio.run(load(router, concurrency, concurrency, fresh))
+        seconds = asyncio.run(load(router, calls, concurrency, fresh))
+        print(f"{label:>12}: {calls / seconds:8.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main()
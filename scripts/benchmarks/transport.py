@@ -0,0 +1,62 @@
+"""Round trip to the renderer over HTTP and over the framed transport.
+
+Starts ``transport_renderer.mjs``, a stand-in that speaks both protocols
+and answers every render with the same 20 KB page, then times
+``render_jsx_to_string`` against it with each transport. Rendering itself
+is left out on purpose: it costs the same either way.
+
+    python scripts/benchmarks/transport.py [iterations]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sample.server.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from reactivated import renderer  # noqa: E402
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    request = RequestFactory().get("/")
+    context = {"template_name": "BenchmarkPage", "STATIC_URL": "/static/"}
+    props = {"rows": [{"id": index, "name": f"Row {index}"} for index in range(200)]}
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = subprocess.Popen(
+            [
+                "node",
+                os.path.join(os.path.dirname(__file__), "transport_renderer.mjs"),
+                directory,
+            ],
+            encoding="utf-8",
+            stdout=subprocess.PIPE,
+        )
+        try:
+            address = renderer._wait_for_address(process)
+            renderer.renderer_pool = renderer.RendererPool([address])
+
+            def render() -> None:
+                renderer.render_jsx_to_string(request, context, props)
+
+            for transport in ("http", "framed"):
+                settings.REACTIVATED_RENDERER_TRANSPORT = transport
+                render()
+                seconds = min(timeit.repeat(render, number=iterations, repeat=3))
+                print(f"{transport:>8}: {seconds / iterations * 1e6:8.1f} µs/render")
+        finally:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+// A stand-in renderer for scripts/benchmarks/transport.py: both transports
+// of the real one, built on node's standard library, answering every render
+// with the same page. Only the cost of getting a payload to Node and the
+// HTML back differs between them, so that is all this measures.
+import http from "node:http";
+import net from "node:net";
+import path from "node:path";
+
+const [directory] = process.argv.slice(2);
+const socketPath = path.join(directory, "bench.sock");
+const framedSocketPath = path.join(directory, "bench.framed.sock");
+const page = Buffer.from(
+    `<!DOCTYPE html><html><body>${"<p>row</p>".repeat(2000)}</body></html>`,
+);
+
+const server = http.createServer((req, res) => {
+    const body = [];
+    req.on("data", (chunk) => body.push(chunk));
+    req.on("end", () => {
+        JSON.parse(Buffer.concat(body).toString("utf8"));
+        res.setHeader("content-type", "text/html; charset=utf-8");
+        res.end(page);
+    });
+});
+
+const frame = (id, type, payload) => {
+    const header = Buffer.allocUnsafe(9);
+    header.writeUInt32BE(payload.length + 5, 0);
+    header.writeUInt32BE(id, 4);
+    header.writeUInt8(type, 8);
+    return Buffer.concat([header, payload]);
+};
+
+const framedServer = net.createServer((socket) => {
+    let buffered = Buffer.alloc(0);
+    socket.on("data", (data) => {
+        buffered = buffered.length === 0 ? data : Buffer.concat([buffered, data]);
+        while (buffered.length >= 4) {
+            const length = buffered.readUInt32BE(0);
+            if (buffered.length < length + 4) {
+                break;
+            }
+            const id = buffered.readUInt32BE(4);
+            JSON.parse(buffered.subarray(9, length + 4).toString("utf8"));
+            buffered = buffered.subarray(length + 4);
+            socket.write(frame(id, 0x11, page));
+            socket.write(frame(id, 0x12, Buffer.alloc(0)));
+        }
+    });
+});
+
+framedServer.listen(framedSocketPath, () => {
+    server.listen(socketPath, () => {
+        process.stdout.write(`RENDERER:${socketPath}:LISTENING`);
+    });
+});
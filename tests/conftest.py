@@ -1,5 +1,18 @@
 import site
-from typing import Any
+from typing import Any, Iterator
+
+import pytest
+from asgiref.sync import SyncToAsync
+from django.db import connections
+
+
+@pytest.fixture(autouse=True, scope="session")
+def close_sync_thread_connections(django_db_setup: Any) -> Iterator[None]:
+    """Async tests query through asgiref's shared sync thread, which
+    outlives them. Its connections close before the test database is
+    dropped, or dropping it fails while they are still open."""
+    yield
+    SyncToAsync.single_thread_executor.submit(connections.close_all).result()
 
 
 def pytest_configure(config: Any) -> None:
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.http import HttpRequest
+
+from reactivated.context import (
+    clear_context_cache,
+    get_context_class,
+    register_processor_type,
+)
+from reactivated.pick import Pick
+
+
+class NumberProcessor(Pick):
+    number: int
+
+
+def number_context_processor(request: HttpRequest) -> NumberProcessor:
+    return NumberProcessor(number=5)
+
+
+def untyped_context_processor(request: HttpRequest) -> dict[str, Any]:
+    return {"flag": True}
+
+
+def test_context_class_is_built_once() -> None:
+    Context = get_context_class()
+
+    assert get_context_class() is Context
+
+    clear_context_cache()
+    assert get_context_class() is not Context
+
+
+def test_context_class_follows_templates_setting(settings: Any) -> None:
+    before = get_context_class()
+    assert "number" not in before.model_fields
+
+    settings.TEMPLATES = [
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "OPTIONS": {
+                "context_processors": ["tests.context.number_context_processor"]
+            },
+        }
+    ]
+
+    after = get_context_class()
+    assert set(after.model_fields) == {"template_name", "number"}
+
+
+def test_register_processor_type_invalidates(settings: Any) -> None:
+    settings.TEMPLATES = [
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "OPTIONS": {
+                "context_processors": ["tests.context.untyped_context_processor"]
+            },
+        }
+    ]
+    register_processor_type("tests.context.untyped_context_processor", NumberProcessor)
+
+    assert "number" in get_context_class().model_fields
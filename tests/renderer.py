@@ -1,8 +1,28 @@
+import asyncio
 import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from typing import ClassVar
 
+import pytest
+import requests
+from django.contrib.auth.models import AnonymousUser
 from django.test import RequestFactory
 
-from reactivated.renderer import get_accept_list, render_jsx_to_string
+from reactivated import renderer
+from reactivated.render_cache import CSP_NONCE_PLACEHOLDER, render_cache_stats
+from reactivated.renderer import (
+    RendererPool,
+    get_accept_list,
+    render_jsx_to_string,
+)
+from reactivated.templates import Template
 
 
 def test_get_accept_list():
@@ -36,3 +56,514 @@ def test_render_to_json():
         "context": {"some": "property", "template_name": "doesnotmatter.tsx"},
         "props": {"another": "property"},
     }
+
+
+def test_renderer_pool_dispatches_to_least_loaded():
+    pool = RendererPool(["first.sock", "second.sock", "third.sock"])
+
+    with pool.acquire() as busy:
+        with pool.acquire() as also_busy:
+            assert also_busy != busy
+
+            with pool.acquire() as idle:
+                assert {busy, also_busy, idle} == set(pool.addresses)
+
+        # Released renderers are idle again, so they win over the one still
+        # holding a render.
+        with pool.acquire() as released:
+            assert released != busy
+
+    assert list(pool.outstanding) == [0, 0, 0]
+
+
+def test_renderer_pool_reaps_exited_workers():
+    pool = RendererPool(["first.sock", "second.sock"])
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+
+    with pool.acquire() as address:
+        # A worker killed mid-render never releases its renders.
+        busy = pool.addresses.index(address)
+        pool.holders[(1 - busy) * pool.SLOTS] = exited.pid
+        assert pool.outstanding == [1, 1]
+
+        assert pool.reap() == 1
+        assert pool.outstanding[busy] == 1
+        assert pool.outstanding[1 - busy] == 0
+
+    assert pool.outstanding == [0, 0]
+
+
+def test_renderer_workers_default(settings):
+    settings.REACTIVATED_RENDERER_WORKERS = None
+    assert renderer.get_renderer_workers() == 1
+    assert renderer.get_renderer_workers(prefork=True) == (os.cpu_count() or 1)
+
+    settings.REACTIVATED_RENDERER_WORKERS = 3
+    assert renderer.get_renderer_workers() == 3
+    assert renderer.get_renderer_workers(prefork=True) == 3
+
+
+def test_renderer_pool_from_environment(monkeypatch):
+    monkeypatch.setattr(renderer, "renderer_pool", None)
+    monkeypatch.setenv("REACTIVATED_RENDERER", "http://one:1, http://two:2")
+
+    pool = renderer.start_renderer_pool()
+
+    assert pool.addresses == ["http://one:1", "http://two:2"]
+    assert pool.processes == []
+    assert renderer.start_renderer_pool() is pool
+    assert renderer.wait_and_get_addr() == "http://one:1"
+
+
+class FakeStreamedResponse:
+    status_code = 200
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def iter_content(self, chunk_size=None):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+def test_render_jsx_to_stream(monkeypatch):
+    pool = RendererPool(["renderer.sock"])
+    monkeypatch.setattr(renderer, "renderer_pool", pool)
+    sent = []
+
+    def post_to_renderer(address, *, headers, data, stream=False):
+        sent.append((address, headers, stream))
+        return FakeStreamedResponse([b"<html><body>", b"</body></html>"])
+
+    monkeypatch.setattr(renderer, "post_to_renderer", post_to_renderer)
+    request = RequestFactory().get("/")
+
+    streamed = renderer.render_jsx_to_stream(request, {"template_name": "X"}, {})
+    assert list(pool.outstanding) == [1]
+    assert list(streamed) == [b"<html><body>", b"</body></html>"]
+    assert list(pool.outstanding) == [0]
+    assert sent == [
+        (
+            "renderer.sock",
+            {"Content-Type": "application/json", "X-Reactivated-Stream": "1"},
+            True,
+        )
+    ]
+
+    # A client that disconnects before the first chunk still frees the slot.
+    abandoned = renderer.render_jsx_to_stream(request, {"template_name": "X"}, {})
+    assert list(pool.outstanding) == [1]
+    abandoned.close()
+    abandoned.close()
+    assert list(pool.outstanding) == [0]
+
+    as_json = RequestFactory(headers={"accept": "application/json"}).get("/")
+    assert isinstance(
+        renderer.render_jsx_to_stream(as_json, {"template_name": "X"}, {}), str
+    )
+    assert len(sent) == 2
+
+
+async def serve_renders(path, *, delay=0.0):
+    """A stand-in renderer speaking keep-alive HTTP/1.1 on a unix socket.
+    Buffered renders answer with a content length, streamed ones chunked."""
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = dict(
+                    line.split(": ", 1) for line in head.decode().split("\r\n")[1:-2]
+                )
+                body = await reader.readexactly(int(headers["Content-Length"]))
+                await asyncio.sleep(delay)
+                html = f"<html>{json.loads(body)['props']['name']}</html>".encode()
+                if headers.get("X-Reactivated-Stream") == "1":
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                    )
+                    for part in (html[:6], html[6:]):
+                        writer.write(b"%x\r\n%s\r\n" % (len(part), part))
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(html)
+                    )
+                    writer.write(html)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path)
+    return server, connections
+
+
+@pytest.mark.asyncio
+async def test_arender_jsx_to_string(monkeypatch, tmp_path):
+    address = str(tmp_path / "renderer.sock")
+    server, connections = await serve_renders(address)
+    pool = RendererPool([address])
+    monkeypatch.setattr(renderer, "renderer_pool", pool)
+    monkeypatch.setattr(renderer, "_async_clients", weakref.WeakKeyDictionary())
+    request = RequestFactory().get("/")
+
+    async with server:
+        for name in ["first", "second"]:
+            rendered = await renderer.arender_jsx_to_string(
+                request, {"template_name": "X"}, {"name": name}
+            )
+            assert rendered == f"<html>{name}</html>"
+
+        # Both renders went over one kept-alive connection.
+        assert len(connections) == 1
+        assert list(pool.outstanding) == [0]
+
+        streamed = await renderer.arender_jsx_to_stream(
+            request, {"template_name": "X"}, {"name": "third"}
+        )
+        assert list(pool.outstanding) == [1]
+        assert [chunk async for chunk in streamed] == [b"<html>", b"third</html>"]
+        assert list(pool.outstanding) == [0]
+        assert len(connections) == 1
+
+        # The idle connection went away; the next render opens another.
+        connections[0].close()
+        await asyncio.sleep(0)
+        rendered = await renderer.arender_jsx_to_string(
+            request, {"template_name": "X"}, {"name": "fourth"}
+        )
+        assert rendered == "<html>fourth</html>"
+        assert len(connections) == 2
+
+        renderer.get_async_renderer_client().close()
+
+
+@pytest.mark.asyncio
+async def test_arender_jsx_to_string_times_out(monkeypatch, settings, tmp_path):
+    address = str(tmp_path / "renderer.sock")
+    server, connections = await serve_renders(address, delay=1)
+    pool = RendererPool([address])
+    monkeypatch.setattr(renderer, "renderer_pool", pool)
+    monkeypatch.setattr(renderer, "_async_clients", weakref.WeakKeyDictionary())
+    settings.REACTIVATED_RENDERER_TIMEOUT = 0.05
+
+    async with server:
+        with pytest.raises(TimeoutError):
+            await renderer.arender_jsx_to_string(
+                RequestFactory().get("/"), {"template_name": "X"}, {"name": "slow"}
+            )
+
+    assert list(pool.outstanding) == [0]
+    assert renderer.get_async_renderer_client().idle.get(address, []) == []
+
+
+def serve_framed_renders(path):
+    """A stand-in renderer speaking the framed protocol. Buffered renders
+    are answered in pairs, last first, to show responses find their way
+    back by request id. A page named "empty" streams no chunks at all."""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+
+    def reply(connection, request_id, kind, name):
+        frame = struct.Struct(">IIB")
+        html = f"<html>{name}</html>".encode()
+        if name == "broken":
+            error = json.dumps({"error": {"message": "Broken", "stack": None}})
+            frames = [(renderer.FRAME_ERROR, error.encode())]
+        elif kind == renderer.FRAME_RENDER_STREAM and name == "empty":
+            frames = [(renderer.FRAME_END, b"")]
+        elif kind == renderer.FRAME_RENDER_STREAM:
+            frames = [
+                (renderer.FRAME_CHUNK, html[:6]),
+                (renderer.FRAME_CHUNK, html[6:]),
+                (renderer.FRAME_END, b""),
+            ]
+        else:
+            frames = [(renderer.FRAME_CHUNK, html), (renderer.FRAME_END, b"")]
+        for frame_kind, payload in frames:
+            connection.sendall(
+                frame.pack(len(payload) + 5, request_id, frame_kind) + payload
+            )
+
+    def serve():
+        connection, _ = listener.accept()
+        stream = connection.makefile("rb")
+        waiting = []
+        while len(header := stream.read(9)) == 9:
+            length, request_id, kind = struct.unpack(">IIB", header)
+            name = json.loads(stream.read(length - 5))["props"]["name"]
+            if kind == renderer.FRAME_RENDER and name != "broken":
+                waiting.append((request_id, kind, name))
+                if len(waiting) == 2:
+                    for request in reversed(waiting):
+                        reply(connection, *request)
+                    waiting.clear()
+            else:
+                reply(connection, request_id, kind, name)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener
+
+
+def test_framed_transport(monkeypatch, settings, tmp_path):
+    listener = serve_framed_renders(str(tmp_path / "renderer.framed.sock"))
+    pool = RendererPool([str(tmp_path / "renderer.sock")])
+    monkeypatch.setattr(renderer, "renderer_pool", pool)
+    monkeypatch.setattr(renderer, "_framed_connections", {})
+    settings.REACTIVATED_RENDERER_TRANSPORT = "framed"
+    request = RequestFactory().get("/")
+    rendered = {}
+
+    def render(name):
+        rendered[name] = renderer.render_jsx_to_string(
+            request, {"template_name": "X"}, {"name": name}
+        )
+
+    threads = [threading.Thread(target=render, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert rendered == {"a": "<html>a</html>", "b": "<html>b</html>"}
+
+    streamed = renderer.render_jsx_to_stream(
+        request, {"template_name": "X"}, {"name": "c"}
+    )
+    assert list(streamed) == [b"<html>", b"c</html>"]
+    assert list(pool.outstanding) == [0]
+
+    # An empty body ends the stream at once, rather than at the timeout.
+    settings.REACTIVATED_RENDERER_TIMEOUT = 2
+    started = time.monotonic()
+    streamed = renderer.render_jsx_to_stream(
+        request, {"template_name": "X"}, {"name": "empty"}
+    )
+    assert list(streamed) == []
+    assert time.monotonic() - started < 1
+    assert list(pool.outstanding) == [0]
+
+    with pytest.raises(renderer.SSRError, match="Broken"):
+        renderer.render_jsx_to_string(
+            request, {"template_name": "X"}, {"name": "broken"}
+        )
+
+    # Every render shared one connection.
+    assert len(renderer._framed_connections) == 1
+    (connection,) = renderer._framed_connections.values()
+    assert connection.pending == {}
+    connection.close()
+    listener.close()
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+
+def test_render_cache(monkeypatch, settings):
+    settings.REACTIVATED_RENDER_CACHE = "default"
+    monkeypatch.setattr(renderer, "renderer_pool", RendererPool(["renderer.sock"]))
+    render_cache_stats.reset()
+    sent = []
+
+    def post_to_renderer(address, *, headers, data, stream=False):
+        payload = json.loads(data)
+        sent.append(payload)
+        context = payload["context"]
+        return FakeResponse(
+            f'<form nonce="{context["request"]["csp_nonce"]}">'
+            f'<input value="{context["csrf_token"]}">'
+            f"{payload['props']['name']}</form>".encode()
+        )
+
+    monkeypatch.setattr(renderer, "post_to_renderer", post_to_renderer)
+
+    def render(name, token, nonce, cache=True):
+        context = {
+            "template_name": "Page",
+            "csrf_token": token,
+            "request": {"path": "/", "csp_nonce": nonce},
+        }
+        return render_jsx_to_string(
+            RequestFactory().get("/"), context, {"name": name}, cache=cache
+        )
+
+    assert render("page", "token1", "nonce1") == (
+        '<form nonce="nonce1"><input value="token1">page</form>'
+    )
+    # Node never sees the real token or nonce, so the next request's
+    # render is the same payload.
+    assert sent[0]["context"]["csrf_token"] != "token1"
+    assert render("page", "token2", "nonce2") == (
+        '<form nonce="nonce2"><input value="token2">page</form>'
+    )
+    assert len(sent) == 1
+
+    render("other", "token3", "nonce3")
+    render("other", "token4", "nonce4", cache=False)
+    assert len(sent) == 3
+    assert render_cache_stats.snapshot() == {"hits": 1, "misses": 2}
+
+
+class PayloadPage(Template):
+    _abstract: ClassVar[bool] = True
+
+    title: str
+    rows: list[dict[str, int]]
+
+
+@pytest.mark.django_db
+def test_template_payload_is_encoded_in_one_pass(monkeypatch, settings):
+    request = RequestFactory().get("/")
+    request.user = AnonymousUser()
+    request.csp_nonce = "nonce1"
+    page = PayloadPage(title="Ünïcode", rows=[{"id": 1}, {"id": 2}])
+
+    payload = page.get_payload(request, entry_point="django.admin")
+    context = page.get_context(request).model_dump(mode="json")
+    props = page.model_dump(mode="json")
+    decoded = json.loads(payload.data)
+    # The CSRF token is masked afresh on every read.
+    decoded["context"].pop("csrf_token")
+    context.pop("csrf_token")
+    assert decoded == {
+        "context": context,
+        "props": props,
+        "entry_point": "django.admin",
+    }
+    assert payload.template_name == "PayloadPage"
+    assert payload.secrets[CSP_NONCE_PLACEHOLDER] == "nonce1"
+
+    sent = []
+
+    def post_to_renderer(address, *, headers, data, stream=False):
+        sent.append(data)
+        return FakeResponse("<p>Ünïcode</p>".encode())
+
+    monkeypatch.setattr(renderer, "post_to_renderer", post_to_renderer)
+    monkeypatch.setattr(renderer, "renderer_pool", RendererPool(["renderer.sock"]))
+    response = page.render(request)
+    assert isinstance(sent[0], bytes)
+    assert response.content == "<p>Ünïcode</p>".encode()
+
+
+@pytest.mark.django_db
+def test_json_page_answers_unchanged_polls_with_304():
+    page = PayloadPage(title="Poll", rows=[{"id": 1}])
+
+    def get(page=page, secret="a" * 32, **headers):
+        request = RequestFactory().get("/?format=json", **headers)
+        request.user = AnonymousUser()
+        # As CsrfViewMiddleware sets it from the cookie.
+        request.META["CSRF_COOKIE"] = secret
+        return page.render(request)
+
+    first = get()
+    assert first.status_code == 200
+    assert first["content-type"] == "application/json"
+
+    # A freshly masked CSRF token on every request doesn't change the tag.
+    again = get(HTTP_IF_NONE_MATCH=first["ETag"])
+    assert again.status_code == 304
+    assert again.content == b""
+
+    changed = PayloadPage(title="Changed", rows=[])
+    assert get(changed, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+    # A rotated secret would leave the client with a dead token.
+    rotated = get(secret="b" * 32, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert rotated.status_code == 200
+
+
+def fake_renderer(script):
+    return subprocess.Popen(
+        [sys.executable, "-c", script], encoding="utf-8", stdout=subprocess.PIPE
+    )
+
+
+LISTENING = (
+    "import time; print('booting'); "
+    "print('RENDERER:/tmp/reactivated.test.sock:LISTENING', flush=True); "
+    "time.sleep(30)"
+)
+
+
+def test_wait_for_address():
+    process = fake_renderer(LISTENING)
+    try:
+        assert renderer._wait_for_address(process) == "/tmp/reactivated.test.sock"
+    finally:
+        process.kill()
+
+    with pytest.raises(renderer.SSRError, match="exited with 3"):
+        renderer._wait_for_address(fake_renderer("raise SystemExit(3)"))
+
+
+def test_supervisor_restarts_renderer(monkeypatch):
+    spawned = []
+
+    def spawn_renderer(address=None):
+        spawned.append(address)
+        return fake_renderer(LISTENING)
+
+    monkeypatch.setattr(renderer, "_spawn_renderer", spawn_renderer)
+    crashed = fake_renderer("raise SystemExit(1)")
+    crashed.wait()
+    pool = RendererPool(["renderer.sock"], [crashed])
+    supervisor = renderer.RendererSupervisor(pool, max_backoff=0.01)
+    restarts = renderer.renderer_metrics.snapshot()["restarts"]
+
+    assert supervisor.is_failed(0, ping=False)
+    supervisor.restart(0)
+
+    try:
+        assert spawned == ["renderer.sock"]
+        assert pool.processes[0] is not crashed
+        assert not supervisor.is_failed(0, ping=False)
+        assert pool.down[0] == 0
+        assert renderer.renderer_metrics.snapshot()["restarts"] == restarts + 1
+    finally:
+        pool.processes[0].kill()
+
+
+def test_render_retries_once_on_another_renderer(monkeypatch):
+    pool = RendererPool(["first.sock", "second.sock"])
+    monkeypatch.setattr(renderer, "renderer_pool", pool)
+    attempts = []
+
+    def post_to_renderer(address, *, headers, data, stream=False):
+        attempts.append(address)
+        if len(attempts) == 1:
+            raise requests.ConnectionError("Connection reset by peer")
+        return FakeResponse(b"<html></html>")
+
+    monkeypatch.setattr(renderer, "post_to_renderer", post_to_renderer)
+    request = RequestFactory().get("/")
+
+    assert render_jsx_to_string(request, {"template_name": "X"}, {}) == (
+        "<html></html>"
+    )
+    assert len(set(attempts)) == 2
+
+    # Only once: a second failure is the caller's.
+    def unreachable(address, *, headers, data, stream=False):
+        attempts.append(address)
+        raise requests.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(renderer, "post_to_renderer", unreachable)
+    attempts.clear()
+
+    with pytest.raises(requests.ConnectionError):
+        render_jsx_to_string(request, {"template_name": "X"}, {})
+    assert len(attempts) == 2
+    assert list(pool.outstanding) == [0, 0]
@@ -1,27 +1,31 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
 import datetime
 import enum
 import json
 import sys
+import threading
 import uuid
 import warnings
-from typing import Annotated, Any, Literal, TypedDict
+from typing import Annotated, Any, AsyncIterator, ClassVar, Iterator, Literal, TypedDict
 from unittest.mock import Mock
 
 import pytest
 from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AnonymousUser, User
+from django.db import connection, transaction
 from django.db import models as dj_models
-from django.db import transaction
+from django.db.models import Max
 from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
 from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
-from reactivated import Pick
+from reactivated import Pick, depends_on
 from reactivated.forms import FormField, form, get_form_schema
 from reactivated.pick import export
 from reactivated.router import Router
+from reactivated.rpc import Page, PageInput, Stream
 from reactivated.rpc.core import (
     PickAsDict,
     PickProxy,
@@ -33,7 +37,9 @@ from reactivated.rpc.core import (
     manually_exported_registry,
     pick,
 )
+from reactivated.rpc.planner import pick_holder_for
 from reactivated.rpc.utils import flatten_schema
+from sample.server.apps.samples.models import Composer, Continent, Country, Opera
 
 
 def unique_email() -> str:
@@ -98,6 +104,17 @@ NullableReturnsPick = pick(User, fields=["id", "email", "is_active"])
 ExtraFieldsPick = pick(User, fields=["id", "email"], extra_fields={"score": int})
 
 
+OperaPlanPick = pick(
+    Opera,
+    fields=[
+        "name",
+        "composer.name",
+        "composer.countries.name",
+        "composer.countries.continent.name",
+    ],
+)
+
+
 class Tag(TypedDict):
     name: str
     value: int
@@ -127,6 +144,37 @@ OptionalFieldsPick = pick(
 )
 
 
+class ProjectedModel(dj_models.Model):
+    first_name = dj_models.CharField(max_length=100)
+    last_name = dj_models.CharField(max_length=100)
+    biography = dj_models.TextField()
+    settings = dj_models.JSONField(default=dict)
+
+    objects: ClassVar[dj_models.Manager["ProjectedModel"]] = dj_models.Manager()
+
+    class Meta:
+        app_label = "rpc_projection"
+
+    @property
+    @depends_on("first_name", "last_name")
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+    @property
+    def initials(self) -> str:
+        return f"{self.first_name[0]}{self.last_name[0]}"
+
+
+FullNamePick = pick(ProjectedModel, fields=["id", "full_name"])
+InitialsPick = pick(ProjectedModel, fields=["id", "initials"])
+BiographyLengthPick = pick(
+    ProjectedModel,
+    fields=["id"],
+    extra_fields={"biography_length": int},
+    depends_on=["biography"],
+)
+
+
 @pytest.fixture
 def schema_env(tmp_path: Any, settings: Any) -> Any:
     """Set up a clean schema environment for pick tests."""
@@ -814,6 +862,70 @@ async def test_async_rpc_atomicity(rf: Any) -> None:
     assert await sync_to_async(User.objects.filter(email=loose_email).exists)()
 
 
+@pytest.mark.asyncio
+async def test_request_executor_runs_calls_in_parallel(rf: Any) -> None:
+    """Each call keeps one thread from its scope to its handler, and two
+    calls run at once: on asgiref's single sync thread the barrier would
+    never fill."""
+    from reactivated.rpc import RequestExecutor
+
+    executor = RequestExecutor(max_threads=2)
+    router = Router(HttpRequest, executor=executor)
+    barrier = threading.Barrier(2, timeout=5)
+    threads: dict[str, list[int]] = {"first": [], "second": []}
+
+    @router.scope
+    def caller(request: HttpRequest) -> HttpRequest:
+        threads[request.GET["name"]].append(threading.get_ident())
+        return request
+
+    @router.query(caller)
+    def meet(request: HttpRequest) -> str:
+        threads[request.GET["name"]].append(threading.get_ident())
+        barrier.wait()
+        return request.GET["name"]
+
+    generate_server_schema(skip_cache=True)
+
+    async def get(name: str) -> Any:
+        request = rf.get("/rpc/meet/", {"name": name})
+        request.user = AnonymousUser()
+        response = await router.handlers["rpc_meet"]["handler"](request)
+        return json.loads(response.content)
+
+    try:
+        assert list(await asyncio.gather(get("first"), get("second"))) == [
+            "first",
+            "second",
+        ]
+        (first,) = set(threads["first"])
+        (second,) = set(threads["second"])
+        assert first != second
+
+        # The threads are returned to the pool and reused.
+        threads["first"].clear()
+        barrier.reset()
+        await asyncio.gather(get("first"), get("second"))
+        assert set(threads["first"]) <= {first, second}
+    finally:
+        executor.close()
+
+
+def test_request_executor_asgiref_internals() -> None:
+    """RequestExecutor pins calls to its threads through asgiref internals.
+    An asgiref release that moves them fails here, not in production."""
+    import contextvars
+    import weakref
+
+    from asgiref.local import Local
+    from asgiref.sync import AsyncToSync, SyncToAsync, ThreadSensitiveContext
+
+    assert isinstance(SyncToAsync.thread_sensitive_context, contextvars.ContextVar)
+    assert isinstance(SyncToAsync.context_to_thread_executor, weakref.WeakKeyDictionary)
+    assert isinstance(AsyncToSync.executors, Local)
+    assert callable(ThreadSensitiveContext)
+
+
 @pytest.mark.django_db
 @pytest.mark.asyncio
 async def test_returns_single_model(rf: Any, schema_env: Any) -> None:
@@ -877,6 +989,257 @@ async def test_returns_list_of_models(rf: Any, schema_env: Any) -> None:
     assert email2 in emails
 
 
+def test_pick_optimize_plans_relations() -> None:
+    queryset = OperaPlanPick.optimize(Opera.objects.all())
+
+    assert queryset.query.select_related == {"composer": {}}
+    (prefetch,) = queryset._prefetch_related_lookups  # type: ignore[attr-defined]
+    assert prefetch.prefetch_to == "composer__countries"
+    assert prefetch.queryset.query.select_related == {"continent": {}}
+
+    # Whatever the caller already prefetched is left alone.
+    custom = Opera.objects.prefetch_related("composer__countries")
+    optimized = OperaPlanPick.optimize(custom)
+    assert optimized._prefetch_related_lookups == ("composer__countries",)  # type: ignore[attr-defined]
+
+
+def test_pick_optimize_projects_columns() -> None:
+    queryset = OperaPlanPick.optimize(Opera.objects.all())
+    deferred, is_defer = queryset.query.deferred_loading
+    assert is_defer is True
+    assert deferred == {"uuid", "style", "has_piano_transcription"}
+
+    (prefetch,) = queryset._prefetch_related_lookups  # type: ignore[attr-defined]
+    assert prefetch.queryset.query.deferred_loading == (
+        {"continent__hemisphere"},
+        True,
+    )
+
+    # An explicit only()/defer() is the caller's call.
+    explicit = OperaPlanPick.optimize(Opera.objects.only("name", "composer"))
+    assert explicit.query.deferred_loading == ({"name", "composer"}, False)
+
+
+def test_pick_optimize_computed_dependencies() -> None:
+    everything_else = {"biography", "settings"}
+
+    full_name = FullNamePick.optimize(ProjectedModel.objects.all())
+    assert full_name.query.deferred_loading == (everything_else, True)
+
+    # Undeclared: any column could be read, so none are deferred.
+    initials = InitialsPick.optimize(ProjectedModel.objects.all())
+    assert initials.query.deferred_loading == (frozenset(), True)
+
+    biography_length = BiographyLengthPick.optimize(ProjectedModel.objects.all())
+    assert biography_length.query.deferred_loading == (
+        {"first_name", "last_name", "settings"},
+        True,
+    )
+
+
+def _create_operas() -> None:
+    europe = Continent.objects.create(name="Europe")
+    for index in range(3):
+        composer = Composer.objects.create(name=f"Composer {index}")
+        composer.countries.add(
+            Country.objects.create(name=f"Country {index}", continent=europe)
+        )
+        Opera.objects.create(name=f"Opera {index}", composer=composer)
+
+
+@pytest.mark.django_db
+def test_pick_optimize_query_count(django_assert_num_queries: Any) -> None:
+    _create_operas()
+
+    with django_assert_num_queries(2):
+        for opera in OperaPlanPick.optimize(Opera.objects.all()):
+            assert opera.composer.name
+            for country in opera.composer.countries.all():
+                assert country.continent.name == "Europe"
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_returns_queryset_of_models(rf: Any, schema_env: Any) -> None:
+    router = Router(HttpRequest)
+
+    @router.rpc
+    def list_operas(request: Any, form: list[int]) -> list[OperaPlanPick.returns]:
+        # Left unevaluated on purpose: the RPC plans it before serializing.
+        return Opera.objects.order_by("name")  # type: ignore[return-value]
+
+    generate_server_schema(skip_cache=True)
+    await sync_to_async(_create_operas)()
+
+    request = rf.post(
+        f"/{router.handlers['rpc_list_operas']['url']}",
+        data=json.dumps([]),
+        content_type="application/json",
+    )
+    request.user = AnonymousUser()
+    response = await router.handlers["rpc_list_operas"]["handler"](request)
+
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert [opera["name"] for opera in data] == ["Opera 0", "Opera 1", "Opera 2"]
+    assert data[0]["composer"]["countries"] == [
+        {"name": "Country 0", "continent": {"name": "Europe"}}
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_returns_page(rf: Any, schema_env: Any, settings: Any) -> None:
+    settings.REACTIVATED_RPC_SERVER_TIMING = True
+    router = Router(HttpRequest)
+
+    @router.query
+    def page_operas(request: Any, page: PageInput) -> Page[OperaPlanPick.returns]:
+        operas = Opera.objects.filter(pk__gt=before)
+        return Page.of(operas, page, order_by=["-name"])
+
+    generate_server_schema(skip_cache=True)
+    # Other tests' operas outlive them.
+    before = (await Opera.objects.aaggregate(pk=Max("pk")))["pk"] or 0
+    await sync_to_async(_create_operas)()
+    assert pick_holder_for(Page[OperaPlanPick.returns]) is OperaPlanPick  # type: ignore[comparison-overlap]
+    next_schema = TypeAdapter(Page[OperaPlanPick.returns]).json_schema(
+        mode="serialization"
+    )["properties"]["next"]
+    assert next_schema["anyOf"][0] == {
+        "type": "string",
+        "tsType": 'Cursor<"tests_rpc_OperaPlanPick">',
+    }
+
+    async def call(body: Any) -> Any:
+        request = rf.post(
+            "/rpc/page_operas/", data=json.dumps(body), content_type="application/json"
+        )
+        request.user = AnonymousUser()
+        return await router.handlers["rpc_page_operas"]["handler"](request)
+
+    response = await call({"limit": 2})
+    assert response.status_code == 200
+    first = json.loads(response.content)
+    assert [opera["name"] for opera in first["items"]] == ["Opera 2", "Opera 1"]
+    assert first["items"][0]["composer"]["countries"] == [
+        {"name": "Country 2", "continent": {"name": "Europe"}}
+    ]
+    # The page and its relations, however deep the page.
+    assert 'db;desc="2 queries"' in response["Server-Timing"]
+
+    response = await call({"cursor": first["next"], "limit": 2})
+    second = json.loads(response.content)
+    assert [opera["name"] for opera in second["items"]] == ["Opera 0"]
+    assert second["next"] is None
+    assert 'db;desc="2 queries"' in response["Server-Timing"]
+
+    from reactivated.rpc.pagination import encode_cursor
+
+    response = await call({"cursor": "not a cursor"})
+    assert response.status_code == 400
+    # Another ordering's cursor, or a value the column can't hold.
+    response = await call({"cursor": encode_cursor(["Opera 1"])})
+    assert json.loads(response.content) == [
+        "The cursor belongs to a different ordering"
+    ]
+    response = await call({"cursor": encode_cursor(["Opera 1", "one"])})
+    assert response.status_code == 400
+    assert json.loads(response.content) == ["Invalid cursor"]
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_returns_stream(async_rf: Any, schema_env: Any, settings: Any) -> None:
+    settings.REACTIVATED_RPC_STREAM_CHUNK_SIZE = 2
+    router = Router(HttpRequest)
+
+    @router.query
+    def stream_operas(request: Any) -> Stream[OperaPlanPick.returns]:
+        return Stream(Opera.objects.filter(pk__gt=before).order_by("name"))
+
+    @router.query
+    async def stream_numbers(request: Any) -> Stream[int]:
+        async def numbers() -> AsyncIterator[int]:
+            for number in range(5):
+                yield number
+
+        return Stream(numbers())
+
+    generate_server_schema(skip_cache=True)
+    before = (await Opera.objects.aaggregate(pk=Max("pk")))["pk"] or 0
+    await sync_to_async(_create_operas)()
+
+    async def call(name: str) -> list[bytes]:
+        request = async_rf.get(f"/rpc/{name}/")
+        request.user = AnonymousUser()
+        response: Any = await router.handlers[f"rpc_{name}"]["handler"](request)
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        return [chunk async for chunk in response.streaming_content]
+
+    # Two rows, with their relations, per chunk.
+    chunks = await call("stream_operas")
+    assert len(chunks) == 2
+    operas = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [opera["name"] for opera in operas] == ["Opera 0", "Opera 1", "Opera 2"]
+    assert operas[2]["composer"]["countries"] == [
+        {"name": "Country 2", "continent": {"name": "Europe"}}
+    ]
+
+    chunks = await call("stream_numbers")
+    assert chunks == [b"0\n1\n", b"2\n3\n", b"4\n"]
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_returns_stream_under_wsgi(
+    rf: Any, schema_env: Any, settings: Any
+) -> None:
+    """A WSGI server iterates the response itself, so rows are read a chunk
+    at a time as it asks for them, rather than all up front."""
+    settings.REACTIVATED_RPC_STREAM_CHUNK_SIZE = 2
+    router = Router(HttpRequest)
+    produced: list[int] = []
+
+    @router.query
+    def stream_counted(request: Any) -> Stream[int]:
+        def numbers() -> Iterator[int]:
+            for number in range(5):
+                produced.append(number)
+                yield number
+
+        return Stream(numbers())
+
+    @router.query
+    def stream_opera_names(request: Any) -> Stream[OperaPlanPick.returns]:
+        return Stream(Opera.objects.filter(pk__gt=before).order_by("name"))
+
+    generate_server_schema(skip_cache=True)
+    before = (await Opera.objects.aaggregate(pk=Max("pk")))["pk"] or 0
+    await sync_to_async(_create_operas)()
+
+    async def call(name: str) -> Any:
+        request = rf.get(f"/rpc/{name}/")
+        request.user = AnonymousUser()
+        response: Any = await router.handlers[f"rpc_{name}"]["handler"](request)
+        assert response.status_code == 200
+        assert not response.is_async
+        return response
+
+    response = await call("stream_counted")
+    assert produced == []
+    chunks = iter(response.streaming_content)
+    assert next(chunks) == b"0\n1\n"
+    assert produced == [0, 1]
+    assert list(chunks) == [b"2\n3\n", b"4\n"]
+
+    response = await call("stream_opera_names")
+    content = await sync_to_async(b"".join)(response.streaming_content)
+    operas = [json.loads(line) for line in content.splitlines()]
+    assert [opera["name"] for opera in operas] == ["Opera 0", "Opera 1", "Opera 2"]
+
+
 @pytest.mark.django_db
 @pytest.mark.asyncio
 async def test_returns_nullable(rf: Any, schema_env: Any) -> None:
@@ -1271,6 +1634,67 @@ async def test_observer_notified(
     assert calls[0][0] == RequestStatus[expected_status]
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("parsed", [True, False])
+async def test_observer_parsed_payloads(rf: Any, schema_env: Any, parsed: bool) -> None:
+    """The body is validated and the output encoded as bytes. The observer
+    sees them as Python values unless it opted out with ``parsed=False``."""
+    from reactivated.rpc import observer as observer_module
+    from reactivated.rpc.observer import RequestStatus, rpc_observer
+
+    calls: list[tuple[RequestStatus, Any, Any]] = []
+
+    async def observer(
+        request: Any,
+        rpc_name: str,
+        log: Any,
+        status: RequestStatus,
+        input: Any,
+        output: Any,
+        body: Any,
+        exception: BaseException | None,
+    ) -> None:
+        calls.append((status, input, output))
+
+    rpc_observer(parsed=parsed)(observer)
+    router = Router(HttpRequest)
+
+    @router.rpc(atomic_requests=False)
+    def echo(request: HttpRequest, form: ObserverInput) -> dict[str, float]:
+        return {"value": form.value, "ratio": form.value / 2}
+
+    generate_server_schema(skip_cache=True)
+
+    def post(body: str) -> Any:
+        request = rf.post("/rpc/echo/", data=body, content_type="application/json")
+        request.user = AnonymousUser()
+        return router.handlers["rpc_echo"]["handler"](request)
+
+    try:
+        response = await post('{"value": 3}')
+        invalid = await post('{"value": "three"}')
+        with pytest.raises(json.JSONDecodeError):
+            await post("{")
+    finally:
+        observer_module._observer = None
+        observer_module._observer_parsed = True
+
+    assert response["content-type"] == "application/json"
+    assert json.loads(response.content) == {"value": 3, "ratio": 1.5}
+    assert invalid.status_code == 400
+    assert [status for status, *_ in calls] == [
+        RequestStatus.SUCCESS,
+        RequestStatus.INVALID,
+        RequestStatus.MALFORMED,
+    ]
+    if parsed:
+        assert calls[0][1:] == ({"value": 3}, {"value": 3, "ratio": 1.5})
+        assert calls[1][1] == {"value": "three"}
+    else:
+        assert calls[0][1:] == (None, None)
+        assert calls[1][1] is None
+
+
 @pytest.mark.asyncio
 async def test_router_principal_injection(settings: Any, rf: Any) -> None:
     """A scope resolves the principal — any value — and the handler receives
@@ -1524,3 +1948,675 @@ async def test_failing_observer_cannot_roll_back_a_reported_success(rf: Any) ->
     assert json.loads(response.content) == "registered"
     assert observed_in_atomic == [False]
     assert await sync_to_async(User.objects.filter(username="registered").exists)()
+
+
+@pytest.mark.asyncio
+async def test_rpc_adapters_are_built_once(rf: Any, monkeypatch: Any) -> None:
+    from reactivated import transport
+    from reactivated.rpc import warm_rpc_adapters
+
+    router = Router()
+
+    @router.rpc(atomic_requests=False)
+    def double(request: HttpRequest, form: list[int]) -> list[int]:
+        return [value * 2 for value in form]
+
+    monkeypatch.setattr(transport, "mounted_routers", [router])
+    assert warm_rpc_adapters() == 1
+
+    adapters = router.handlers["rpc_double"]["adapters"]
+    output, input = adapters.output, adapters.input
+
+    for _ in range(2):
+        request = rf.post(
+            "/rpc/double/", data=json.dumps([1, 2]), content_type="application/json"
+        )
+        request.user = AnonymousUser()
+        response = await router.handlers["rpc_double"]["handler"](request)
+        assert json.loads(response.content) == [2, 4]
+
+    assert adapters.output is output
+    assert adapters.input is input
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_batch_dispatches_calls_in_order(rf: Any, monkeypatch: Any) -> None:
+    """One request, one result per call with the status and body the call
+    would have had on its own URL. Queries after a mutation see its writes."""
+    from reactivated import transport
+    from reactivated.rpc import Subscription
+    from reactivated.rpc.batch import batch_view
+
+    router = Router()
+
+    @router.rpc()
+    def create_user(request: HttpRequest, form: ObserverInput) -> str:
+        return User.objects.create(username=f"user{form.value}").username
+
+    @router.query
+    def count_users(request: HttpRequest) -> int:
+        return User.objects.count()
+
+    @router.query
+    def get_user(request: HttpRequest, number: int) -> str:
+        assert isinstance(number, int)
+        return User.objects.get(username=f"user{number}").username
+
+    @router.query(router.authenticated)
+    def private(user: User) -> str:
+        return user.username
+
+    @router.query
+    def numbers(request: HttpRequest) -> Stream[int]:
+        raise NotImplementedError
+
+    @router.query(subscription=Subscription(topics=["users"]))
+    def live_count(request: HttpRequest) -> int:
+        return User.objects.count()
+
+    monkeypatch.setattr(transport, "mounted_routers", [router])
+
+    calls = [
+        {"name": "count_users"},
+        {"name": "create_user", "input": {"value": 1}},
+        {"name": "create_user", "input": {"value": "one"}},
+        {"name": "count_users"},
+        {"name": "get_user", "params": {"number": "1"}},
+        {"name": "private"},
+        {"name": "missing"},
+        {"name": "numbers"},
+        {"name": "live_count"},
+    ]
+    request = rf.post(
+        "/rpc/_batch/",
+        data=json.dumps(calls),
+        content_type="application/json",
+        HTTP_ACCEPT="text/event-stream",
+    )
+    request.user = AnonymousUser()
+    response = await batch_view(request)
+    results = json.loads(response.content)
+
+    assert results[0] == {"status": 200, "data": 0}
+    assert results[1] == {"status": 200, "data": "user1"}
+    assert results[2]["status"] == 400
+    assert results[2]["data"][0]["loc"] == ["value"]
+    assert results[3] == {"status": 200, "data": 1}
+    assert results[4] == {"status": 200, "data": "user1"}
+    assert results[5] == {"status": 401, "data": {"error": "UNAUTHORIZED"}}
+    assert results[6] == {"status": 404, "data": None}
+    # Streams have no single body to batch; subscriptions answer as queries.
+    assert results[7] == {
+        "status": 400,
+        "data": {"error": "Streaming calls cannot be batched"},
+    }
+    assert results[8] == {"status": 200, "data": 1}
+
+    too_many = rf.post(
+        "/rpc/_batch/",
+        data=json.dumps([{"name": "count_users"}] * 51),
+        content_type="application/json",
+    )
+    too_many.user = AnonymousUser()
+    assert (await batch_view(too_many)).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_query_cache(rf: Any, schema_env: Any) -> None:
+    """Repeat calls are answered from the cache, per URL param and input
+    field, until a mutation invalidates their tag."""
+    from reactivated.rpc import QueryCache, invalidate_query_cache
+    from reactivated.rpc import observer as observer_module
+    from reactivated.rpc.observer import RequestStatus, rpc_observer
+
+    statuses: list[RequestStatus] = []
+
+    @rpc_observer
+    async def observer(
+        request: Any, rpc_name: str, log: Any, status: Any, *args: Any
+    ) -> None:
+        statuses.append(status)
+
+    router = Router()
+    calls: list[int] = []
+
+    @router.query(
+        cache=QueryCache(principal=False, input=["value"], tags=["group:{group}"])
+    )
+    def lookup(request: HttpRequest, group: int, form: ObserverInput) -> int:
+        calls.append(group)
+        return group * 100 + form.value
+
+    @router.query(cache=QueryCache())
+    def private_lookup(request: HttpRequest, group: int, form: ObserverInput) -> str:
+        calls.append(group)
+        return f"{request.user.pk}:{form.value}"
+
+    @router.rpc(atomic_requests=True)
+    def touch(request: HttpRequest, group: int) -> None:
+        invalidate_query_cache(f"group:{group}")
+
+    generate_server_schema(skip_cache=True)
+
+    async def call(name: str, group: int, body: Any, user: Any = None) -> Any:
+        request = rf.post(
+            f"/rpc/{name}/{group}/",
+            data=json.dumps(body),
+            content_type="application/json",
+        )
+        request.user = user or AnonymousUser()
+        response = await router.handlers[f"rpc_{name}"]["handler"](request, group=group)
+        return json.loads(response.content)
+
+    try:
+        assert await call("lookup", 1, {"value": 1}) == 101
+        assert await call("lookup", 1, {"value": 1}) == 101
+        assert await call("lookup", 2, {"value": 1}) == 201
+        assert await call("lookup", 1, {"value": 2}) == 102
+        assert calls == [1, 2, 1]
+
+        await call("touch", 1, None)
+        assert await call("lookup", 1, {"value": 1}) == 101
+        assert await call("lookup", 2, {"value": 1}) == 201
+        assert calls == [1, 2, 1, 1]
+
+        # By default results are never shared across callers or inputs.
+        calls.clear()
+        first, second = User(pk=-1), User(pk=-2)
+        assert await call("private_lookup", 3, {"value": 1}, first) == "-1:1"
+        assert await call("private_lookup", 3, {"value": 1}, first) == "-1:1"
+        assert await call("private_lookup", 3, {"value": 1}, second) == "-2:1"
+        assert await call("private_lookup", 3, {"value": 2}, first) == "-1:2"
+        assert calls == [3, 3, 3]
+    finally:
+        observer_module._observer = None
+
+    assert statuses.count(RequestStatus.CACHE_HIT) == 3
+
+
+@pytest.mark.asyncio
+async def test_query_etag(rf: Any, schema_env: Any) -> None:
+    router = Router()
+    values = ["first"]
+
+    @router.query
+    def latest(request: HttpRequest) -> str:
+        return values[-1]
+
+    @router.query
+    def latest_of(request: HttpRequest, form: ObserverInput) -> str:
+        return values[-form.value]
+
+    generate_server_schema(skip_cache=True)
+
+    async def get(**headers: str) -> Any:
+        request = rf.get("/rpc/latest/", **headers)
+        request.user = AnonymousUser()
+        return await router.handlers["rpc_latest"]["handler"](request)
+
+    first = await get()
+    assert first.status_code == 200
+    etag = first["ETag"]
+
+    unchanged = await get(HTTP_IF_NONE_MATCH=etag)
+    assert unchanged.status_code == 304
+    assert unchanged["ETag"] == etag
+
+    values.append("second")
+    changed = await get(HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert json.loads(changed.content) == "second"
+
+    # A query whose input travels as a body is a read all the same.
+    async def post(value: int, **headers: str) -> Any:
+        request = rf.post(
+            "/rpc/latest_of/",
+            data=json.dumps({"value": value}),
+            content_type="application/json",
+            **headers,
+        )
+        request.user = AnonymousUser()
+        return await router.handlers["rpc_latest_of"]["handler"](request)
+
+    first = await post(2)
+    assert json.loads(first.content) == "first"
+    assert (await post(2, HTTP_IF_NONE_MATCH=first["ETag"])).status_code == 304
+    assert (await post(1, HTTP_IF_NONE_MATCH=first["ETag"])).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_single_flight(rf: Any, schema_env: Any) -> None:
+    """Identical calls in flight together share one execution. A failed
+    leader leaves the calls waiting on it to run on their own."""
+    from reactivated.rpc import SingleFlight
+    from reactivated.rpc.singleflight import single_flight_stats
+
+    router = Router()
+    calls: list[int] = []
+    release = asyncio.Event()
+
+    @router.query(single_flight=SingleFlight())
+    async def popular(request: HttpRequest, group: int) -> int:
+        calls.append(group)
+        await release.wait()
+        assert group != 0, "No such group"
+        return group * 100
+
+    @router.query(single_flight=SingleFlight())
+    async def popular_of(request: HttpRequest, form: ObserverInput) -> int:
+        calls.append(form.value)
+        await release.wait()
+        return form.value * 100
+
+    generate_server_schema(skip_cache=True)
+
+    async def get(group: int) -> Any:
+        request = rf.get(f"/rpc/popular/{group}/")
+        request.user = AnonymousUser()
+        return await router.handlers["rpc_popular"]["handler"](request, group=group)
+
+    async def post(value: int) -> Any:
+        request = rf.post(
+            "/rpc/popular_of/",
+            data=json.dumps({"value": value}),
+            content_type="application/json",
+        )
+        request.user = AnonymousUser()
+        return await router.handlers["rpc_popular_of"]["handler"](request)
+
+    async def burst(*groups: int, call: Any = get) -> list[Any]:
+        release.clear()
+        pending = asyncio.gather(*(call(group) for group in groups))
+        await asyncio.sleep(0.01)
+        release.set()
+        return list(await pending)
+
+    single_flight_stats.reset()
+    responses = await burst(1, 1, 1, 2)
+    assert [json.loads(response.content) for response in responses] == [
+        100,
+        100,
+        100,
+        200,
+    ]
+    assert calls == [1, 2]
+    assert single_flight_stats.snapshot() == {"executed": 2, "coalesced": 2}
+
+    calls.clear()
+    responses = await burst(0, 0)
+    assert [response.status_code for response in responses] == [400, 400]
+    assert calls == [0, 0]
+
+    # Queries whose input travels as a body coalesce too.
+    calls.clear()
+    responses = await burst(3, 3, 4, call=post)
+    assert [json.loads(response.content) for response in responses] == [
+        300,
+        300,
+        400,
+    ]
+    assert calls == [3, 4]
+
+    # A waiting call that goes away leaves the others, and the leader, be.
+    calls.clear()
+    release.clear()
+    leader = asyncio.ensure_future(get(5))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.ensure_future(get(5)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    followers[0].cancel()
+    release.set()
+    assert json.loads((await leader).content) == 500
+    assert [
+        json.loads(response.content)
+        for response in await asyncio.gather(*followers[1:])
+    ] == [500, 500]
+    assert followers[0].cancelled()
+    assert calls == [5]
+
+
+def test_pick_names_are_indexed(monkeypatch: Any, settings: Any) -> None:
+    holder: Any = MyPick  # the runtime holder, not the generated class
+    assert holder.get_name() == "tests_rpc_MyPick"
+
+    def no_scanning(*args: Any) -> Any:
+        raise AssertionError("module scanned again")
+
+    monkeypatch.setattr("inspect.getmembers", no_scanning)
+    assert holder.get_name() == "tests_rpc_MyPick"
+    assert holder.get_class_name() == "MyPick"
+
+    settings.DEBUG = True
+    monkeypatch.setattr(sys.modules[__name__], "MyPick", None)
+    with pytest.raises(AssertionError, match="no longer refers to this pick"):
+        holder.get_class_name()
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_read_only_query(rf: Any, settings: Any) -> None:
+    from reactivated.rpc import ReadOnlyError
+
+    settings.DATABASE_ROUTERS = ["reactivated.rpc.ReplicaRouter"]
+    router = Router()
+
+    @router.query(replica="replica")
+    def reads_from(request: HttpRequest) -> str:
+        return User.objects.all().db
+
+    username = unique_email()
+
+    @router.query(read_only=True)
+    def sneaks_a_write(request: HttpRequest) -> None:
+        User.objects.create(username=username)
+
+    @router.query
+    def reads_from_primary(request: HttpRequest) -> str:
+        return User.objects.all().db
+
+    @router.query(read_only=True)
+    def reads_with_cte(request: HttpRequest) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute("WITH t(x) AS (SELECT 'DELETE') SELECT count(*) FROM t")
+            count: int = cursor.fetchone()[0]
+        return count
+
+    @router.query(read_only=True)
+    def writes_in_cte(request: HttpRequest) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "WITH d AS (DELETE FROM auth_user WHERE id = -1 RETURNING id) "
+                "SELECT * FROM d"
+            )
+
+    generate_server_schema(skip_cache=True)
+
+    async def get(name: str) -> Any:
+        request = rf.get(f"/rpc/{name}/")
+        request.user = AnonymousUser()
+        response = await router.handlers[f"rpc_{name}"]["handler"](request)
+        return json.loads(response.content)
+
+    assert await get("reads_from") == "replica"
+    assert await get("reads_from_primary") == "default"
+    with pytest.raises(ReadOnlyError):
+        await get("sneaks_a_write")
+    assert not await sync_to_async(User.objects.filter(username=username).exists)()
+    assert await get("reads_with_cte") == 1
+    with pytest.raises(ReadOnlyError):
+        await get("writes_in_cte")
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_server_timing(rf: Any, settings: Any) -> None:
+    from reactivated.rpc import observer as observer_module
+    from reactivated.rpc.observer import rpc_observer
+    from reactivated.rpc.timing import RPCTimings
+
+    settings.REACTIVATED_RPC_SERVER_TIMING = True
+    observed: list[RPCTimings] = []
+
+    @rpc_observer(timings=True)
+    async def observer(
+        request: Any, rpc_name: str, log: Any, status: Any, *args: Any
+    ) -> None:
+        observed.append(args[-1])
+
+    router = Router()
+
+    @router.rpc
+    def count_users(request: HttpRequest, form: list[str]) -> int:
+        return User.objects.filter(username__in=form).count()
+
+    generate_server_schema(skip_cache=True)
+
+    request = rf.post(
+        "/rpc/count_users/", data=json.dumps(["a"]), content_type="application/json"
+    )
+    request.user = AnonymousUser()
+    try:
+        response = await router.handlers["rpc_count_users"]["handler"](request)
+    finally:
+        observer_module._observer = None
+
+    (timings,) = observed
+    assert list(timings.phases) == [
+        "transaction",
+        "scope",
+        "input",
+        "handler",
+        "serialize",
+        "commit",
+    ]
+    assert timings.queries >= 1
+    header = response["Server-Timing"]
+    assert header.startswith("transaction;dur=")
+    assert "handler;dur=" in header
+    assert f'db;desc="{timings.queries} queries"' in header
+
+
+@pytest.mark.asyncio
+async def test_batch_observer(rf: Any, schema_env: Any) -> None:
+    """Events reach a batch observer in order, off the request path, with
+    successes sampled and overflow dropped and counted."""
+    from reactivated.rpc import RPCEvent, rpc_batch_observer
+    from reactivated.rpc import observer as observer_module
+    from reactivated.rpc.events import (
+        event_queue_stats,
+        get_event_queue,
+        set_event_queue,
+    )
+    from reactivated.rpc.observer import RequestStatus
+
+    router = Router()
+
+    @router.rpc(atomic_requests=False)
+    def check(request: HttpRequest, form: list[int]) -> int:
+        assert form, "Empty"
+        return sum(form)
+
+    generate_server_schema(skip_cache=True)
+
+    async def call(form: list[int]) -> None:
+        request = rf.post(
+            "/rpc/check/", data=json.dumps(form), content_type="application/json"
+        )
+        request.user = AnonymousUser()
+        await router.handlers["rpc_check"]["handler"](request)
+
+    batches: list[list[RPCEvent]] = []
+    event_queue_stats.reset()
+    try:
+
+        @rpc_batch_observer(batch_size=10, max_size=3, flush_interval=60)
+        def record(events: list[RPCEvent]) -> None:
+            batches.append(events)
+
+        for form in ([1], [], [2, 3], [4]):
+            await call(form)
+        queue = get_event_queue()
+        assert queue is not None
+        assert batches == []
+        queue.flush()
+
+        rpc_batch_observer(sample_rate=0, body=True, flush_interval=60)(record)
+        await call([5])
+        await call([])
+        queue = get_event_queue()
+        assert queue is not None
+        queue.flush()
+    finally:
+        observer_module._observer = None
+        set_event_queue(None)
+
+    first, second = batches
+    assert [event.status for event in first] == [
+        RequestStatus.SUCCESS,
+        RequestStatus.INVALID,
+        RequestStatus.SUCCESS,
+    ]
+    assert [event.output for event in first] == [1, None, 5]
+    # Events hold a snapshot of the request, and only the body if asked.
+    assert {(event.path, event.method, event.user_id) for event in first} == {
+        ("/rpc/check/", "POST", None)
+    }
+    assert [event.body for event in first] == [None, None, None]
+    assert [event.status for event in second] == [RequestStatus.INVALID]
+    assert [event.body for event in second] == [b"[]"]
+
+    # A user nothing in the call loaded yet is loaded off the event loop.
+    from django.utils.functional import SimpleLazyObject
+
+    from reactivated.rpc.events import get_user_id
+
+    lazy = rf.get("/")
+    lazy.user = SimpleLazyObject(lambda: User(pk=7))
+    assert await get_user_id(lazy) == 7
+    assert event_queue_stats.snapshot() == {
+        "queued": 4,
+        "sampled_out": 1,
+        "dropped": 1,
+        "delivered": 4,
+        "failed": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_bulkhead(rf: Any, schema_env: Any) -> None:
+    """A full procedure turns calls away with a 503, or after its queue
+    times out, while procedures outside its bulkhead still run."""
+    from reactivated.rpc import Bulkhead, BulkheadFull
+    from reactivated.rpc import observer as observer_module
+    from reactivated.rpc.observer import RequestStatus, rpc_observer
+
+    rejections: list[BulkheadFull] = []
+
+    @rpc_observer
+    async def observer(
+        request: Any, rpc_name: str, log: Any, status: Any, *args: Any
+    ) -> None:
+        if status == RequestStatus.REJECTED:
+            rejections.append(args[-1])
+
+    router = Router()
+    release = asyncio.Event()
+    heavy = Bulkhead(1, max_waiting=1, timeout=0.05, retry_after=5)
+
+    @router.query(max_concurrency=heavy)
+    async def report(request: HttpRequest) -> str:
+        await release.wait()
+        return "done"
+
+    @router.query
+    async def ping(request: HttpRequest) -> str:
+        return "pong"
+
+    generate_server_schema(skip_cache=True)
+
+    async def get(name: str) -> Any:
+        request = rf.get(f"/rpc/{name}/")
+        request.user = AnonymousUser()
+        return await router.handlers[f"rpc_{name}"]["handler"](request)
+
+    try:
+        running = asyncio.ensure_future(get("report"))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.ensure_future(get("report"))
+        await asyncio.sleep(0.01)
+
+        turned_away = await get("report")
+        assert turned_away.status_code == 503
+        assert turned_away["Retry-After"] == "5"
+        assert json.loads((await get("ping")).content) == "pong"
+
+        assert (await waiting).status_code == 503
+        release.set()
+        assert json.loads((await running).content) == "done"
+    finally:
+        observer_module._observer = None
+
+    assert [error.reason for error in rejections] == ["full", "timeout"]
+    assert heavy.snapshot() == {
+        "active": 0,
+        "waiting": 0,
+        "admitted": 1,
+        "rejected": 1,
+        "timed_out": 1,
+    }
+
+
+class Roster(TypedDict):
+    label: str
+    count: int
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_subscription(rf: Any, async_rf: Any, schema_env: Any) -> None:
+    """A subscribed query sends its output, a patch when a publish changes
+    it, keepalives while nothing does, and an error that ends the stream
+    when a run fails."""
+    from reactivated.rpc import Subscription, publish
+    from reactivated.rpc.subscriptions import get_pubsub, merge_patch
+
+    assert merge_patch({"a": 1, "b": {"c": 1}}, {"a": 1, "b": {"c": 2}}) == {
+        "b": {"c": 2}
+    }
+    assert merge_patch({"a": 1}, {"a": None}) is None
+
+    router = Router()
+    prefix = uuid.uuid4().hex
+
+    @router.query(subscription=Subscription(topics=["roster"], keepalive=0.05))
+    def roster(request: HttpRequest) -> Roster:
+        count = User.objects.filter(username__startswith=prefix).count()
+        if count > 1:
+            raise AssertionError("Too many")
+        return {"label": "A label long enough to make a patch worth it", "count": count}
+
+    generate_server_schema(skip_cache=True)
+
+    # Under WSGI a stream would hold a worker for as long as it is open.
+    request = rf.get("/rpc/roster/", HTTP_ACCEPT="text/event-stream")
+    request.user = AnonymousUser()
+    response: Any = await router.handlers["rpc_roster"]["handler"](request)
+    assert response.status_code == 406
+
+    request = async_rf.get("/rpc/roster/", headers={"accept": "text/event-stream"})
+    request.user = AnonymousUser()
+    response = await router.handlers["rpc_roster"]["handler"](request)
+    assert response["Content-Type"] == "text/event-stream"
+    events = aiter(response.streaming_content)
+
+    first = await anext(events)
+    assert first.startswith(b"event: data\n")
+    assert json.loads(first.split(b"data: ")[1])["count"] == 0
+
+    await User.objects.acreate(username=f"{prefix}-1")
+    await sync_to_async(publish)("roster")
+    assert await anext(events) == b'event: patch\ndata: {"count": 1}\n\n'
+
+    # An unchanged output sends nothing.
+    await sync_to_async(publish)("roster")
+    assert await anext(events) == b": keepalive\n\n"
+
+    await User.objects.acreate(username=f"{prefix}-2")
+    await sync_to_async(publish)("roster")
+    error = await anext(events)
+    assert error.startswith(b"event: error\n")
+    assert json.loads(error.split(b"data: ")[1]) == {
+        "status": 400,
+        "data": ["Too many"],
+    }
+    with pytest.raises(StopAsyncIteration):
+        await anext(events)
+    assert get_pubsub().subscriber_count() == 0  # type: ignore[attr-defined]
+
+    # Without asking for events, it is an ordinary query.
+    request = rf.get("/rpc/roster/")
+    request.user = AnonymousUser()
+    response = await router.handlers["rpc_roster"]["handler"](request)
+    assert response.status_code == 400
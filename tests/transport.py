@@ -61,6 +61,17 @@ def test_mount_emits_patterns() -> None:
     assert [pattern.name for pattern in patterns] == ["area_list", "save_note"]
 
 
+def test_mount_adds_the_batch_endpoint_for_procedures() -> None:
+    router = Router()
+
+    @router.rpc
+    def save_note(request: HttpRequest) -> None:
+        raise NotImplementedError
+
+    patterns = mount(router)
+    assert [pattern.name for pattern in patterns] == ["rpc__batch", "rpc_save_note"]
+
+
 def test_mount_rejects_duplicate_route_across_routers() -> None:
     with pytest.raises(TypeError, match="duplicate route"):
         mount(